@@ -3,8 +3,14 @@
 # author: somnath.banerjee
 #
 
+import json
+import queue
+
 import src.portfolio as pf
-from flask import Flask, render_template
+from flask import Flask, Response, jsonify, render_template
+from src.portfolio_data import invalidate_transactions, snapshot_version
+from src.util.price_refresher import get_price_refresher
+from src.util.summary_writer import summary_write_status
 app = Flask(__name__)
 
 @app.route('/')
@@ -12,4 +18,36 @@ def home_page():
 	s, t = pf.summary()
 	s_table = s.to_html(table_id="summary", index=False, na_rep="N/A")
 	t_table = t.to_html(index=False)
-	return render_template("table_view.html", data=s_table + "\n<p>\n" + t_table)
+	saved_at = summary_write_status()["last_success_at"] or "not yet"
+	saved = f"<p>Net Worth last saved: {saved_at}</p>"
+	return render_template("table_view.html", data=s_table + "\n<p>\n" + t_table + "\n" + saved)
+
+@app.route('/status')
+def status():
+	return jsonify(summary_write=summary_write_status(), snapshot_version=snapshot_version())
+
+@app.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+	# Reload the ledger tabs in full, e.g. after rows above the sync window were edited
+	invalidate_transactions()
+	return jsonify(invalidated=True)
+
+@app.route('/prices/stream')
+def price_stream():
+	# One shared refresher feeds every open dashboard; each stream only relays its updates
+	refresher = get_price_refresher()
+
+	def events():
+		updates = refresher.subscribe()
+		try:
+			while True:
+				try:
+					batch = updates.get(timeout=15)
+				except queue.Empty:
+					yield ": keepalive\n\n"
+					continue
+				yield f"data: {json.dumps(batch)}\n\n"
+		finally:
+			refresher.unsubscribe(updates)
+
+	return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
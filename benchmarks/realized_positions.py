@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+#
+# Times realized-position lot matching on synthetic Sell tabs.
+#
+# usage: python -m benchmarks.realized_positions [--rows 1000 10000 100000]
+#
+
+# system
+import argparse
+import random
+import time
+
+# first-party
+from src import portfolio_data
+from src.ledger import Ledger
+
+HEADERS = [
+    "Date",
+    "Brokerage",
+    "Account",
+    "Category",
+    "Company",
+    "Ticker",
+    "Action",
+    "Cost Basis Method",
+    "Qty",
+    "Cost Price",
+    "Total",
+]
+TICKERS = [f"T{number:03d}" for number in range(200)]
+SCAN_MAX_ROWS = 20000
+
+
+def sell_tab(count, seed=1):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        qty = rng.randint(1, 20)
+        rows.append(
+            [
+                f"{rng.randint(2015, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                "Fidelity",
+                "IRA",
+                "Tech",
+                "Company",
+                rng.choice(TICKERS),
+                "Sell" if rng.random() < 0.3 else "Buy",
+                "",
+                str(qty),
+                "10",
+                str(qty * 10),
+            ]
+        )
+    return Ledger(portfolio_data._normalize_columns(HEADERS, rows, 2, "closed_positions", "Sell", []))
+
+
+def forward_scan(transactions):
+    # The previous matching: a forward scan over a copied slice from every Sell row
+    matched = 0
+    for index, tx in enumerate(transactions):
+        if tx["action"] != "Sell":
+            continue
+        for candidate in transactions[index + 1 :]:
+            if candidate["action"] == "Sell":
+                break
+            if candidate["ticker"] == tx["ticker"]:
+                matched += 1
+    return matched
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'all tickers':>12} {'one ticker':>11} {'forward scan':>13}")
+    for count in args.rows:
+        ledger = sell_tab(count)
+        full = timed(portfolio_data._closed_positions_from_ledger, ledger)
+        one = timed(portfolio_data._closed_positions_from_ledger, ledger, TICKERS[0])
+        scan = f"{timed(forward_scan, list(ledger.rows)):12.3f}s" if count <= SCAN_MAX_ROWS else f"{'skipped':>13}"
+        print(f"{count:>8} {full:11.3f}s {one:10.4f}s {scan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import math
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+TRANSACTION_KEYS = [
+    "date",
+    "source",
+    "brokerage",
+    "account",
+    "category",
+    "company",
+    "ticker",
+    "action",
+    "cost_basis_method",
+    "qty",
+    "price_per_share",
+    "total",
+    "row_number",
+]
+
+_STRING_KEYS = [
+    "date",
+    "source",
+    "brokerage",
+    "account",
+    "category",
+    "company",
+    "ticker",
+    "action",
+    "cost_basis_method",
+]
+
+
+class LedgerRow:
+    """One normalized transaction stored in slots; reads like the dict it replaced."""
+
+    __slots__ = TRANSACTION_KEYS
+
+    def __init__(self, **values: Any):
+        for key in _STRING_KEYS:
+            value = values[key]
+            setattr(self, key, sys.intern(value) if value is not None else None)
+        self.qty = values["qty"]
+        self.price_per_share = values["price_per_share"]
+        self.total = values["total"]
+        self.row_number = values["row_number"]
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {key: getattr(self, key) for key in TRANSACTION_KEYS}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LedgerRow):
+            return all(getattr(self, key) == getattr(other, key) for key in TRANSACTION_KEYS)
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LedgerRow({self.as_dict()!r})"
+
+
+METADATA_KEYS = ["company", "category", "account", "brokerage"]
+
+
+class TickerMetadata:
+    """
+    Row count, date range and representative values of one ticker's rows for one action.
+
+    The representative value of a column is its most frequent non-empty value; ties
+    go to the value on the latest row by (date, row number). Rows are folded in as
+    they are added, so reads never look at the rows again.
+    """
+
+    __slots__ = ["count", "first_date", "last_date", "_values"]
+
+    def __init__(self):
+        self.count = 0
+        self.first_date: str | None = None
+        self.last_date: str | None = None
+        # key -> value -> (occurrences, latest (date, row number) it appeared on)
+        self._values: dict[str, dict[str, tuple[int, tuple[str, int]]]] = {key: {} for key in METADATA_KEYS}
+
+    def add(self, row: LedgerRow) -> None:
+        self.count += 1
+        if row.date:
+            self.first_date = min(self.first_date or row.date, row.date)
+            self.last_date = max(self.last_date or row.date, row.date)
+        row_key = (row.date or "", row.row_number or 0)
+        for key, seen in self._values.items():
+            value = getattr(row, key)
+            if not value:
+                continue
+            count, latest = seen.get(value, (0, row_key))
+            seen[value] = (count + 1, max(latest, row_key))
+
+    def representative(self, key: str) -> str | None:
+        seen = self._values[key]
+        return max(seen, key=seen.__getitem__) if seen else None
+
+    def copy(self) -> TickerMetadata:
+        metadata = TickerMetadata.__new__(TickerMetadata)
+        metadata.count = self.count
+        metadata.first_date = self.first_date
+        metadata.last_date = self.last_date
+        metadata._values = {key: dict(seen) for key, seen in self._values.items()}
+        return metadata
+
+
+_INDEXES = ["by_ticker", "by_action", "by_account", "by_brokerage", "by_category"]
+
+
+class Ledger:
+    """
+    Transactions of one tab in sheet order, with secondary indexes.
+
+    Rows are indexed by ticker, action, and the case-folded account, brokerage and
+    category, plus a date-sorted order, so filtered reads are index lookups and
+    slices instead of scans. Per (ticker, action) metadata is folded in as rows are
+    indexed. Ledgers are immutable; extended() returns a new one.
+    """
+
+    def __init__(self, rows: Iterable[LedgerRow] = ()):
+        self.rows: tuple[LedgerRow, ...] = tuple(rows)
+        self.by_ticker: dict[str, list[int]] = defaultdict(list)
+        self.by_action: dict[str, list[int]] = defaultdict(list)
+        self.by_account: dict[str, list[int]] = defaultdict(list)
+        self.by_brokerage: dict[str, list[int]] = defaultdict(list)
+        self.by_category: dict[str, list[int]] = defaultdict(list)
+        self._metadata: dict[tuple[str, str], TickerMetadata] = {}
+        self._index_rows(0)
+        self._date_order = sorted(range(len(self.rows)), key=self._date_key)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[LedgerRow]:
+        return iter(self.rows)
+
+    def extended(self, rows: Iterable[LedgerRow]) -> Ledger:
+        """
+        Return a new ledger with ``rows`` appended, reusing this ledger's indexes.
+
+        Index lists and metadata are shared with this ledger until a new row touches
+        them, and only the new rows are inserted into the date order.
+        """
+        ledger = Ledger.__new__(Ledger)
+        start = len(self.rows)
+        ledger.rows = self.rows + tuple(rows)
+        new_keys = [set(keys) for keys in zip(*map(_index_keys, ledger.rows[start:]))] or [set()] * len(_INDEXES)
+        for name, keys in zip(_INDEXES, new_keys):
+            index = defaultdict(list)
+            index.update(getattr(self, name))
+            # Only the lists the new rows append to are copied
+            for key in keys:
+                index[key] = list(index[key])
+            setattr(ledger, name, index)
+        ledger._metadata = dict(self._metadata)
+        ledger._index_rows(start)
+        ledger._date_order = list(self._date_order)
+        for position in range(start, len(ledger.rows)):
+            insort(ledger._date_order, position, key=ledger._date_key)
+        return ledger
+
+    def tickers(self) -> list[str]:
+        return sorted(self.by_ticker)
+
+    def rows_for(self, ticker: str, action: str | None = None) -> list[LedgerRow]:
+        """Rows for one ticker in sheet order, optionally limited to one action."""
+
+        rows = [self.rows[position] for position in self.by_ticker.get(ticker, [])]
+        if action:
+            rows = [row for row in rows if row.action == action]
+        return rows
+
+    def metadata(self, ticker: str, action: str) -> TickerMetadata | None:
+        """Metadata of the ``action`` rows of ``ticker``, or None when there are none."""
+
+        return self._metadata.get((ticker, action))
+
+    def select(
+        self,
+        ticker: str | None = None,
+        action: str | None = None,
+        account: str | None = None,
+        brokerage: str | None = None,
+        category: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[LedgerRow]:
+        """
+        Return matching rows ordered by (missing date, date, row number).
+
+        ``ticker`` and ``action`` match exactly; account, brokerage and category are
+        case-insensitive. ``start``/``end`` are inclusive ISO dates and exclude rows
+        without a date.
+        """
+
+        candidates = []
+        if ticker:
+            candidates.append(self.by_ticker.get(ticker, []))
+        if action:
+            candidates.append(self.by_action.get(action, []))
+        for index, value in [
+            (self.by_account, account),
+            (self.by_brokerage, brokerage),
+            (self.by_category, category),
+        ]:
+            if value is not None and value != "":
+                candidates.append(index.get(_fold(value.strip()), []))
+
+        if not candidates:
+            first, last = self._date_bounds(start, end)
+            return [self.rows[position] for position in self._date_order[first:last]]
+
+        candidates.sort(key=len)
+        positions = candidates[0]
+        for other in candidates[1:]:
+            if not positions:
+                break
+            other_set = set(other)
+            positions = [position for position in positions if position in other_set]
+
+        if start or end:
+            positions = [position for position in positions if _in_range(self.rows[position].date, start, end)]
+        positions = sorted(positions, key=self._date_key)
+        return [self.rows[position] for position in positions]
+
+    def _index_rows(self, start: int) -> None:
+        # Metadata may be shared with the ledger this one extends; copy before the first write
+        touched = set()
+        for position in range(start, len(self.rows)):
+            row = self.rows[position]
+            key = (row.ticker, row.action)
+            if key not in touched:
+                held = self._metadata.get(key)
+                self._metadata[key] = held.copy() if held is not None else TickerMetadata()
+                touched.add(key)
+            self._metadata[key].add(row)
+            self.by_ticker[row.ticker].append(position)
+            self.by_action[row.action].append(position)
+            self.by_account[_fold(row.account)].append(position)
+            self.by_brokerage[_fold(row.brokerage)].append(position)
+            self.by_category[_fold(row.category)].append(position)
+
+    def _date_key(self, position: int) -> tuple[bool, str, int]:
+        row = self.rows[position]
+        return row.date is None, row.date or "", row.row_number or 0
+
+    def _date_bounds(self, start: str | None, end: str | None) -> tuple[int, int]:
+        if not start and not end:
+            return 0, len(self._date_order)
+        # Dated rows sort first, so bounds are searched among them by (False, date)
+        first = bisect_left(self._date_order, (False, start), key=self._date_key) if start else 0
+        if end:
+            last = bisect_right(self._date_order, (False, end, math.inf), key=self._date_key)
+        else:
+            last = bisect_left(self._date_order, (True,), key=self._date_key)
+        return first, max(first, last)
+
+
+def _index_keys(row: LedgerRow) -> tuple[str, str, str, str, str]:
+    return row.ticker, row.action, _fold(row.account), _fold(row.brokerage), _fold(row.category)
+
+
+def _fold(value: str | None) -> str:
+    return (value or "").casefold()
+
+
+def _in_range(value: str | None, start: str | None, end: str | None) -> bool:
+    if value is None:
+        return False
+    if start and value < start:
+        return False
+    if end and value > end:
+        return False
+    return True
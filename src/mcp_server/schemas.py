@@ -29,6 +29,7 @@ class EnrichedPosition(StrictModel):
     change_3m_pct: float | None
     change_6m_pct: float | None
     change_1y_pct: float | None
+    changes: dict[str, float | None] = Field(default_factory=dict)
     transaction_count: int
     first_buy_date: str | None
     last_buy_date: str | None
@@ -56,6 +57,7 @@ class Allocation(StrictModel):
 class PortfolioSnapshotResponse(StrictModel):
     as_of: str
     source: Literal["buy_tab"]
+    version: str | None = None
     totals: PortfolioTotals
     positions: list[EnrichedPosition]
     allocations: list[Allocation]
@@ -65,10 +67,31 @@ class PortfolioSnapshotResponse(StrictModel):
 class PositionsResponse(StrictModel):
     as_of: str
     source: Literal["buy_tab"]
+    version: str | None = None
     positions: list[EnrichedPosition]
     warnings: list[str] = Field(default_factory=list)
 
 
+class OpenLot(StrictModel):
+    ticker: str
+    account: str | None
+    brokerage: str | None
+    acquired_date: str | None
+    qty: float
+    cost_per_share: float | None
+    cost_basis: float
+    holding_period_days: int | None
+    term: Literal["short", "long"] | None
+    row_number: int | None
+
+
+class OpenLotsResponse(StrictModel):
+    as_of: str
+    source: Literal["buy_tab"]
+    lots: list[OpenLot]
+    warnings: list[str] = Field(default_factory=list)
+
+
 class Transaction(StrictModel):
     date: str | None
     source: Literal["open_positions", "closed_positions"]
@@ -13,6 +13,7 @@ from src.mcp_server.config import PortfolioMcpConfig, load_config
 from src.mcp_server.schemas import (
     ClosedPosition,
     EnrichedPosition,
+    OpenLotsResponse,
     PortfolioSnapshotResponse,
     PositionDetailResponse,
     PositionsResponse,
@@ -68,11 +69,16 @@ def create_server(config: PortfolioMcpConfig | None = None) -> FastMCP:
     @mcp.tool()
     def get_portfolio_snapshot(
         group_by: Literal["ticker", "category", "account", "brokerage"] = "ticker",
+        windows: list[str] | None = None,
     ) -> dict:
-        """Return a dashboard-equivalent current portfolio summary."""
+        """Return a dashboard-equivalent current portfolio summary.
+
+        ``windows`` picks the price-change windows reported per position, e.g.
+        ``["YTD", "3Y"]``: YTD, <n>D/W/M/Y, or an ISO start date.
+        """
 
         response = PortfolioSnapshotResponse.model_validate(
-            portfolio_data.get_portfolio_snapshot(group_by=group_by)
+            portfolio_data.get_portfolio_snapshot(group_by=group_by, windows=windows)
         )
         return response.model_dump(mode="json")
 
@@ -82,8 +88,13 @@ def create_server(config: PortfolioMcpConfig | None = None) -> FastMCP:
         category: str | None = None,
         account: str | None = None,
         brokerage: str | None = None,
+        windows: list[str] | None = None,
     ) -> dict:
-        """Return enriched current/open positions, optionally filtered."""
+        """Return enriched current/open positions, optionally filtered.
+
+        ``windows`` picks the price-change windows reported per position, e.g.
+        ``["YTD", "3Y"]``: YTD, <n>D/W/M/Y, or an ISO start date.
+        """
 
         response = PositionsResponse.model_validate(
             portfolio_data.get_positions(
@@ -91,10 +102,23 @@ def create_server(config: PortfolioMcpConfig | None = None) -> FastMCP:
                 category=category,
                 account=account,
                 brokerage=brokerage,
+                windows=windows,
             )
         )
         return response.model_dump(mode="json")
 
+    @mcp.tool()
+    def get_open_lots(
+        ticker: str | None = None,
+        account: str | None = None,
+    ) -> dict:
+        """Return open tax lots with per-lot cost basis and holding period, after Cost Basis Method sales."""
+
+        response = OpenLotsResponse.model_validate(
+            portfolio_data.get_open_lots(ticker=ticker, account=account)
+        )
+        return response.model_dump(mode="json")
+
     @mcp.tool()
     def get_position_detail(
         ticker: str,
@@ -5,19 +5,21 @@
 import pandas as pd
 
 from src.config.ColumnNameConsts import ColumnNames as CN
-from src.portfolio_data import get_enriched_open_positions
-from src.util.gspread import update_portfolio_summary
+from src.portfolio_data import get_current_snapshot
+from src.util.price_refresher import get_price_refresher
+from src.util.summary_writer import enqueue_summary
+from src.util.transaction_source import get_transaction_source
 
 
 def load():
-    enriched = get_enriched_open_positions()
-    return _positions_to_dataframe(enriched["positions"])
+    snapshot = get_current_snapshot()
+    return _positions_to_dataframe(snapshot["positions"])
 
 
 def summary():
-    enriched = get_enriched_open_positions()
-    s = _positions_to_dataframe(enriched["positions"])
-    t = _totals_to_dataframe(enriched["positions"])
+    snapshot = get_current_snapshot()
+    s = _positions_to_dataframe(snapshot["positions"])
+    t = _totals_to_dataframe(snapshot["totals"])
 
     formatted_t = t.copy()
     for column in [CN.TOTAL, CN.MARKET_VALUE, CN.GAIN, CN.DAY_CHNG_VAL]:
@@ -26,10 +28,13 @@ def summary():
     for column in [CN.GAIN_PCT, CN.DAY_CHNG]:
         formatted_t[column] = formatted_t[column].apply(lambda x: f"{x:.2f}%")
 
-    try:
-        update_portfolio_summary(t)
-    except Exception as e:
-        print(f"Warning: Failed to save data to Google Sheets: {e}")
+    if get_transaction_source().name == "sheets":
+        enqueue_summary(t)
+
+    # Keep the rendered tickers' prices flowing to open dashboards
+    get_price_refresher().watch(
+        {pos["ticker"]: pos["category"] == "Cryptocurrency" for pos in snapshot["positions"]}
+    )
 
     return s, formatted_t
 
@@ -86,30 +91,16 @@ def _positions_to_dataframe(positions):
     return s.sort_values(CN.DAY_CHNG, ascending=False, na_position="last")
 
 
-def _totals_to_dataframe(positions):
-    total_cost_basis = sum(pos["total_cost_basis"] or 0 for pos in positions)
-    priced_cost_basis = sum(
-        pos["total_cost_basis"] or 0 for pos in positions if pos["market_value"] is not None
-    )
-    market_value = sum(pos["market_value"] or 0 for pos in positions)
-    gain = sum(pos["gain"] or 0 for pos in positions)
-    day_change_value = sum(pos["day_change_value"] or 0 for pos in positions)
-    previous_market_value = market_value - day_change_value
-
-    gain_pct = 100 * gain / priced_cost_basis if priced_cost_basis else 0
-    day_change_pct = (
-        100 * day_change_value / previous_market_value if previous_market_value else 0
-    )
-
+def _totals_to_dataframe(totals):
     return pd.DataFrame(
         [
             {
-                CN.TOTAL: total_cost_basis,
-                CN.MARKET_VALUE: market_value,
-                CN.GAIN: gain,
-                CN.GAIN_PCT: gain_pct,
-                CN.DAY_CHNG: day_change_pct,
-                CN.DAY_CHNG_VAL: day_change_value,
+                CN.TOTAL: totals["total_cost_basis"],
+                CN.MARKET_VALUE: totals["market_value"],
+                CN.GAIN: totals["gain"],
+                CN.GAIN_PCT: totals["gain_pct"] or 0,
+                CN.DAY_CHNG: totals["day_change_pct"] or 0,
+                CN.DAY_CHNG_VAL: totals["day_change_value"],
             }
         ],
         columns=[
@@ -1,16 +1,40 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
 from collections import Counter, defaultdict
 from datetime import date
 from typing import Any, Literal
 
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 
 from src.config.ColumnNameConsts import ColumnNames as CN
-from src.util.gspread import worksheet_values
-from src.util.historical_cache import get_historical_prices
-from src.util.yfinance import curr_price
+from src.ledger import Ledger, LedgerRow
+from src.tax_lots import (
+    FIFO,
+    HEAP_METHODS,
+    LONG_TERM_DAYS,
+    QTY_EPSILON,
+    SPECIFIC_ID,
+    Consumption,
+    TaxLot,
+    TaxLotLedger,
+    consume,
+    normalize_method,
+)
+from src.util import sheet_cache
+from src.util.request_context import current_scope, memoized, request_scope
+from src.util.resilience import format_age, latency_budget
+from src.util.snapshot_engine import SnapshotEngine
+from src.util.transaction_source import get_transaction_source
+from src.util.historical_cache import DEFAULT_WINDOWS, get_historical_prices, normalize_windows, unsynced_history
+from src.util.yfinance import curr_price, quote_stamps, stale_quote_ages
 
 SourceName = Literal["open_positions", "closed_positions"]
 
@@ -33,135 +57,163 @@ EXPECTED_COLUMNS = [
     CN.TOTAL,
 ]
 
-TRANSACTION_KEYS = [
-    "date",
-    "source",
-    "brokerage",
-    "account",
-    "category",
-    "company",
-    "ticker",
-    "action",
-    "cost_basis_method",
-    "qty",
-    "price_per_share",
-    "total",
-    "row_number",
-]
+GROUP_BYS = ["ticker", "category", "account", "brokerage"]
+
+# Batches at least this large are normalized column-wise instead of row by row.
+COLUMNAR_MIN_ROWS = 64
+
+# Normalized ledger per (worksheet, source), extended in place when rows are appended.
+_ledger_cache: dict[tuple[str, str], dict[str, Any]] = {}
+_ledger_lock = threading.Lock()
+# Bumped whenever a tab parses to a different ledger; unreadable tabs have no revision.
+_ledger_revisions = itertools.count(1)
+# Position books per windows tuple, most recently used last.
+MAX_POSITION_BOOKS = 8
+_books: dict[tuple[str, ...], Any] = {}
+_books_lock = threading.Lock()
 
 
 def load_buy_transactions() -> dict[str, Any]:
+    worksheet_name, worksheet_index = _tab_spec(SOURCE_OPEN)
     return _load_tab(
-        worksheet_name=os.getenv("BUY_WORKSHEET", BUY_WORKSHEET),
-        worksheet_index=0,
+        worksheet_name=worksheet_name,
+        worksheet_index=worksheet_index,
         source=SOURCE_OPEN,
     )
 
 
 def load_sell_transactions() -> dict[str, Any]:
+    worksheet_name, worksheet_index = _tab_spec(SOURCE_CLOSED)
     return _load_tab(
-        worksheet_name=os.getenv("SELL_WORKSHEET", SELL_WORKSHEET),
-        worksheet_index=None,
+        worksheet_name=worksheet_name,
+        worksheet_index=worksheet_index,
         source=SOURCE_CLOSED,
     )
 
 
-def get_enriched_open_positions() -> dict[str, Any]:
-    loaded = load_buy_transactions()
-    warnings = list(loaded["warnings"])
-    transactions = loaded["transactions"]
-    buy_transactions = [tx for tx in transactions if tx["action"] == "Buy"]
+def load_transaction_tabs(sources: list[SourceName]) -> dict[SourceName, dict[str, Any]]:
+    """Load several transaction tabs with one batched worksheet request."""
 
-    positions = []
-    by_ticker: dict[str, list[dict[str, Any]]] = defaultdict(list)
-    for tx in buy_transactions:
-        by_ticker[tx["ticker"]].append(tx)
+    # Outside a request scope nothing is kept between calls
+    memo = current_scope()
+    if memo is None:
+        memo = {}
+    loaded = {source: memo[("tab", source)] for source in sources if ("tab", source) in memo}
+    missing = [source for source in sources if source not in loaded]
+    if missing:
+        specs = [_tab_spec(source) for source in missing]
+        try:
+            results = get_transaction_source().worksheets_values(specs)
+        except Exception as exc:
+            results = [exc] * len(specs)
 
-    price_data, price_warnings = _load_current_prices(by_ticker)
-    warnings.extend(price_warnings)
+        for source, (worksheet_name, worksheet_index), result in zip(missing, specs, results):
+            parsed = _parse_tab(result, worksheet_name, source)
+            memo[("tab", source)] = loaded[source] = _with_staleness(parsed, worksheet_name, worksheet_index)
+    return {source: loaded[source] for source in sources}
 
-    tickers = sorted(by_ticker)
-    try:
-        historical_prices = get_historical_prices(tickers) if tickers else {}
-    except Exception as exc:
-        historical_prices = {}
-        warnings.append(f"Historical price lookup failed: {exc}")
 
+@latency_budget()
+def get_enriched_open_positions(
+    windows: list[str] | None = None,
+    tickers: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Open positions priced and enriched from the Buy tab.
+
+    ``windows`` selects the price-change windows reported under ``changes`` (see
+    normalize_windows); the fixed change_*_pct fields are always filled. ``tickers``
+    limits the positions, and so the price lookups, to those symbols.
+    """
+
+    windows = normalize_windows(windows)
+    loaded = load_buy_transactions()
+    warnings = list(loaded["warnings"])
+    holdings = _holdings.sync(loaded)
+
+    wanted = None if tickers is None else {_normalize_ticker(ticker) for ticker in tickers}
+    tickers = [ticker for ticker in sorted(holdings) if wanted is None or ticker in wanted]
+    by_ticker = {ticker: holdings[ticker] for ticker in tickers}
     for ticker in tickers:
-        rows = by_ticker[ticker]
-        qty = sum(tx["qty"] for tx in rows)
-        total_cost_basis = sum(tx["total"] for tx in rows)
-        average_cost = _divide(total_cost_basis, qty)
-
-        current_price = price_data.get(ticker, {}).get("current_price")
-        day_change_decimal = price_data.get(ticker, {}).get("day_change_decimal")
-
-        if current_price is None:
-            warnings.append(f"Current price unavailable for {ticker}.")
-            day_change_pct = None
-            day_change_value = None
-            market_value = None
-            gain = None
-            gain_pct = None
-        else:
-            market_value = qty * current_price
-            gain = market_value - total_cost_basis
-            gain_pct = _pct(gain, total_cost_basis)
-            day_change_pct = None if day_change_decimal is None else day_change_decimal * 100
-            day_change_value = _day_change_value(market_value, day_change_decimal)
+        warnings.extend(by_ticker[ticker]["warnings"])
 
-        position = {
-            "ticker": ticker,
-            "company": _representative_value(rows, "company"),
-            "category": _representative_value(rows, "category"),
-            "account": _representative_value(rows, "account"),
-            "brokerage": _representative_value(rows, "brokerage"),
-            "qty": _json_number(qty),
-            "current_price": _json_number(current_price),
-            "day_change_pct": _json_number(day_change_pct),
-            "day_change_value": _json_number(day_change_value),
-            "average_cost": _json_number(average_cost),
-            "total_cost_basis": _json_number(total_cost_basis),
-            "market_value": _json_number(market_value),
-            "gain": _json_number(gain),
-            "gain_pct": _json_number(gain_pct),
-            "change_7d_pct": _historical_change(current_price, historical_prices, ticker, "7D"),
-            "change_1m_pct": _historical_change(current_price, historical_prices, ticker, "1M"),
-            "change_3m_pct": _historical_change(current_price, historical_prices, ticker, "3M"),
-            "change_6m_pct": _historical_change(current_price, historical_prices, ticker, "6M"),
-            "change_1y_pct": _historical_change(current_price, historical_prices, ticker, "1Y"),
-            "transaction_count": len(rows),
-            "first_buy_date": _min_date(rows),
-            "last_buy_date": _max_date(rows),
-        }
-        positions.append(position)
+    price_data, price_warnings = memoized(("quotes", tuple(tickers)), lambda: _load_current_prices(by_ticker))
+    warnings.extend(price_warnings)
 
-    positions.sort(key=lambda pos: (pos["day_change_pct"] is None, -(pos["day_change_pct"] or 0)))
-    return {
+    historical_windows = list(dict.fromkeys(DEFAULT_WINDOWS + windows))
+    historical_prices, historical_warnings = memoized(
+        ("history", tuple(tickers), tuple(historical_windows)),
+        lambda: _load_historical_prices(tickers, historical_windows),
+    )
+    warnings.extend(historical_warnings)
+    warnings.extend(f"Current price unavailable for {ticker}." for ticker in tickers if ticker not in price_data)
+
+    if wanted is None:
+        book = _position_book(tuple(windows))
+        positions, totals = book.refresh(by_ticker, price_data, historical_prices)
+    else:
+        positions = _build_positions(tickers, by_ticker, price_data, historical_prices, windows)
+        positions.sort(key=_position_sort_key)
+        totals = None
+
+    enriched = {
         "as_of": date.today().isoformat(),
         "source": "buy_tab",
         "positions": positions,
-        "transaction_count": len(transactions),
+        "transaction_count": len(loaded["transactions"]),
         "warnings": _unique_warnings(warnings),
     }
+    if totals is not None:
+        enriched["totals"] = totals | {"transaction_count": enriched["transaction_count"]}
+    return enriched
 
 
-def get_portfolio_snapshot(group_by: str = "ticker") -> dict[str, Any]:
-    if group_by not in {"ticker", "category", "account", "brokerage"}:
-        raise ValueError("group_by must be one of ticker, category, account, or brokerage")
+def get_current_snapshot(windows: list[str] | None = None) -> dict[str, Any]:
+    """
+    The enriched open positions with their totals and allocations, shared process-wide.
 
-    enriched = get_enriched_open_positions()
-    positions = enriched["positions"]
-    totals = _portfolio_totals(positions, enriched["transaction_count"])
-    allocations = _allocations(positions, group_by)
+    The snapshot is rebuilt only when the Buy tab's ledger revision, a quote it was
+    priced from, or the day changed; otherwise every caller gets the materialized
+    one. ``version`` identifies it (None when it could not be versioned, e.g. the
+    tab was unreadable). ``allocations`` maps each group_by to its allocation list.
+    The result is shared and must not be modified.
+    """
+
+    key = tuple(normalize_windows(windows))
+    with request_scope():
+        version, snapshot = _snapshots.get(key)
+    return snapshot | {"version": version}
 
+
+def snapshot_version(windows: list[str] | None = None) -> str | None:
+    """Version the current snapshot has, without pricing or building anything."""
+
+    with request_scope():
+        return _snapshots.version(tuple(normalize_windows(windows)))
+
+
+def invalidate_transactions() -> None:
+    """Forget the cached ledger tabs, including the on-disk sheet cache, so they are reloaded in full."""
+
+    get_transaction_source().invalidate()
+    with _ledger_lock:
+        _ledger_cache.clear()
+    _snapshots.clear()
+
+
+def get_portfolio_snapshot(group_by: str = "ticker", windows: list[str] | None = None) -> dict[str, Any]:
+    if group_by not in GROUP_BYS:
+        raise ValueError("group_by must be one of ticker, category, account, or brokerage")
+
+    snapshot = get_current_snapshot(windows=windows)
     return {
-        "as_of": enriched["as_of"],
+        "as_of": snapshot["as_of"],
         "source": "buy_tab",
-        "totals": totals,
-        "positions": positions,
-        "allocations": allocations,
-        "warnings": enriched["warnings"],
+        "version": snapshot["version"],
+        "totals": snapshot["totals"],
+        "positions": snapshot["positions"],
+        "allocations": snapshot["allocations"][group_by],
+        "warnings": snapshot["warnings"],
     }
 
 
@@ -170,8 +222,18 @@ def get_positions(
     category: str | None = None,
     account: str | None = None,
     brokerage: str | None = None,
+    windows: list[str] | None = None,
 ) -> dict[str, Any]:
-    enriched = get_enriched_open_positions()
+    if not ticker:
+        enriched = get_current_snapshot(windows=windows)
+    else:
+        # A ticker filter only needs that ticker priced, unless a current snapshot has it
+        with request_scope():
+            held = _snapshots.current(tuple(normalize_windows(windows)))
+        if held is not None:
+            enriched = held[1] | {"version": held[0]}
+        else:
+            enriched = get_enriched_open_positions(windows=windows, tickers=[ticker]) | {"version": None}
     positions = [
         pos
         for pos in enriched["positions"]
@@ -184,11 +246,41 @@ def get_positions(
     return {
         "as_of": enriched["as_of"],
         "source": "buy_tab",
+        "version": enriched["version"],
         "positions": positions,
         "warnings": enriched["warnings"],
     }
 
 
+def get_open_lots(ticker: str | None = None, account: str | None = None) -> dict[str, Any]:
+    """Open tax lots from the Buy tab with per-lot cost and holding period, in sheet order per ticker."""
+
+    loaded = load_buy_transactions()
+    holdings = _holdings.sync(loaded)
+    selected = [_normalize_ticker(ticker)] if ticker else sorted(holdings)
+    warnings = list(loaded["warnings"])
+    today = date.today()
+    lots = []
+    for t in selected:
+        holding = holdings.get(t)
+        if holding is None:
+            continue
+        warnings.extend(holding["warnings"])
+        lots.extend(
+            _lot_view(lot, today)
+            for lot in holding["lots"]
+            if lot.remaining > QTY_EPSILON and _matches(lot.row.account, account)
+        )
+    return {
+        "as_of": today.isoformat(),
+        "source": "buy_tab",
+        "lots": lots,
+        "warnings": _unique_warnings(warnings),
+    }
+
+
+@latency_budget()
+@request_scope()
 def get_position_detail(
     ticker: str,
     include_closed_positions: bool = True,
@@ -197,6 +289,9 @@ def get_position_detail(
 ) -> dict[str, Any]:
     normalized_ticker = _normalize_ticker(ticker)
     warnings: list[str] = []
+    if include_closed_positions or include_aggregate or include_raw_transactions:
+        # Load both tabs in one round trip; the request scope serves the loads below.
+        load_transaction_tabs([SOURCE_OPEN, SOURCE_CLOSED])
     positions_result = get_positions(ticker=normalized_ticker)
     warnings.extend(positions_result["warnings"])
     open_position = positions_result["positions"][0] if positions_result["positions"] else None
@@ -253,47 +348,28 @@ def get_transactions(
         raise ValueError("action must be Buy, Sell, or all")
 
     warnings: list[str] = []
-    transactions: list[dict[str, Any]] = []
-    if source in {SOURCE_OPEN, "all"}:
-        loaded = load_buy_transactions()
+    sources = [SOURCE_OPEN, SOURCE_CLOSED] if source == "all" else [source]
+    loaded_tabs = load_transaction_tabs(sources)
+    for loaded in loaded_tabs.values():
         warnings.extend(loaded["warnings"])
-        transactions.extend(loaded["transactions"])
-    if source in {SOURCE_CLOSED, "all"}:
-        loaded = load_sell_transactions()
-        warnings.extend(loaded["warnings"])
-        transactions.extend(loaded["transactions"])
 
     start = _parse_filter_date(start_date, "start_date", warnings)
     end = _parse_filter_date(end_date, "end_date", warnings)
     normalized_ticker = _normalize_ticker(ticker) if ticker else None
 
-    filtered = []
-    for tx in transactions:
-        tx_date = tx["date"]
-        if normalized_ticker and tx["ticker"] != normalized_ticker:
-            continue
-        if action != "all" and tx["action"] != action:
-            continue
-        if not _matches(tx["account"], account):
-            continue
-        if not _matches(tx["brokerage"], brokerage):
-            continue
-        if not _matches(tx["category"], category):
-            continue
-        if start and (tx_date is None or tx_date < start):
-            continue
-        if end and (tx_date is None or tx_date > end):
-            continue
-        filtered.append(tx)
-
-    filtered.sort(
-        key=lambda tx: (
-            tx["date"] is None,
-            tx["date"] or "",
-            tx["source"],
-            tx["row_number"] or 0,
+    selections = [
+        loaded["ledger"].select(
+            ticker=normalized_ticker,
+            action=None if action == "all" else action,
+            account=account,
+            brokerage=brokerage,
+            category=category,
+            start=start,
+            end=end,
         )
-    )
+        for loaded in loaded_tabs.values()
+    ]
+    filtered = list(heapq.merge(*selections, key=_transaction_sort_key))
 
     safe_limit = max(1, min(int(limit or 500), 5000))
     truncated = len(filtered) > safe_limit
@@ -314,9 +390,8 @@ def get_realized_positions(
     loaded = load_sell_transactions()
     warnings = list(loaded["warnings"])
     normalized_ticker = _normalize_ticker(ticker) if ticker else None
-    transactions = sorted(loaded["transactions"], key=lambda tx: tx["row_number"] or 0)
-    closed_positions, match_warnings = _closed_positions_from_sell_transactions(
-        transactions,
+    closed_positions, match_warnings = _closed_positions_from_ledger(
+        loaded["ledger"],
         target_ticker=normalized_ticker,
     )
     warnings.extend(match_warnings)
@@ -333,85 +408,61 @@ def get_realized_positions(
     }
 
 
-def _closed_positions_from_sell_transactions(
-    transactions: list[dict[str, Any]],
+def _closed_positions_from_ledger(
+    ledger: Ledger,
     target_ticker: str | None = None,
 ) -> tuple[list[dict[str, Any]], list[str]]:
-    warnings: list[str] = []
-    closed_positions: list[dict[str, Any]] = []
-    sequence_by_ticker: dict[str, int] = defaultdict(int)
-
-    for index, tx in enumerate(transactions):
-        if tx["action"] != "Sell":
-            continue
-        if target_ticker and tx["ticker"] != target_ticker:
-            continue
-
-        ticker = tx["ticker"]
-        sequence_by_ticker[ticker] += 1
-        qty_remaining = tx["qty"]
-        qty_bought = 0.0
-        cost_basis = 0.0
-        consumed_lots: list[dict[str, Any]] = []
-        buy_row_numbers: list[int] = []
-
-        for candidate in transactions[index + 1 :]:
-            if qty_remaining <= 0.000001:
-                break
-            if candidate["action"] == "Sell":
-                break
-            if candidate["ticker"] != ticker:
+    """
+    One closed position per Sell row, matched against tax lots by its Cost Basis Method.
+
+    The rows after a Sell, up to the next Sell row of any ticker, are the lots listed
+    for it. With no method or Specific ID a Sell consumes its own listed lots of its
+    ticker in sheet order. FIFO, LIFO and HIFO Sells take from every lot of the ticker
+    in the Sell's account read so far, including lots earlier Sells left open.
+    Tickers never share lots, so each ticker's rows are matched on their own through
+    the ledger indexes and ``target_ticker`` only visits its own rows.
+    """
+    rows = ledger.rows
+    sells = ledger.by_action.get("Sell", [])
+    matched: list[tuple[int, dict[str, Any], list[str]]] = []
+
+    for ticker in [target_ticker] if target_ticker else list(ledger.by_ticker):
+        positions = ledger.by_ticker.get(ticker, [])
+        tax_lots = TaxLotLedger()
+        sequence = 0
+        at = 0
+        while at < len(positions):
+            position = positions[at]
+            tx = rows[position]
+            at += 1
+            if tx.action != "Sell":
+                tax_lots.add(tx)
                 continue
 
-            available_qty = candidate["qty"]
-            if available_qty <= 0:
-                continue
-
-            consumed_qty = min(available_qty, qty_remaining)
-            lot_cost = candidate["total"] * consumed_qty / available_qty
-
-            qty_remaining -= consumed_qty
-            qty_bought += consumed_qty
-            cost_basis += lot_cost
-            consumed_lots.append(candidate)
-
-            row_number = candidate.get("row_number")
-            if row_number is not None and row_number not in buy_row_numbers:
-                buy_row_numbers.append(row_number)
-
-        is_quantity_matched = abs(qty_bought - tx["qty"]) < 0.000001
-        if not is_quantity_matched:
-            warnings.append(
-                f"Sell tab row {tx.get('row_number')} for {ticker} sold {tx['qty']} shares "
-                f"but only {qty_bought} following Buy shares were available before the next Sell row."
-            )
-
-        proceeds = tx["total"]
-        realized_gain = proceeds - cost_basis
-        closed_positions.append(
-            {
-                "closed_position_id": f"{ticker}-{tx.get('row_number') or sequence_by_ticker[ticker]}",
-                "ticker": ticker,
-                "company": tx.get("company") or _representative_value(consumed_lots, "company"),
-                "category": tx.get("category") or _representative_value(consumed_lots, "category"),
-                "close_date": tx.get("date"),
-                "qty_bought": _json_number(qty_bought) or 0,
-                "qty_sold": _json_number(tx["qty"]) or 0,
-                "is_quantity_matched": is_quantity_matched,
-                "cost_basis": _json_number(cost_basis) or 0,
-                "proceeds": _json_number(proceeds) or 0,
-                "average_cost": _json_number(_divide(cost_basis, qty_bought)),
-                "sell_price": _json_number(tx["price_per_share"]),
-                "average_sell_price": _json_number(_divide(proceeds, tx["qty"])),
-                "realized_gain": _json_number(realized_gain) or 0,
-                "realized_gain_pct": _json_number(_pct(realized_gain, cost_basis)),
-                "first_buy_date": _min_date(consumed_lots),
-                "buy_transaction_count": len(buy_row_numbers),
-                "buy_row_numbers": buy_row_numbers,
-                "sell_row_number": tx.get("row_number"),
-            }
-        )
-
+            next_sell = bisect_right(sells, position)
+            span_end = sells[next_sell] if next_sell < len(sells) else len(rows)
+            listed = []
+            while at < len(positions) and positions[at] < span_end:
+                listed.append(tax_lots.add(rows[positions[at]]))
+                at += 1
+
+            sequence += 1
+            warnings: list[str] = []
+            method = normalize_method(tx.cost_basis_method)
+            if method in HEAP_METHODS:
+                consumed = tax_lots.sell(ticker, tx.account, tx.qty, method)
+            else:
+                if method not in {None, SPECIFIC_ID}:
+                    warnings.append(
+                        f"Sell tab row {tx.row_number} has unknown cost basis method '{method}'; "
+                        "its listed lots were matched in sheet order."
+                    )
+                consumed = consume(listed, tx.qty)
+            matched.append((position, _close_position(tx, consumed, sequence, warnings, method), warnings))
+
+    matched.sort(key=lambda match: match[0])
+    closed_positions = [closed for _, closed, _ in matched]
+    warnings = [warning for _, _, match_warnings in matched for warning in match_warnings]
     closed_positions.sort(
         key=lambda position: (
             position["close_date"] is None,
@@ -422,6 +473,370 @@ def _closed_positions_from_sell_transactions(
     return closed_positions, warnings
 
 
+def _close_position(
+    tx: LedgerRow,
+    consumed: Consumption,
+    sequence: int,
+    warnings: list[str],
+    method: str | None = None,
+) -> dict[str, Any]:
+    ticker = tx["ticker"]
+    qty_bought = 0.0
+    cost_basis = 0.0
+    consumed_lots: list[LedgerRow] = []
+    buy_row_numbers: list[int] = []
+
+    for lot, qty, cost in consumed:
+        qty_bought += qty
+        cost_basis += cost
+        consumed_lots.append(lot.row)
+
+        row_number = lot.row.row_number
+        if row_number is not None and row_number not in buy_row_numbers:
+            buy_row_numbers.append(row_number)
+
+    is_quantity_matched = abs(qty_bought - tx["qty"]) < 0.000001
+    if not is_quantity_matched:
+        if method in HEAP_METHODS:
+            available = f"only {qty_bought} shares were open in that account to match {method}."
+        else:
+            available = f"only {qty_bought} following Buy shares were available before the next Sell row."
+        warnings.append(f"Sell tab row {tx.get('row_number')} for {ticker} sold {tx['qty']} shares but {available}")
+
+    proceeds = tx["total"]
+    realized_gain = proceeds - cost_basis
+    return {
+        "closed_position_id": f"{ticker}-{tx.get('row_number') or sequence}",
+        "ticker": ticker,
+        "company": tx.get("company") or _representative_value(consumed_lots, "company"),
+        "category": tx.get("category") or _representative_value(consumed_lots, "category"),
+        "close_date": tx.get("date"),
+        "qty_bought": _json_number(qty_bought) or 0,
+        "qty_sold": _json_number(tx["qty"]) or 0,
+        "is_quantity_matched": is_quantity_matched,
+        "cost_basis": _json_number(cost_basis) or 0,
+        "proceeds": _json_number(proceeds) or 0,
+        "average_cost": _json_number(_divide(cost_basis, qty_bought)),
+        "sell_price": _json_number(tx["price_per_share"]),
+        "average_sell_price": _json_number(_divide(proceeds, tx["qty"])),
+        "realized_gain": _json_number(realized_gain) or 0,
+        "realized_gain_pct": _json_number(_pct(realized_gain, cost_basis)),
+        "first_buy_date": _min_date(consumed_lots),
+        "buy_transaction_count": len(buy_row_numbers),
+        "buy_row_numbers": buy_row_numbers,
+        "sell_row_number": tx.get("row_number"),
+    }
+
+
+class _Holdings:
+    """
+    Per-ticker aggregates of the Buy tab, kept in step with its ledger.
+
+    A holding carries the ticker's open tax lots (Sell rows on the tab applied by
+    their method, FIFO unless stated), quantity, cost basis, and the dates and
+    representative metadata indexed by the ledger. When the ledger only had rows
+    appended, only the tickers of those rows are recomputed; any other change
+    rebuilds everything.
+    Each recomputed holding gets a new ``version``. Fully sold tickers have none.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revision: int | None = None
+        self._holdings: dict[str, dict[str, Any]] = {}
+        self._versions = itertools.count(1)
+
+    def sync(self, loaded: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        ledger: Ledger = loaded["ledger"]
+        revision = loaded["revision"]
+        with self._lock:
+            if revision is not None and revision == self._revision:
+                return self._holdings
+
+            extends = loaded["extends"]
+            if revision is not None and extends is not None and extends[0] == self._revision:
+                holdings = dict(self._holdings)
+                changed = {row.ticker for row in ledger.rows[extends[1] :]}
+            else:
+                holdings = {}
+                changed = set(ledger.by_ticker)
+
+            for ticker in changed:
+                holding = self._holding(ledger, ticker)
+                if holding is None:
+                    holdings.pop(ticker, None)
+                else:
+                    holdings[ticker] = holding
+
+            # Unversioned (unreadable) ledgers are never kept
+            if revision is not None:
+                self._revision = revision
+                self._holdings = holdings
+            return holdings
+
+    def _holding(self, ledger: Ledger, ticker: str) -> dict[str, Any] | None:
+        metadata = ledger.metadata(ticker, "Buy")
+        if metadata is None:
+            return None
+        tax_lots = TaxLotLedger()
+        warnings: list[str] = []
+        for tx in ledger.rows_for(ticker):
+            if tx.action != "Sell":
+                tax_lots.add(tx)
+                continue
+            method = normalize_method(tx.cost_basis_method)
+            if method not in HEAP_METHODS:
+                if method == SPECIFIC_ID:
+                    warnings.append(
+                        f"Buy tab row {tx.row_number} for {ticker} uses Specific ID, which needs the lots "
+                        "listed after a Sell tab row; FIFO was used instead."
+                    )
+                elif method is not None:
+                    warnings.append(
+                        f"Buy tab row {tx.row_number} has unknown cost basis method '{method}'; "
+                        "FIFO was used instead."
+                    )
+                method = FIFO
+            consumed = tax_lots.sell(ticker, tx.account, tx.qty, method)
+            sold = sum(qty for _, qty, _ in consumed)
+            if abs(sold - tx.qty) >= QTY_EPSILON:
+                warnings.append(
+                    f"Buy tab row {tx.row_number} for {ticker} sold {tx.qty} shares "
+                    f"but only {sold} shares were open in that account."
+                )
+
+        lots = tax_lots.lots_for(ticker)
+        if all(lot.is_closed for lot in lots):
+            return None
+        return {
+            "version": next(self._versions),
+            "lots": lots,
+            "qty": sum(lot.remaining for lot in lots),
+            "total_cost_basis": sum(lot.cost for lot in lots),
+            "company": metadata.representative("company"),
+            "category": metadata.representative("category"),
+            "account": metadata.representative("account"),
+            "brokerage": metadata.representative("brokerage"),
+            "transaction_count": metadata.count,
+            "first_buy_date": metadata.first_date,
+            "last_buy_date": metadata.last_date,
+            "warnings": warnings,
+        }
+
+
+class _PositionBook:
+    """
+    Priced positions for one set of windows, with totals and sort order kept up to date.
+
+    A position is rebuilt only when its holding version, quote or reference prices
+    changed. The portfolio totals are adjusted by the difference between the old and
+    new position, and re-summed after as many updates as there are positions to keep
+    rounding drift bounded.
+    """
+
+    def __init__(self, windows: tuple[str, ...]):
+        self.windows = list(windows)
+        self.historical_windows = list(dict.fromkeys(DEFAULT_WINDOWS + self.windows))
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[tuple, dict[str, Any], tuple]] = {}
+        self._order: list[tuple] = []
+        self._sums = np.zeros(_TOTAL_PARTS)
+        self._updates = 0
+
+    def refresh(
+        self,
+        holdings: dict[str, dict[str, Any]],
+        price_data: dict[str, Any],
+        historical_prices: dict[str, dict[str, float]],
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        with self._lock:
+            for ticker in [ticker for ticker in self._entries if ticker not in holdings]:
+                self._remove(ticker)
+
+            stale = {}
+            for ticker, holding in holdings.items():
+                quote = price_data.get(ticker, {})
+                references = historical_prices.get(ticker, {})
+                inputs = (
+                    holding["version"],
+                    quote.get("current_price"),
+                    quote.get("day_change_decimal"),
+                    tuple(references.get(window) for window in self.historical_windows),
+                )
+                entry = self._entries.get(ticker)
+                if entry is None or entry[0] != inputs:
+                    stale[ticker] = inputs
+
+            tickers = list(stale)
+            positions = _build_positions(tickers, holdings, price_data, historical_prices, self.windows)
+            for ticker, position, parts in zip(tickers, positions, _total_parts(positions)):
+                if ticker in self._entries:
+                    self._remove(ticker)
+                self._add(ticker, stale[ticker], position, parts)
+
+            if self._updates > len(self._entries):
+                self._resum()
+            positions = [self._entries[key[-1]][1] for key in self._order]
+            return positions, self._totals()
+
+    def _add(self, ticker: str, inputs: tuple, position: dict[str, Any], parts: np.ndarray) -> None:
+        self._entries[ticker] = (inputs, position, parts)
+        insort(self._order, _position_sort_key(position) + (ticker,))
+        self._sums = self._sums + parts
+        self._updates += 1
+
+    def _remove(self, ticker: str) -> None:
+        _, position, parts = self._entries.pop(ticker)
+        key = _position_sort_key(position) + (ticker,)
+        del self._order[bisect_left(self._order, key)]
+        self._sums = self._sums - parts
+        self._updates += 1
+
+    def _resum(self) -> None:
+        self._sums = np.zeros(_TOTAL_PARTS)
+        if self._entries:
+            self._sums = np.sum([parts for _, _, parts in self._entries.values()], axis=0)
+        self._updates = 0
+
+    def _totals(self) -> dict[str, Any]:
+        return _totals_from_sums(self._sums, len(self._entries))
+
+
+_holdings = _Holdings()
+
+# total_cost_basis, priced cost basis, market_value, gain, day_change_value
+_TOTAL_PARTS = 5
+
+
+def _total_parts(positions: list[dict[str, Any]]) -> np.ndarray:
+    """One row of summable parts per position, with missing values counted as zero."""
+
+    cost = _column([pos["total_cost_basis"] for pos in positions])
+    market_value = _column([pos["market_value"] for pos in positions])
+    parts = np.column_stack(
+        [
+            cost,
+            np.where(np.isnan(market_value), np.nan, cost),
+            market_value,
+            _column([pos["gain"] for pos in positions]),
+            _column([pos["day_change_value"] for pos in positions]),
+        ]
+    ).reshape(len(positions), _TOTAL_PARTS)
+    return np.where(np.isnan(parts), 0.0, parts)
+
+
+def _position_sort_key(position: dict[str, Any]) -> tuple:
+    return position["day_change_pct"] is None, -(position["day_change_pct"] or 0)
+
+
+def _position_book(windows: tuple[str, ...]) -> _PositionBook:
+    with _books_lock:
+        book = _books.pop(windows, None) or _PositionBook(windows)
+        _books[windows] = book
+        while len(_books) > MAX_POSITION_BOOKS:
+            _books.pop(next(iter(_books)))
+        return book
+
+
+_CHANGE_FIELDS = {
+    "change_7d_pct": "7D",
+    "change_1m_pct": "1M",
+    "change_3m_pct": "3M",
+    "change_6m_pct": "6M",
+    "change_1y_pct": "1Y",
+}
+
+
+def _build_positions(
+    tickers: list[str],
+    holdings: dict[str, dict[str, Any]],
+    price_data: dict[str, Any],
+    historical_prices: dict[str, dict[str, float]],
+    windows: list[str],
+) -> list[dict[str, Any]]:
+    """
+    Priced positions for ``tickers``, computed as array operations over all of them.
+
+    Missing quotes and reference prices become NaN, and every NaN result is reported
+    as None, so the output matches a position computed on its own.
+    """
+    held = [holdings[ticker] for ticker in tickers]
+    quotes = [price_data.get(ticker, {}) for ticker in tickers]
+    qty = _column([holding["qty"] for holding in held])
+    total_cost_basis = _column([holding["total_cost_basis"] for holding in held])
+    current_price = _column([quote.get("current_price") for quote in quotes])
+    day_change_decimal = _column([quote.get("day_change_decimal") for quote in quotes])
+    priced = ~np.isnan(current_price)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_cost = np.where(qty != 0, total_cost_basis / qty, np.nan)
+        market_value = qty * current_price
+        gain = market_value - total_cost_basis
+        gain_pct = np.where(total_cost_basis != 0, 100 * gain / total_cost_basis, np.nan)
+        day_change_pct = np.where(priced, day_change_decimal * 100, np.nan)
+        day_change_value = np.where(
+            day_change_decimal != -1, market_value * day_change_decimal / (1 + day_change_decimal), np.nan
+        )
+        changes = {}
+        for window in dict.fromkeys(list(_CHANGE_FIELDS.values()) + windows):
+            reference = _column([historical_prices.get(ticker, {}).get(window) for ticker in tickers])
+            reference[reference == 0] = np.nan
+            changes[window] = _json_column(100 * (current_price - reference) / reference)
+
+    columns = {
+        "qty": _json_column(qty),
+        "current_price": _json_column(current_price),
+        "day_change_pct": _json_column(day_change_pct),
+        "day_change_value": _json_column(day_change_value),
+        "average_cost": _json_column(average_cost),
+        "total_cost_basis": _json_column(total_cost_basis),
+        "market_value": _json_column(market_value),
+        "gain": _json_column(gain),
+        "gain_pct": _json_column(gain_pct),
+    }
+    positions = []
+    for index, (ticker, holding) in enumerate(zip(tickers, held)):
+        position = {
+            "ticker": ticker,
+            "company": holding["company"],
+            "category": holding["category"],
+            "account": holding["account"],
+            "brokerage": holding["brokerage"],
+        }
+        position.update((key, column[index]) for key, column in columns.items())
+        position.update((field, changes[window][index]) for field, window in _CHANGE_FIELDS.items())
+        position["changes"] = {window: changes[window][index] for window in windows}
+        position["transaction_count"] = holding["transaction_count"]
+        position["first_buy_date"] = holding["first_buy_date"]
+        position["last_buy_date"] = holding["last_buy_date"]
+        positions.append(position)
+    return positions
+
+
+def _column(values: list[float | None]) -> np.ndarray:
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+def _json_column(values: np.ndarray) -> list[float | None]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _lot_view(lot: TaxLot, as_of: date) -> dict[str, Any]:
+    holding_days = lot.holding_days(as_of)
+    return {
+        "ticker": lot.row.ticker,
+        "account": lot.row.account,
+        "brokerage": lot.row.brokerage,
+        "acquired_date": lot.row.date,
+        "qty": _json_number(lot.remaining) or 0,
+        "cost_per_share": _json_number(lot.cost_per_share),
+        "cost_basis": _json_number(lot.cost) or 0,
+        "holding_period_days": holding_days,
+        "term": None if holding_days is None else ("long" if holding_days > LONG_TERM_DAYS else "short"),
+        "row_number": lot.row.row_number,
+    }
+
+
 def _aggregate_realized_positions(
     closed_positions: list[dict[str, Any]],
 ) -> list[dict[str, Any]]:
@@ -500,56 +915,342 @@ def _load_tab(
     worksheet_index: int | None,
     source: SourceName,
 ) -> dict[str, Any]:
-    warnings: list[str] = []
+    return memoized(("tab", source), lambda: _read_tab(worksheet_name, worksheet_index, source))
+
+
+def _read_tab(
+    worksheet_name: str,
+    worksheet_index: int | None,
+    source: SourceName,
+) -> dict[str, Any]:
     try:
-        values = worksheet_values(
-            worksheet_name=worksheet_name,
-            worksheet_index=worksheet_index,
-        )
+        values = get_transaction_source().worksheet_values(worksheet_name, worksheet_index)
     except Exception as exc:
-        return {
-            "transactions": [],
-            "warnings": [f"Unable to read {worksheet_name} worksheet: {exc}"],
-        }
+        values = exc
+    return _with_staleness(_parse_tab(values, worksheet_name, source), worksheet_name, worksheet_index)
+
+
+def _with_staleness(loaded: dict[str, Any], worksheet_name: str, worksheet_index: int | None) -> dict[str, Any]:
+    # Parsed ledgers are cached with their own warnings, so staleness is added per load
+    age = get_transaction_source().staleness(worksheet_name, worksheet_index)
+    if age is None:
+        return loaded
+    stale_warning = f"{worksheet_name} worksheet could not be refreshed; using data last synced {format_age(age)} ago."
+    return loaded | {"warnings": _unique_warnings(loaded["warnings"] + [stale_warning])}
+
+
+def _parse_tab(
+    values: list[list[str]] | Exception,
+    worksheet_name: str,
+    source: SourceName,
+) -> dict[str, Any]:
+    if isinstance(values, Exception):
+        return _loaded_ledger(Ledger(), [f"Unable to read {worksheet_name} worksheet: {values}"])
 
     if not values:
-        return {
-            "transactions": [],
-            "warnings": [f"{worksheet_name} worksheet is empty."],
+        return _loaded_ledger(Ledger(), [f"{worksheet_name} worksheet is empty."])
+
+    # Request threads, the MCP server and the price refresher share the cache; one
+    # read-extend-store at a time keeps an extension from being built on a stale entry
+    with _ledger_lock:
+        return _parse_values(values, worksheet_name, source)
+
+
+def _parse_values(values: list[list[str]], worksheet_name: str, source: SourceName) -> dict[str, Any]:
+    warnings: list[str] = []
+    cached = _ledger_cache.get((worksheet_name, source))
+    if (
+        cached is not None
+        and not sheet_cache.full_sync_due(cached["parsed_at"], cached["appends"])
+        and _extends_synced_rows(cached, values)
+    ):
+        ledger = cached["ledger"]
+        warnings = cached["warnings"]
+        if len(values) > cached["row_count"]:
+            warnings = list(warnings)
+            new_rows = _normalize_rows(
+                cached["headers"],
+                values[cached["row_count"] :],
+                cached["row_count"] + 1,
+                source,
+                worksheet_name,
+                warnings,
+            )
+            extends = (cached["revision"], len(ledger))
+            ledger = ledger.extended(new_rows)
+            cached = cached | {
+                "revision": next(_ledger_revisions),
+                "extends": extends,
+                "appends": cached["appends"] + 1,
+            }
+    else:
+        headers = [_clean_header(header) for header in values[0]]
+        if "Price per share" in headers and CN.COST_PRICE not in headers:
+            headers = [CN.COST_PRICE if header == "Price per share" else header for header in headers]
+
+        present = set(headers)
+        for column in EXPECTED_COLUMNS:
+            if column not in present:
+                warnings.append(f"{worksheet_name} worksheet is missing column '{column}'.")
+
+        ledger = Ledger(_normalize_rows(headers, values[1:], 2, source, worksheet_name, warnings))
+        cached = {
+            "raw_header": values[0],
+            "headers": headers,
+            "revision": next(_ledger_revisions),
+            "extends": None,
+            "parsed_at": time.time(),
+            "appends": 0,
         }
 
-    headers = [_clean_header(header) for header in values[0]]
-    if "Price per share" in headers and CN.COST_PRICE not in headers:
-        headers = [CN.COST_PRICE if header == "Price per share" else header for header in headers]
+    window = min(sheet_cache.sync_window(), len(values) - 1)
+    _ledger_cache[(worksheet_name, source)] = cached | {
+        "values": values,
+        "row_count": len(values),
+        "tail_rows": window,
+        "tail_hash": sheet_cache.rows_hash(values[len(values) - window :]),
+        "ledger": ledger,
+        "warnings": warnings,
+    }
+    return _loaded_ledger(ledger, warnings, cached["revision"], cached["extends"])
+
+
+def _loaded_ledger(
+    ledger: Ledger,
+    warnings: list[str],
+    revision: int | None = None,
+    extends: tuple[int, int] | None = None,
+) -> dict[str, Any]:
+    """``extends`` is ``(revision, row count)`` of the ledger this one appended rows to."""
+
+    return {
+        "transactions": ledger.rows,
+        "ledger": ledger,
+        "revision": revision,
+        "extends": extends,
+        "warnings": _unique_warnings(warnings),
+    }
+
+
+def _extends_synced_rows(cached: dict[str, Any], values: list[list[str]]) -> bool:
+    """Whether ``values`` is the previously synced ledger with rows appended at the end."""
+
+    if values is cached["values"]:
+        return True
+    row_count = cached["row_count"]
+    if len(values) < row_count or values[0] != cached["raw_header"]:
+        return False
+    tail = values[row_count - cached["tail_rows"] : row_count]
+    return sheet_cache.rows_hash(tail) == cached["tail_hash"]
 
-    rows = []
-    for offset, row in enumerate(values[1:], start=2):
-        padded = row + [""] * max(0, len(headers) - len(row))
-        rows.append(dict(zip(headers, padded, strict=False)) | {"row_number": offset})
 
-    present = set(headers)
-    for column in EXPECTED_COLUMNS:
-        if column not in present:
-            warnings.append(f"{worksheet_name} worksheet is missing column '{column}'.")
+def _normalize_rows(
+    headers: list[str],
+    rows: list[list[str]],
+    first_row_number: int,
+    source: SourceName,
+    worksheet_name: str,
+    warnings: list[str],
+) -> list[LedgerRow]:
+    if len(rows) >= COLUMNAR_MIN_ROWS:
+        return _normalize_columns(headers, rows, first_row_number, source, worksheet_name, warnings)
 
     transactions = []
-    for raw in rows:
+    for offset, row in enumerate(rows, start=first_row_number):
+        padded = row + [""] * max(0, len(headers) - len(row))
+        raw = dict(zip(headers, padded, strict=False)) | {"row_number": offset}
         tx = _normalize_transaction(raw, source, worksheet_name, warnings)
         if tx:
             transactions.append(tx)
+    return transactions
 
-    return {
-        "transactions": transactions,
-        "warnings": _unique_warnings(warnings),
+
+def _normalize_columns(
+    headers: list[str],
+    rows: list[list[str]],
+    first_row_number: int,
+    source: SourceName,
+    worksheet_name: str,
+    warnings: list[str],
+) -> list[LedgerRow]:
+    """
+    Columnar equivalent of running _normalize_transaction() over every row.
+
+    Dates and numbers are converted once per distinct value and for whole columns,
+    and warnings are emitted by mask in the same row order as the row-wise path.
+    """
+    positions = {header: index for index, header in enumerate(headers)}
+
+    def column(name: str) -> list[str | None]:
+        index = positions.get(name)
+        if index is None:
+            return [None] * len(rows)
+        return [row[index] if index < len(row) else "" for row in rows]
+
+    row_numbers = range(first_row_number, first_row_number + len(rows))
+    pending: list[tuple[int, int, str]] = []
+
+    tickers = [_normalize_ticker(value) for value in column(CN.TICKER)]
+    raw_actions = column("Action")
+    actions = []
+    keep = []
+    for index, (ticker, raw_action) in enumerate(zip(tickers, raw_actions)):
+        row_number = row_numbers[index]
+        if not ticker:
+            pending.append((index, 0, f"{worksheet_name} row {row_number} has a blank ticker and was skipped."))
+            continue
+        action = _clean_string(raw_action)
+        if not action and source == SOURCE_OPEN:
+            action = "Buy"
+        elif action:
+            action = action.title()
+        if action not in {"Buy", "Sell"}:
+            pending.append(
+                (
+                    index,
+                    0,
+                    f"{worksheet_name} row {row_number} has unsupported action '{raw_action}' and was skipped.",
+                )
+            )
+            continue
+        keep.append(index)
+        actions.append(action)
+
+    def kept(name: str) -> list[str | None]:
+        values = column(name)
+        return [values[index] for index in keep]
+
+    kept_rows = [row_numbers[index] for index in keep]
+    dates = _normalize_date_column(kept("Date"), keep, kept_rows, worksheet_name, pending)
+    qty = _normalize_number_column(kept(CN.QTY), CN.QTY, 2, keep, kept_rows, worksheet_name, pending)
+    price = _normalize_number_column(
+        kept(CN.COST_PRICE), CN.COST_PRICE, 3, keep, kept_rows, worksheet_name, pending
+    )
+    total = _normalize_number_column(kept(CN.TOTAL), CN.TOTAL, 4, keep, kept_rows, worksheet_name, pending)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = np.where((price == 0) & (qty != 0), total / np.where(qty != 0, qty, 1), price)
+        price = np.where(np.isnan(price), 0.0, price)
+        total = np.where((total == 0) & (qty != 0) & (price != 0), qty * price, total)
+
+    pending.sort(key=lambda item: (item[0], item[1]))
+    warnings.extend(message for _, _, message in pending)
+
+    brokerages = [_clean_string(value) for value in kept("Brokerage")]
+    accounts = [_clean_string(value) for value in kept("Account")]
+    categories = [_clean_string(value) for value in kept("Category")]
+    companies = [_clean_string(value) for value in kept(CN.NAME)]
+    methods = [_clean_string(value) for value in kept("Cost Basis Method")]
+
+    return [
+        LedgerRow(
+            date=dates[i],
+            source=source,
+            brokerage=brokerages[i],
+            account=accounts[i],
+            category=categories[i],
+            company=companies[i],
+            ticker=tickers[index],
+            action=actions[i],
+            cost_basis_method=methods[i],
+            qty=_json_number(qty[i]) or 0,
+            price_per_share=_json_number(price[i]) or 0,
+            total=_json_number(total[i]) or 0,
+            row_number=kept_rows[i],
+        )
+        for i, index in enumerate(keep)
+    ]
+
+
+def _normalize_date_column(
+    values: list[str | None],
+    indexes: list[int],
+    row_numbers: list[int],
+    worksheet_name: str,
+    pending: list[tuple[int, int, str]],
+) -> list[str | None]:
+    distinct = {value for value in values if not _is_blank(value)}
+    by_format: dict[str | None, list[str]] = defaultdict(list)
+    for value in distinct:
+        by_format[guess_datetime_format(str(value))].append(value)
+
+    # Parsing each guessed-format group, and dateutil-style "mixed" parsing for the
+    # rest, matches calling pd.to_datetime() on every value individually.
+    parsed: dict[str, Any] = {}
+    for date_format, group in by_format.items():
+        try:
+            converted = pd.to_datetime(
+                pd.Series(group, dtype=object),
+                format=date_format or "mixed",
+                errors="coerce",
+            )
+            parsed.update(zip(group, converted))
+        except (ValueError, TypeError):
+            parsed.update((value, pd.to_datetime(value, errors="coerce")) for value in group)
+
+    iso = {
+        value: None if pd.isna(timestamp) else timestamp.date().isoformat()
+        for value, timestamp in parsed.items()
     }
 
+    dates: list[str | None] = []
+    for value, index, row_number in zip(values, indexes, row_numbers):
+        if _is_blank(value):
+            dates.append(None)
+            continue
+        date_value = iso[value]
+        if date_value is None:
+            pending.append((index, 1, f"{worksheet_name} row {row_number} has an invalid date: {value}."))
+        dates.append(date_value)
+    return dates
+
+
+def _normalize_number_column(
+    values: list[str | None],
+    column: str,
+    order: int,
+    indexes: list[int],
+    row_numbers: list[int],
+    worksheet_name: str,
+    pending: list[tuple[int, int, str]],
+) -> np.ndarray:
+    blank = np.array([_is_blank(value) for value in values], dtype=bool)
+    cleaned = pd.Series(
+        ["" if is_blank else str(value).replace("$", "").replace(",", "").strip()
+         for value, is_blank in zip(values, blank)],
+        dtype=object,
+    )
+    numbers = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    invalid = np.isnan(numbers) & ~blank
+
+    for position in np.flatnonzero(blank):
+        pending.append(
+            (indexes[position], order, f"{worksheet_name} row {row_numbers[position]} has a blank {column}; using 0.")
+        )
+    for position in np.flatnonzero(invalid):
+        pending.append(
+            (
+                indexes[position],
+                order,
+                f"{worksheet_name} row {row_numbers[position]} has invalid {column}: {values[position]}; using 0.",
+            )
+        )
+
+    return np.where(blank | invalid, 0.0, numbers)
+
+
+def _tab_spec(source: SourceName) -> tuple[str, int | None]:
+    if source == SOURCE_OPEN:
+        return os.getenv("BUY_WORKSHEET", BUY_WORKSHEET), 0
+    return os.getenv("SELL_WORKSHEET", SELL_WORKSHEET), None
+
 
 def _normalize_transaction(
     raw: dict[str, Any],
     source: SourceName,
     worksheet_name: str,
     warnings: list[str],
-) -> dict[str, Any] | None:
+) -> LedgerRow | None:
     row_number = raw.get("row_number")
     ticker = _normalize_ticker(raw.get(CN.TICKER))
     if not ticker:
@@ -584,30 +1285,30 @@ def _normalize_transaction(
     if total == 0 and qty and price:
         total = qty * price
 
-    return {
-        "date": date_value,
-        "source": source,
-        "brokerage": _clean_string(raw.get("Brokerage")),
-        "account": _clean_string(raw.get("Account")),
-        "category": _clean_string(raw.get("Category")),
-        "company": _clean_string(raw.get(CN.NAME)),
-        "ticker": ticker,
-        "action": action,
-        "cost_basis_method": _clean_string(raw.get("Cost Basis Method")),
-        "qty": _json_number(qty) or 0,
-        "price_per_share": _json_number(price) or 0,
-        "total": _json_number(total) or 0,
-        "row_number": row_number,
-    }
+    return LedgerRow(
+        date=date_value,
+        source=source,
+        brokerage=_clean_string(raw.get("Brokerage")),
+        account=_clean_string(raw.get("Account")),
+        category=_clean_string(raw.get("Category")),
+        company=_clean_string(raw.get(CN.NAME)),
+        ticker=ticker,
+        action=action,
+        cost_basis_method=_clean_string(raw.get("Cost Basis Method")),
+        qty=_json_number(qty) or 0,
+        price_per_share=_json_number(price) or 0,
+        total=_json_number(total) or 0,
+        row_number=row_number,
+    )
 
 
-def _load_current_prices(by_ticker: dict[str, list[dict[str, Any]]]) -> tuple[dict[str, Any], list[str]]:
+def _load_current_prices(holdings: dict[str, dict[str, Any]]) -> tuple[dict[str, Any], list[str]]:
     warnings: list[str] = []
     price_data: dict[str, Any] = {}
     stock_tickers = []
     crypto_tickers = []
-    for ticker, rows in by_ticker.items():
-        if _representative_value(rows, "category") == "Cryptocurrency":
+    for ticker, holding in holdings.items():
+        if holding["category"] == "Cryptocurrency":
             crypto_tickers.append(ticker)
         else:
             stock_tickers.append(ticker)
@@ -637,17 +1338,57 @@ def _load_current_prices(by_ticker: dict[str, list[dict[str, Any]]]) -> tuple[di
                 "day_change_decimal": day_change,
             }
 
+    for ticker, age in sorted(stale_quote_ages(price_data).items()):
+        warnings.append(f"Current price for {ticker} is stale (fetched {format_age(age)} ago).")
     return price_data, warnings
 
 
+def _snapshot_inputs(windows: tuple[str, ...]) -> tuple | None:
+    loaded = load_buy_transactions()
+    if loaded["revision"] is None:
+        return None
+    stamps = quote_stamps(loaded["ledger"].tickers())
+    if stamps is None:
+        return None
+    return loaded["revision"], tuple(sorted(stamps.items())), date.today().isoformat(), windows
+
+
+def _build_snapshot(windows: tuple[str, ...]) -> dict[str, Any]:
+    enriched = get_enriched_open_positions(windows=list(windows))
+    positions = enriched["positions"]
+    return enriched | {
+        "totals": enriched.get("totals") or _portfolio_totals(positions, enriched["transaction_count"]),
+        "allocations": {group_by: _allocations(positions, group_by) for group_by in GROUP_BYS},
+    }
+
+
+_snapshots = SnapshotEngine(_snapshot_inputs, _build_snapshot)
+
+
+def _load_historical_prices(tickers: list[str], windows: list[str]) -> tuple[dict[str, Any], list[str]]:
+    if not tickers:
+        return {}, []
+    try:
+        prices = get_historical_prices(tickers, windows)
+    except Exception as exc:
+        return {}, [f"Historical price lookup failed: {exc}"]
+
+    warnings = []
+    for ticker, last_day in sorted(unsynced_history(tickers).items()):
+        if last_day is None:
+            warnings.append(f"Historical prices for {ticker} are unavailable; the price history could not be fetched.")
+        else:
+            warnings.append(f"Historical prices for {ticker} are stale (stored bars end {last_day}).")
+    return prices, warnings
+
+
 def _portfolio_totals(positions: list[dict[str, Any]], transaction_count: int) -> dict[str, Any]:
-    total_cost_basis = sum(pos["total_cost_basis"] or 0 for pos in positions)
-    priced_cost_basis = sum(
-        pos["total_cost_basis"] or 0 for pos in positions if pos["market_value"] is not None
-    )
-    market_value = sum(pos["market_value"] or 0 for pos in positions)
-    gain = sum(pos["gain"] or 0 for pos in positions)
-    day_change_value = sum(pos["day_change_value"] or 0 for pos in positions)
+    sums = _total_parts(positions).sum(axis=0)
+    return _totals_from_sums(sums, len(positions)) | {"transaction_count": transaction_count}
+
+
+def _totals_from_sums(sums: list[float], position_count: int) -> dict[str, Any]:
+    total_cost_basis, priced_cost_basis, market_value, gain, day_change_value = sums
     previous_market_value = market_value - day_change_value
 
     return {
@@ -657,8 +1398,7 @@ def _portfolio_totals(positions: list[dict[str, Any]], transaction_count: int) -
         "gain_pct": _json_number(_pct(gain, priced_cost_basis)),
         "day_change_pct": _json_number(_pct(day_change_value, previous_market_value)),
         "day_change_value": _json_number(day_change_value),
-        "position_count": len(positions),
-        "transaction_count": transaction_count,
+        "position_count": position_count,
     }
 
 
@@ -696,26 +1436,12 @@ def _allocations(positions: list[dict[str, Any]], group_by: str) -> list[dict[st
     return allocations
 
 
-def _transaction_view(tx: dict[str, Any]) -> dict[str, Any]:
-    return {key: tx.get(key) for key in TRANSACTION_KEYS}
-
-
-def _historical_change(
-    current_price: float | None,
-    historical_prices: dict[str, dict[str, float]],
-    ticker: str,
-    period: str,
-) -> float | None:
-    historical_price = historical_prices.get(ticker, {}).get(period)
-    if current_price is None or not historical_price:
-        return None
-    return _json_number(_pct(current_price - historical_price, historical_price))
+def _transaction_view(tx: LedgerRow) -> dict[str, Any]:
+    return tx.as_dict()
 
 
-def _day_change_value(market_value: float, day_change_decimal: float | None) -> float | None:
-    if day_change_decimal is None or day_change_decimal == -1:
-        return None
-    return _json_number(market_value * day_change_decimal / (1 + day_change_decimal))
+def _transaction_sort_key(tx: LedgerRow) -> tuple[bool, str, str, int]:
+    return (tx.date is None, tx.date or "", tx.source, tx.row_number or 0)
 
 
 def _representative_value(rows: list[dict[str, Any]], key: str) -> str | None:
@@ -738,11 +1464,6 @@ def _min_date(rows: list[dict[str, Any]]) -> str | None:
     return min(dates) if dates else None
 
 
-def _max_date(rows: list[dict[str, Any]]) -> str | None:
-    dates = [row["date"] for row in rows if row.get("date")]
-    return max(dates) if dates else None
-
-
 def _row_sort_key(row: dict[str, Any]) -> tuple[str, int]:
     return (row.get("date") or "", row.get("row_number") or 0)
 
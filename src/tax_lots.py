@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import heapq
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import date
+
+from src.ledger import LedgerRow
+
+FIFO = "FIFO"
+LIFO = "LIFO"
+HIFO = "HIFO"
+SPECIFIC_ID = "Specific ID"
+HEAP_METHODS = [FIFO, LIFO, HIFO]
+
+LONG_TERM_DAYS = 365
+QTY_EPSILON = 0.000001
+
+_METHOD_ALIASES = {
+    "FIFO": FIFO,
+    "FIRSTINFIRSTOUT": FIFO,
+    "LIFO": LIFO,
+    "LASTINFIRSTOUT": LIFO,
+    "HIFO": HIFO,
+    "HIGHESTINFIRSTOUT": HIFO,
+    "HIGHESTCOST": HIFO,
+    "SPECIFICID": SPECIFIC_ID,
+    "SPECID": SPECIFIC_ID,
+    "SPECIFICLOT": SPECIFIC_ID,
+    "SPECIFICIDENTIFICATION": SPECIFIC_ID,
+}
+
+
+def normalize_method(value: str | None) -> str | None:
+    """Canonical cost basis method for a sheet value; None when blank, the raw value when unknown."""
+
+    if value is None or not value.strip():
+        return None
+    key = "".join(char for char in value.upper() if char.isalnum())
+    return _METHOD_ALIASES.get(key, value.strip())
+
+
+class TaxLot:
+    """The still-open part of one acquisition row; cost shrinks in proportion to quantity."""
+
+    __slots__ = ["row", "sequence", "remaining", "cost"]
+
+    def __init__(self, row: LedgerRow, sequence: int):
+        self.row = row
+        self.sequence = sequence
+        self.remaining = row.qty
+        self.cost = row.total
+
+    @property
+    def is_closed(self) -> bool:
+        return self.row.qty > 0 and self.remaining <= QTY_EPSILON
+
+    @property
+    def cost_per_share(self) -> float | None:
+        return self.row.total / self.row.qty if self.row.qty else None
+
+    def holding_days(self, as_of: date) -> int | None:
+        acquired = _parse_date(self.row.date)
+        return None if acquired is None else (as_of - acquired).days
+
+    def take(self, qty: float) -> float:
+        """Remove ``qty`` shares from the lot and return their cost."""
+
+        cost = self.cost * qty / self.remaining
+        self.remaining -= qty
+        self.cost -= cost
+        if self.remaining <= QTY_EPSILON:
+            self.remaining = 0.0
+            self.cost = 0.0
+        return cost
+
+
+Consumption = list[tuple[TaxLot, float, float]]
+
+
+def consume(lots: Iterable[TaxLot], qty: float) -> Consumption:
+    """
+    Take ``qty`` shares from ``lots`` in the order given.
+
+    Returns ``(lot, shares taken, their cost)`` per lot touched. Lots without
+    shares are skipped; iteration stops as soon as the quantity is covered.
+    """
+    consumed = []
+    qty_remaining = qty
+    for lot in lots:
+        if qty_remaining <= QTY_EPSILON:
+            break
+        if lot.remaining <= 0:
+            continue
+        taken = min(lot.remaining, qty_remaining)
+        consumed.append((lot, taken, lot.take(taken)))
+        qty_remaining -= taken
+    return consumed
+
+
+class _LotPool:
+    """
+    Open lots of one ticker in one account.
+
+    The heap for a method is only built when a sale first uses it, so pools that
+    are only ever matched positionally cost nothing beyond the list of lots.
+    """
+
+    def __init__(self):
+        self.lots: list[TaxLot] = []
+        self.heaps: dict[str, list[tuple]] = {}
+
+    def add(self, lot: TaxLot) -> None:
+        if lot.remaining <= 0:
+            return
+        self.lots.append(lot)
+        for method, heap in self.heaps.items():
+            heapq.heappush(heap, _heap_entry(method, lot))
+
+    def ordered(self, method: str) -> Iterator[TaxLot]:
+        heap = self.heaps.get(method)
+        if heap is None:
+            heap = self.heaps[method] = [_heap_entry(method, lot) for lot in self.lots if lot.remaining > 0]
+            heapq.heapify(heap)
+        # Closed lots are dropped lazily when they surface
+        while heap:
+            lot = heap[0][-1]
+            if lot.remaining <= 0:
+                heapq.heappop(heap)
+                continue
+            yield lot
+
+
+def _heap_entry(method: str, lot: TaxLot) -> tuple:
+    if method == HIFO:
+        return -(lot.cost_per_share or 0), lot.sequence, lot
+    acquired = _parse_date(lot.row.date)
+    ordinal = acquired.toordinal() if acquired else 0
+    if method == LIFO:
+        return acquired is None, -ordinal, -lot.sequence, lot
+    return acquired is None, ordinal, lot.sequence, lot
+
+
+class TaxLotLedger:
+    """
+    Open tax lots per ticker and account.
+
+    Acquisitions are added in sheet order; a sale takes shares from the lots of its
+    ticker and account in FIFO (oldest first), LIFO (newest first) or HIFO (highest
+    cost per share first) order. Each lot taken costs O(log n). Specific ID sales
+    pass the identified lots to consume() directly.
+    """
+
+    def __init__(self):
+        self._pools: dict[tuple[str, str | None], _LotPool] = defaultdict(_LotPool)
+        self._lots: dict[str, list[TaxLot]] = defaultdict(list)
+        self._sequence = 0
+
+    def add(self, row: LedgerRow) -> TaxLot:
+        lot = TaxLot(row, self._sequence)
+        self._sequence += 1
+        self._pools[(row.ticker, row.account)].add(lot)
+        self._lots[row.ticker].append(lot)
+        return lot
+
+    def sell(self, ticker: str, account: str | None, qty: float, method: str = FIFO) -> Consumption:
+        pool = self._pools.get((ticker, account))
+        if pool is None:
+            return []
+        return consume(pool.ordered(method), qty)
+
+    def lots_for(self, ticker: str) -> list[TaxLot]:
+        """Every lot ever added for ``ticker`` in sheet order, including closed ones."""
+
+        return self._lots.get(ticker, [])
+
+
+def _parse_date(value: str | None) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date
+
+import pandas as pd
+
+STORE_PATH = "../../.cache/prices.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    day TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (ticker, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT PRIMARY KEY,
+    history_start TEXT NOT NULL,
+    checked_on TEXT NOT NULL
+);
+"""
+
+_lock = threading.Lock()
+_initialized: set[str] = set()
+
+
+def store_path() -> str:
+    configured = os.getenv("PRICE_STORE_PATH")
+    if configured:
+        return configured
+    cur_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.normpath(os.path.join(cur_dir, STORE_PATH))
+
+
+def coverage(tickers: list[str]) -> dict[str, dict[str, str | None]]:
+    """
+    Per stored ticker: the earliest day history was requested from, the day it was
+    last synced, and its latest stored bar.
+    """
+
+    if not tickers:
+        return {}
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT c.ticker, c.history_start, c.checked_on, MAX(b.day)
+            FROM coverage c LEFT JOIN bars b ON b.ticker = c.ticker
+            WHERE c.ticker IN ({_placeholders(tickers)})
+            GROUP BY c.ticker
+            """,
+            tickers,
+        ).fetchall()
+    return {
+        ticker: {"history_start": history_start, "checked_on": checked_on, "last_day": last_day}
+        for ticker, history_start, checked_on, last_day in rows
+    }
+
+
+def load_bars(tickers: list[str], start: date) -> dict[str, pd.DataFrame]:
+    """Stored bars from ``start`` on, as DataFrames indexed by date like a provider's history."""
+
+    if not tickers:
+        return {}
+    with closing(_connect()) as conn:
+        df = pd.read_sql_query(
+            f"""
+            SELECT ticker, day, open, high, low, close, volume FROM bars
+            WHERE ticker IN ({_placeholders(tickers)}) AND day >= ?
+            ORDER BY ticker, day
+            """,
+            conn,
+            params=[*tickers, start.isoformat()],
+        )
+
+    df = df.rename(columns={"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"})
+    df["day"] = pd.to_datetime(df["day"])
+    return {ticker: bars.drop(columns="ticker").set_index("day").rename_axis("Date") for ticker, bars in df.groupby("ticker")}
+
+
+def save_bars(
+    ticker: str,
+    bars: pd.DataFrame,
+    history_start: date,
+    checked_on: date,
+    replace: bool = False,
+) -> None:
+    """Upsert daily bars for ``ticker``; ``replace`` first drops everything stored for it."""
+
+    rows = []
+    for day, bar in bars.iterrows():
+        if pd.isna(bar.get("Close")):
+            continue
+        rows.append(
+            (
+                ticker,
+                pd.Timestamp(day).date().isoformat(),
+                *(_float_or_none(bar.get(column)) for column in ["Open", "High", "Low", "Close", "Volume"]),
+            )
+        )
+
+    with closing(_connect()) as conn, conn:
+        if replace:
+            conn.execute("DELETE FROM bars WHERE ticker = ?", (ticker,))
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            """
+            INSERT INTO coverage VALUES (?, ?, ?)
+            ON CONFLICT(ticker) DO UPDATE SET
+                history_start = MIN(history_start, excluded.history_start),
+                checked_on = excluded.checked_on
+            """,
+            (ticker, history_start.isoformat(), checked_on.isoformat()),
+        )
+
+
+def mark_checked(tickers: list[str], history_start: date, checked_on: date) -> None:
+    """Record that ``tickers`` were synced on ``checked_on`` even though nothing new was stored."""
+
+    with closing(_connect()) as conn, conn:
+        conn.executemany(
+            """
+            INSERT INTO coverage VALUES (?, ?, ?)
+            ON CONFLICT(ticker) DO UPDATE SET checked_on = excluded.checked_on
+            """,
+            [(ticker, history_start.isoformat(), checked_on.isoformat()) for ticker in tickers],
+        )
+
+
+def _connect() -> sqlite3.Connection:
+    path = store_path()
+    with _lock:
+        if path not in _initialized:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with closing(sqlite3.connect(path, timeout=30)) as conn:
+                conn.executescript(_SCHEMA)
+            _initialized.add(path)
+    return sqlite3.connect(path, timeout=30)
+
+
+def _placeholders(values: list) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def _float_or_none(value) -> float | None:
+    return None if value is None or pd.isna(value) else float(value)
@@ -1,26 +1,132 @@
 #!/usr/bin/env python
 
 import json
+import logging
 import os
-from datetime import date
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
 
 from src.config.ColumnNameConsts import ColumnNames as CN
+from src.util import sheet_cache
+from src.util.resilience import BudgetExhausted, CircuitOpen, get_breaker, remaining_budget
+from src.util.single_flight import SingleFlight
 
 import gspread
 import pandas as pd
 from dotenv import load_dotenv
+from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import absolute_range_name, fill_gaps, rowcol_to_a1
+from requests.adapters import HTTPAdapter
 
 CONFIG_DIR = "../../config"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_SHEETS_TIMEOUT = 30
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+NET_WORTH_WORKSHEET = "Net Worth"
+NET_WORTH_HEADERS = ["Date", "Total", "Market Value", "Gain", "Gain%", "Day Change", "Day Change Value", "Updated At"]
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.RLock()
+_spreadsheets = {}
+_worksheets = {}
+_net_worth_indexes = {}
+_worksheet_flights = SingleFlight()
+# (sheet_id, cache key) -> when the cached copy served after a failed refresh was last synced
+_stale_served = {}
 
 load_dotenv()
 
 def load_gspread():
+    """
+    Return the process-wide gspread client, authorizing on first use.
+
+    The client keeps one pooled HTTP session for the life of the process and its
+    OAuth token is refreshed shortly before it expires rather than per call.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _authorize()
+            _mount_connection_pool(_client)
+            _client.set_timeout(float(os.getenv("SHEETS_TIMEOUT", DEFAULT_SHEETS_TIMEOUT)))
+        _refresh_if_expiring(_client)
+        return _client
+
+
+def reset_gspread():
+    """Forget the shared client and every cached spreadsheet/worksheet handle."""
+    global _client
+    with _client_lock:
+        _client = None
+        _spreadsheets.clear()
+        _worksheets.clear()
+
+
+def open_spreadsheet(sheet_id):
+    with _client_lock:
+        sh = _spreadsheets.get(sheet_id)
+    if sh is not None:
+        return sh
+
+    sh = load_gspread().open_by_key(sheet_id)
+    with _client_lock:
+        return _spreadsheets.setdefault(sheet_id, sh)
+
+
+def open_worksheet(sheet_id, worksheet_name=None, worksheet_index=0, create=None):
+    """
+    Return a cached worksheet handle, resolving it by name with an optional index fallback.
+
+    ``create`` is an optional ``(rows, cols)`` tuple used to add the worksheet when
+    the name does not exist.
+    """
+    key = (sheet_id, _worksheet_key(worksheet_name, worksheet_index))
+    with _client_lock:
+        worksheet = _worksheets.get(key)
+    if worksheet is not None:
+        return worksheet
+
+    sh = open_spreadsheet(sheet_id)
+    if worksheet_name:
+        try:
+            worksheet = sh.worksheet(worksheet_name)
+        except gspread.WorksheetNotFound:
+            if create:
+                rows, cols = create
+                worksheet = sh.add_worksheet(title=worksheet_name, rows=rows, cols=cols)
+            elif worksheet_index is None:
+                raise
+            else:
+                worksheet = sh.get_worksheet(worksheet_index)
+    else:
+        worksheet = sh.get_worksheet(worksheet_index)
+
+    with _client_lock:
+        return _worksheets.setdefault(key, worksheet)
+
+
+def forget_worksheet(sheet_id, worksheet_name=None, worksheet_index=0):
+    """Drop a cached worksheet handle, e.g. after the tab was renamed or deleted."""
+    with _client_lock:
+        _worksheets.pop((sheet_id, _worksheet_key(worksheet_name, worksheet_index)), None)
+
+
+def _authorize():
     service_account_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
     if service_account_file:
         credentials = Credentials.from_service_account_file(
             service_account_file,
-            scopes=["https://www.googleapis.com/auth/spreadsheets"],
+            scopes=SCOPES,
         )
         return gspread.authorize(credentials)
 
@@ -31,46 +137,373 @@ def load_gspread():
     if os.path.exists(authorized_user_file):
         credentials = json.loads(open(credentials_file).read())
         authorized_user = json.loads(open(authorized_user_file).read())
+        # Keep the scopes that were granted; refreshing with extra scopes fails.
         gc, ret_au = gspread.oauth_from_dict(
             credentials,
             authorized_user,
-            scopes=["https://www.googleapis.com/auth/spreadsheets"],
+            scopes=authorized_user.get("scopes") or SCOPES,
         )
 
         ret_au_json = json.loads(ret_au)
-        with open(authorized_user_file, "w") as f:
-            f.write(json.dumps(ret_au_json, indent=4))
+        if ret_au_json != authorized_user:
+            with open(authorized_user_file, "w") as f:
+                f.write(json.dumps(ret_au_json, indent=4))
     else:
         gc = gspread.oauth(
             credentials_filename=credentials_file,
             authorized_user_filename=authorized_user_file,
-            scopes=["https://www.googleapis.com/auth/spreadsheets"],
+            scopes=SCOPES,
         )
 
     return gc
 
 
-def worksheet_values(sheet_id=None, worksheet_name=None, worksheet_index=0):
+def _mount_connection_pool(gc):
+    pool_size = int(os.getenv("GSPREAD_POOL_SIZE", DEFAULT_POOL_SIZE))
+    adapter = _BudgetedAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    gc.http_client.session.mount("https://", adapter)
+
+
+class _BudgetedAdapter(HTTPAdapter):
+    """Pooled adapter that caps every request's timeout by the caller's latency budget."""
+
+    def send(self, request, timeout=None, **kwargs):
+        budget = remaining_budget()
+        if budget is not None:
+            if budget == 0:
+                raise BudgetExhausted("Request latency budget spent before calling Google")
+            if isinstance(timeout, tuple):
+                timeout = tuple(budget if part is None else min(part, budget) for part in timeout)
+            else:
+                timeout = budget if timeout is None else min(timeout, budget)
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+def _refresh_if_expiring(gc):
+    credentials = getattr(gc.http_client, "auth", None)
+    if credentials is None or not getattr(credentials, "refresh_token", True):
+        return
+
+    expiry = credentials.expiry
+    if credentials.token and expiry and expiry - _utcnow() > TOKEN_REFRESH_MARGIN:
+        return
+
+    credentials.refresh(Request(gc.http_client.session))
+
+
+def _utcnow():
+    # google-auth stores expiry as a naive UTC datetime.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def worksheet_values(sheet_id=None, worksheet_name=None, worksheet_index=0, use_cache=True, columns=None):
+    """
+    Return all values of a worksheet, served from the local sheet cache when possible.
+
+    A cached copy younger than SHEET_CACHE_MAX_AGE seconds is returned as is. Older
+    copies are re-validated with a Drive metadata call and only re-downloaded when
+    the spreadsheet revision has changed. ``columns`` (e.g. ``"A:K"``) limits the
+    download to that column range.
+    """
+    result = worksheets_values(
+        [(worksheet_name, worksheet_index)],
+        sheet_id=sheet_id,
+        use_cache=use_cache,
+        columns=columns,
+    )[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def worksheets_values(worksheets, sheet_id=None, use_cache=True, columns=None):
+    """
+    Return the values of several worksheets using at most one values.batchGet request.
+
+    Args:
+        worksheets: list of ``(worksheet_name, worksheet_index)`` tuples, resolved like
+            worksheet_values() (by name, falling back to the index unless it is None)
+        sheet_id: Google Sheets ID (optional, defaults to TRANSACTIONS_SHEET env var)
+        use_cache: serve and refresh the on-disk sheet cache
+        columns: optional A1 column range such as ``"A:K"`` to fetch instead of whole tabs
+
+    Returns a list in the same order holding either the rows of each worksheet or the
+    exception raised while resolving it, so one missing tab does not fail the others.
+
+    When a cached tab's revision is stale, only its header and the rows from the
+    cached trailing window onwards are fetched. If that window still hashes the same
+    the new rows are appended to the cached values; otherwise the tab is reloaded.
+
+    Concurrent callers asking for the same tab share a single in-flight fetch.
+    """
     if not sheet_id:
         sheet_id = os.getenv("TRANSACTIONS_SHEET")
 
-    gc = load_gspread()
-    sh = gc.open_by_key(sheet_id)
+    specs = {(sheet_id, use_cache, _cache_key(name, index, columns)): (name, index) for name, index in worksheets}
 
-    if worksheet_name:
-        try:
-            worksheet = sh.worksheet(worksheet_name)
-        except gspread.WorksheetNotFound:
-            if worksheet_index is None:
-                raise
-            worksheet = sh.get_worksheet(worksheet_index)
+    def fetch(claimed):
+        values = _fetch_worksheets_values([specs[key] for key in claimed], sheet_id, use_cache, columns)
+        return dict(zip(claimed, values))
+
+    values = _worksheet_flights.do_many(specs, fetch)
+    return [values[(sheet_id, use_cache, _cache_key(name, index, columns))] for name, index in worksheets]
+
+
+def _fetch_worksheets_values(worksheets, sheet_id, use_cache, columns):
+    caching = use_cache and sheet_cache.is_enabled()
+    keys = [_cache_key(name, index, columns) for name, index in worksheets]
+    results = [None] * len(worksheets)
+    entries = {}
+    pending = []
+
+    for i, key in enumerate(keys):
+        entry = sheet_cache.load(sheet_id, key) if caching else None
+        if entry and sheet_cache.is_fresh(entry):
+            results[i] = entry["values"]
+            _stale_served.pop((sheet_id, key), None)
+        else:
+            entries[i] = entry
+            pending.append(i)
+
+    if not pending:
+        return results
+
+    breaker = get_breaker("sheets")
+    if remaining_budget() == 0:
+        for i in pending:
+            results[i] = BudgetExhausted("Request latency budget spent before refreshing Google Sheets")
+    elif breaker.allow():
+        _refresh_worksheets(worksheets, sheet_id, columns, caching, keys, entries, list(pending), results)
+        errors = [results[i] for i in pending if isinstance(results[i], Exception)]
+        if any(not isinstance(error, (gspread.WorksheetNotFound, BudgetExhausted)) for error in errors):
+            breaker.record_failure()
+        elif any(isinstance(error, BudgetExhausted) for error in errors):
+            breaker.release()
+        else:
+            breaker.record_success()
     else:
-        worksheet = sh.get_worksheet(worksheet_index)
+        for i in pending:
+            results[i] = CircuitOpen("Google Sheets calls are paused after repeated failures")
+
+    # Serve the last synced copy of a tab that could not be refreshed
+    for i in pending:
+        entry = entries.get(i)
+        if isinstance(results[i], Exception) and entry:
+            logger.warning("Serving cached %s after error: %s", keys[i], results[i])
+            _stale_served[(sheet_id, keys[i])] = entry["checked_at"]
+            results[i] = entry["values"]
+        else:
+            _stale_served.pop((sheet_id, keys[i]), None)
+    return results
+
+
+def _refresh_worksheets(worksheets, sheet_id, columns, caching, keys, entries, pending, results):
+    revision = None
+    if caching:
+        try:
+            revision = _drive_metadata(load_gspread(), sheet_id).get("modifiedTime")
+        except BudgetExhausted as exc:
+            for i in pending:
+                results[i] = exc
+            return
+        except Exception as exc:
+            # Tokens without the Drive scope, or projects without the Drive API, still
+            # read the tabs; they are stored without a revision and re-downloaded.
+            logger.warning("Unable to read revision for spreadsheet %s: %s", sheet_id, exc)
+        for i in list(pending):
+            entry = entries[i]
+            if entry and revision and entry.get("revision") == revision:
+                sheet_cache.touch(entry)
+                results[i] = entry["values"]
+                pending.remove(i)
+
+    if not pending:
+        return
+
+    full = []
+    tails = []
+    for i in pending:
+        name, index = worksheets[i]
+        try:
+            worksheet = open_worksheet(sheet_id, name, index)
+        except Exception as exc:
+            results[i] = exc
+            continue
+        entry = entries.get(i)
+        if (
+            caching
+            and entry
+            and entry.get("tail_rows")
+            and sheet_cache.incremental_sync_enabled()
+            and not sheet_cache.full_sync_due(entry.get("full_synced_at"), entry.get("appends"))
+        ):
+            tails.append((i, worksheet.title))
+        else:
+            full.append((i, worksheet.title))
+
+    ranges = [absolute_range_name(title, columns) for _, title in full]
+    for i, title in tails:
+        entry = entries[i]
+        first_tail_row = len(entry["values"]) - entry["tail_rows"] + 1
+        width = len(entry["values"][0])
+        ranges.append(absolute_range_name(title, _rows_range(columns, width, 1, 1)))
+        ranges.append(absolute_range_name(title, _rows_range(columns, width, first_tail_row)))
+
+    value_ranges = _batch_get(sheet_id, worksheets, [i for i, _ in full + tails], ranges, results)
+    if value_ranges is None:
+        return
+
+    for (i, _), value_range in zip(full, value_ranges):
+        results[i] = _store_values(sheet_id, keys[i], revision, value_range.get("values", []), caching)
 
-    data = worksheet.get_all_values()
+    reload = []
+    tail_ranges = value_ranges[len(full) :]
+    for n, (i, title) in enumerate(tails):
+        header = tail_ranges[2 * n].get("values", [])
+        rows = tail_ranges[2 * n + 1].get("values", [])
+        data = _append_new_rows(entries[i], header, rows)
+        if data is None:
+            logger.info("Earlier rows of %s changed; reloading the full worksheet", title)
+            reload.append((i, title))
+        else:
+            results[i] = _store_values(sheet_id, keys[i], revision, data, caching, appended_to=entries[i])
+
+    if reload:
+        ranges = [absolute_range_name(title, columns) for _, title in reload]
+        value_ranges = _batch_get(sheet_id, worksheets, [i for i, _ in reload], ranges, results)
+        for (i, _), value_range in zip(reload, value_ranges or []):
+            results[i] = _store_values(sheet_id, keys[i], revision, value_range.get("values", []), caching)
+
+
+def _batch_get(sheet_id, worksheets, indexes, ranges, results):
+    if not ranges:
+        return []
+    try:
+        return open_spreadsheet(sheet_id).values_batch_get(ranges).get("valueRanges", [])
+    except Exception as exc:
+        for i in indexes:
+            name, index = worksheets[i]
+            forget_worksheet(sheet_id, name, index)
+            results[i] = exc
+        return None
+
+
+def _store_values(sheet_id, key, revision, rows, caching, appended_to=None):
+    data = fill_gaps(rows) if rows else []
+    if caching:
+        sheet_cache.store(sheet_id, key, revision, data, appended_to)
     return data
 
 
+def _append_new_rows(entry, header, rows):
+    """
+    Extend cached values with rows appended after the last sync.
+
+    ``rows`` starts at the first row of the cached trailing window. Returns None when
+    the header or that window changed, meaning earlier rows were edited, inserted or
+    deleted and the worksheet must be reloaded in full.
+    """
+    cached = entry["values"]
+    overlap = entry["tail_rows"]
+    width = len(cached[0])
+    if sheet_cache.rows_hash(header[:1]) != sheet_cache.rows_hash(cached[:1]):
+        return None
+    if len(rows) < overlap or sheet_cache.rows_hash(rows[:overlap]) != entry["tail_hash"]:
+        return None
+
+    new_rows = rows[overlap:]
+    if any(len(row) > width for row in new_rows):
+        return None
+    return cached + [row + [""] * (width - len(row)) for row in new_rows]
+
+
+def _rows_range(columns, width, first_row, last_row=None):
+    if columns:
+        first_col, _, last_col = columns.partition(":")
+    else:
+        if last_row is not None:
+            return f"{first_row}:{last_row}"
+        first_col = "A"
+        last_col = rowcol_to_a1(1, max(width, 1)).rstrip("0123456789")
+    return f"{first_col}{first_row}:{last_col}{last_row or ''}"
+
+
+def invalidate_worksheet_cache(sheet_id=None, worksheet_name=None, worksheet_index=0, columns=None):
+    """Drop cached values for one worksheet, or for the whole spreadsheet if no tab is given."""
+    if not sheet_id:
+        sheet_id = os.getenv("TRANSACTIONS_SHEET")
+
+    if worksheet_name is None and worksheet_index is None:
+        sheet_cache.invalidate(sheet_id)
+    else:
+        sheet_cache.invalidate(sheet_id, _cache_key(worksheet_name, worksheet_index, columns))
+
+
+def worksheet_staleness(sheet_id=None, worksheet_name=None, worksheet_index=0, columns=None):
+    """Seconds since the worksheet was last synced if its last read fell back to the cache, else None."""
+    if not sheet_id:
+        sheet_id = os.getenv("TRANSACTIONS_SHEET")
+    checked_at = _stale_served.get((sheet_id, _cache_key(worksheet_name, worksheet_index, columns)))
+    return None if checked_at is None else time.time() - checked_at
+
+
+def spreadsheet_revision(gc, sheet_id):
+    """
+    Return the Drive modifiedTime of the spreadsheet, or None if it can't be read.
+
+    Failures count towards the "sheets" circuit breaker, and no call is made while
+    it is open.
+    """
+    return _spreadsheet_metadata(gc, sheet_id).get("modifiedTime")
+
+
+def _spreadsheet_metadata(gc, sheet_id):
+    # Guarded like spreadsheet_revision(); an empty dict when it can't be read
+    breaker = get_breaker("sheets")
+    if not breaker.allow():
+        return {}
+    try:
+        metadata = _drive_metadata(gc, sheet_id)
+    except BudgetExhausted:
+        breaker.release()
+        return {}
+    except gspread.exceptions.APIError as exc:
+        # Drive refused the call (missing scope, API disabled); Google itself is up
+        logger.warning("Unable to read revision for spreadsheet %s: %s", sheet_id, exc)
+        breaker.release()
+        return {}
+    except Exception as exc:
+        logger.warning("Unable to read revision for spreadsheet %s: %s", sheet_id, exc)
+        breaker.record_failure()
+        return {}
+    breaker.record_success()
+    return metadata
+
+
+def _drive_metadata(gc, sheet_id):
+    # modifiedTime is the cache revision; version counts every change to the file
+    url = f"{DRIVE_FILES_API_V3_URL}/{sheet_id}"
+    params = {"supportsAllDrives": True, "fields": "modifiedTime,version"}
+    return gc.http_client.request("get", url, params=params).json()
+
+
+def _written_only_by_us(before, after):
+    """Whether ``after`` is the revision produced by one write on top of ``before``."""
+    try:
+        return bool(after.get("modifiedTime")) and int(after["version"]) == int(before["version"]) + 1
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def _worksheet_key(worksheet_name, worksheet_index):
+    return worksheet_name if worksheet_name else f"#{worksheet_index}"
+
+
+def _cache_key(worksheet_name, worksheet_index, columns):
+    key = _worksheet_key(worksheet_name, worksheet_index)
+    return f"{key}!{columns}" if columns else key
+
+
 def transactions(sheet_id=None, worksheet_name=None, worksheet_index=0):
     data = worksheet_values(sheet_id, worksheet_name, worksheet_index)
     df = pd.DataFrame(data[1:], columns=data[0])
@@ -81,38 +514,36 @@ def transactions(sheet_id=None, worksheet_name=None, worksheet_index=0):
     return df
 
 
-def update_portfolio_summary(t, sheet_id=None, worksheet_id=None):
+def update_portfolio_summary(t, sheet_id=None, worksheet_id=None, day=None):
     """
-    Update or insert portfolio summary data in Google Sheets for today's date.
+    Update or insert portfolio summary data in Google Sheets for ``day`` (today by default).
+
+    Only the header and the date column are read, and only when this process has
+    no up-to-date date->row index for the tab; values and formats are then written
+    with a single batchUpdate request.
     
     Args:
         t: DataFrame with single row containing portfolio summary data
         sheet_id: Google Sheets ID (optional, defaults to PORTFOLIO_SUMMARY_SHEET env var)
         worksheet_id: Specific worksheet/tab ID (optional, defaults to PORTFOLIO_SUMMARY_WORKSHEET env var)
+        day: ISO date of the row to write (optional, defaults to today)
     """
     
     if not sheet_id:
         sheet_id = os.getenv("TRANSACTIONS_SHEET")
         
     gc = load_gspread()
-    sh = gc.open_by_key(sheet_id)
-    
-    try:
-        worksheet = sh.worksheet("Net Worth")
-    except gspread.WorksheetNotFound:
-        worksheet = sh.add_worksheet(title="Net Worth", rows="1000", cols="8")
-    
-    existing_data = worksheet.get_all_values()
-    headers = ["Date", "Total", "Market Value", "Gain", "Gain%", "Day Change", "Day Change Value", "Updated At"]
-    if not existing_data or existing_data[0] != headers:
-        worksheet.update('A1:H1', [headers])
+    metadata_before = _spreadsheet_metadata(gc, sheet_id)
+    revision_before = metadata_before.get("modifiedTime")
+    worksheet = open_worksheet(sheet_id, NET_WORTH_WORKSHEET, create=("1000", "8"))
+    index = _net_worth_index(sheet_id, worksheet, revision_before)
     
     if hasattr(t, 'to_dict'):
         data = t.to_dict('records')[0]
     else:
         data = dict(t)
     
-    today = date.today().strftime('%Y-%m-%d')
+    today = day or date.today().strftime('%Y-%m-%d')
     
     total_value = data.get(CN.TOTAL, '0')
     market_value = data.get(CN.MARKET_VALUE, '0')
@@ -122,14 +553,6 @@ def update_portfolio_summary(t, sheet_id=None, worksheet_id=None):
     day_change_val = data.get(CN.DAY_CHNG_VAL, '0')
     updated_at = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
     
-    row_to_update = None
-    existing_data = worksheet.get_all_values()
-    
-    for i, row in enumerate(existing_data[1:], start=2):
-        if row and row[0] == today:
-            row_to_update = i
-            break
-    
     gain_pct_decimal = gain_pct_value / 100
     day_change_decimal = day_change_value / 100
     
@@ -141,14 +564,112 @@ def update_portfolio_summary(t, sheet_id=None, worksheet_id=None):
             "pattern": "0.00%"
         }
     }
-    
+
+    requests = []
+    if not index.header_ok:
+        requests.append(_update_row_request(worksheet.id, 1, NET_WORTH_HEADERS))
+
+    existing_row = index.row_for(today)
+    row_to_update = existing_row
     if row_to_update:
-        worksheet.update(f'A{row_to_update}:H{row_to_update}', [row_data])
+        requests.append(_update_row_request(worksheet.id, row_to_update, row_data))
+    else:
+        row_to_update = 2
+        requests.append({
+            "insertDimension": {
+                "range": {"sheetId": worksheet.id, "dimension": "ROWS", "startIndex": 1, "endIndex": 2},
+                "inheritFromBefore": False,
+            }
+        })
+        requests.append(_update_row_request(worksheet.id, row_to_update, row_data))
+    requests.append({
+        "repeatCell": {
+            "range": {
+                "sheetId": worksheet.id,
+                "startRowIndex": row_to_update - 1,
+                "endRowIndex": row_to_update,
+                "startColumnIndex": 4,
+                "endColumnIndex": 6,
+            },
+            "cell": {"userEnteredFormat": format_row},
+            "fields": "userEnteredFormat.numberFormat",
+        }
+    })
+
+    open_spreadsheet(sheet_id).batch_update({"requests": requests})
+    if existing_row:
         print(f"Portfolio summary updated for {today}")
-        worksheet.format(f'E{row_to_update}:F{row_to_update}', format_row)
     else:
-        worksheet.insert_row(row_data, 2)
+        index.insert_at_top(today)
         print(f"Portfolio summary added for {today}")
-        worksheet.format('E2:F2', format_row)
-    
+    index.header_ok = True
+
+    # Carry cached tabs forward only if nobody else changed the spreadsheet meanwhile
+    metadata_after = _spreadsheet_metadata(gc, sheet_id)
+    if _written_only_by_us(metadata_before, metadata_after):
+        index.revision = metadata_after["modifiedTime"]
+        sheet_cache.advance_revision(sheet_id, revision_before, index.revision)
+    else:
+        index.revision = None
+        sheet_cache.invalidate(sheet_id)
     return True
+
+
+class _NetWorthIndex:
+    """
+    Date->row lookup for the newest-first Net Worth tab.
+
+    Dates are stored by their distance from the last row, so inserting today's row
+    at the top only bumps the row count instead of shifting every entry.
+    """
+
+    def __init__(self, revision, header, dates):
+        self.revision = revision
+        self.header_ok = header == NET_WORTH_HEADERS
+        self.row_count = len(dates)
+        self.from_bottom = {}
+        for row_number in range(len(dates), 1, -1):
+            self.from_bottom[dates[row_number - 1]] = len(dates) - row_number
+
+    def row_for(self, day):
+        offset = self.from_bottom.get(day)
+        return None if offset is None else self.row_count - offset
+
+    def insert_at_top(self, day):
+        self.row_count = max(self.row_count, 1) + 1
+        self.from_bottom[day] = self.row_count - 2
+
+
+def _net_worth_index(sheet_id, worksheet, revision):
+    """Return the cached Net Worth index, re-reading only the header and date column if stale."""
+    index = _net_worth_indexes.get(sheet_id)
+    if index is not None and revision and index.revision == revision:
+        return index
+
+    response = open_spreadsheet(sheet_id).values_batch_get([
+        absolute_range_name(worksheet.title, "A1:H1"),
+        absolute_range_name(worksheet.title, "A:A"),
+    ])
+    header_range, date_range = response.get("valueRanges", [{}, {}])
+    header = (header_range.get("values") or [[]])[0]
+    dates = [row[0] if row else "" for row in date_range.get("values", [])]
+
+    index = _NetWorthIndex(revision, header, dates)
+    _net_worth_indexes[sheet_id] = index
+    return index
+
+
+def _update_row_request(sheet_id, row_number, values):
+    return {
+        "updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": row_number - 1, "columnIndex": 0},
+            "rows": [{"values": [_cell_value(value) for value in values]}],
+            "fields": "userEnteredValue",
+        }
+    }
+
+
+def _cell_value(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": "" if value is None else str(value)}}
@@ -1,142 +1,299 @@
 
 import datetime
 import logging
-import yfinance as yf
+import threading
+import numpy as np
 import pandas as pd
+from collections import defaultdict
 from typing import List, Dict, Optional
 
+from src.util import bar_store
+from src.util.price_provider import get_price_provider
+from src.util.resilience import get_breaker, remaining_budget
+from src.util.single_flight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
-_price_cache: Dict[str, Dict[str, float]] = {}
+# Relative close difference on an already stored day that signals a split/dividend re-adjustment
+ADJUSTMENT_TOLERANCE = 0.005
+# Oldest session, in days before a reference date, that may stand in for it
+REFERENCE_TOLERANCE_DAYS = 7
+# Days of history kept per ticker, so any window up to five years needs no extra download
+HISTORY_DAYS = 5 * 365
+
+DEFAULT_WINDOWS = ["7D", "1M", "3M", "6M", "1Y"]
+# Window units in days; months and years are fixed-length like the original 1M=30/1Y=365
+_WINDOW_UNITS = {"D": 1, "W": 7, "M": 30, "Y": 365}
+
+# ticker -> window -> reference price, or None when there is no close to use
+_price_cache: Dict[str, Dict[str, Optional[float]]] = {}
 _cache_date: Optional[datetime.date] = None
+_cache_lock = threading.Lock()
+_history_flights = SingleFlight()
+# ticker -> last stored bar day (None if there is none) for tickers whose last sync failed
+_unsynced: Dict[str, Optional[str]] = {}
+
+def normalize_windows(windows: Optional[List[str]] = None) -> List[str]:
+    """
+    Validates change windows, defaulting to 7D/1M/3M/6M/1Y.
+
+    A window is ``YTD``, a count and unit such as ``10D``, ``2W``, ``18M`` or ``5Y``,
+    or an ISO date (``2024-03-15``) to measure the change since that day.
+    """
+    if windows is None:
+        return list(DEFAULT_WINDOWS)
+    if isinstance(windows, str):
+        windows = windows.split(",")
+    normalized = []
+    for window in windows:
+        window = window.strip().upper()
+        window_target(window, datetime.date.today())
+        if window not in normalized:
+            normalized.append(window)
+    return normalized
+
+def window_target(window: str, today: datetime.date) -> datetime.date:
+    """The date whose close a window's change is measured from."""
+    if window == "YTD":
+        # The previous year's last session
+        return datetime.date(today.year - 1, 12, 31)
+    unit = _WINDOW_UNITS.get(window[-1:])
+    if unit and window[:-1].isdigit() and int(window[:-1]) > 0:
+        return today - datetime.timedelta(days=int(window[:-1]) * unit)
+    try:
+        target = datetime.date.fromisoformat(window)
+    except ValueError:
+        raise ValueError(f"Unknown window {window!r}; use YTD, <n>D/W/M/Y or an ISO date") from None
+    if target > today:
+        raise ValueError(f"Window {window!r} is in the future")
+    return target
 
-def get_historical_prices(tickers: List[str]) -> Dict[str, Dict[str, float]]:
+def get_historical_prices(tickers: List[str], windows: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
     """
     Get historical prices for the given tickers.
-    Returns a dictionary mapping ticker -> { '7D': price, '1M': price, ... }
+    Returns a dictionary mapping ticker -> { '7D': price, '1M': price, ... } for the
+    requested windows (see normalize_windows); windows without a price are left out.
     """
     global _cache_date, _price_cache
-    
+
     today = datetime.date.today()
-    
-    # Invalidate cache if date has changed
-    if _cache_date != today:
-        _price_cache = {}
-        _cache_date = today
-        
-    # Identify missing tickers
-    # We filter out tickers that are already in cache
-    missing_tickers = [t for t in tickers if t not in _price_cache]
-    
+    windows = normalize_windows(windows)
+
+    with _cache_lock:
+        # Invalidate cache if date has changed
+        if _cache_date != today:
+            _price_cache = {}
+            _cache_date = today
+        cached = {
+            t: dict(_price_cache[t])
+            for t in tickers
+            if t in _price_cache and all(w in _price_cache[t] for w in windows)
+        }
+
+    # Identify missing tickers; concurrent callers share one fetch per ticker
+    missing_tickers = [t for t in dict.fromkeys(tickers) if t not in cached]
+
     if missing_tickers:
         logger.info("Fetching historical data for: %s", missing_tickers)
-        _fetch_and_cache_prices(missing_tickers)
-        
-    # Return requested tickers from cache
-    return {t: _price_cache.get(t, {}) for t in tickers}
+        key = tuple(windows)
+        fetched = _history_flights.do_many(
+            [(today, key, t) for t in missing_tickers],
+            lambda claimed: {
+                (today, key, t): prices
+                for t, prices in _fetch_and_cache_prices([t for _, _, t in claimed], windows).items()
+            },
+        )
+        cached.update({t: prices for (_, _, t), prices in fetched.items()})
 
-def _fetch_and_cache_prices(tickers: List[str]):
+    # Return requested tickers and windows
+    return {
+        t: {w: cached[t][w] for w in windows if cached.get(t, {}).get(w) is not None}
+        for t in tickers
+    }
+
+def _fetch_and_cache_prices(tickers: List[str], windows: List[str]) -> Dict[str, Dict[str, Optional[float]]]:
     """
-    Fetches 1 year of history for missing tickers and calculates reference prices.
+    Brings the local bar store up to date for the tickers, calculates the windows'
+    reference prices from the stored history and caches them for the rest of the day.
+
+    Only tickers whose bars are up to date are cached. Tickers that could not be
+    synced (budget spent, circuit open, failed or empty download) are priced from
+    whatever bars are stored, reported by unsynced_history(), and retried on the
+    next call.
     """
+    prices: Dict[str, Dict[str, float]] = {}
     if not tickers:
-        return
+        return {}
 
+    today = datetime.date.today()
+    target_dates = {w: pd.Timestamp(window_target(w, today)) for w in windows}
+    history: Dict[str, pd.DataFrame] = {}
     try:
-        # Fetch 1 year of data
-        # auto_adjust=True ensures we get split/dividend adjusted prices (usually in 'Close')
-        data = yf.download(
-            tickers,
-            period="1y",
-            group_by='ticker',
-            auto_adjust=True,
-            threads=True,
-            progress=False,
-        )
-        
-        if data.empty:
-            for t in tickers:
-                _price_cache[t] = {}
-            return
-
-        # Calculate target dates
-        targets = {
-            "7D": datetime.timedelta(days=7),
-            "1M": datetime.timedelta(days=30),
-            "3M": datetime.timedelta(days=90),
-            "6M": datetime.timedelta(days=180),
-            "1Y": datetime.timedelta(days=365)
-        }
-        
-        today_ts = pd.Timestamp(datetime.date.today())
-        target_dates = {k: today_ts - v for k, v in targets.items()}
-        
-        # Handle single ticker case (yf returns flat DataFrame if 1 ticker)
-        if len(tickers) == 1:
-            # To unify logic, wrap it to look like multiple ticker structure or handle separately
-            # If flat, columns are Open, High, Low, Close, Volume
-            t = tickers[0]
-            _price_cache[t] = _extract_prices_from_series(data, target_dates)
-        else:
-            # Multi-index columns: (Ticker, OHLCV)
-            for t in tickers:
-                if t in data.columns.levels[0]:
-                    ticker_df = data[t]
-                    _price_cache[t] = _extract_prices_from_series(ticker_df, target_dates)
-                else:
-                    _price_cache[t] = {}
-                    
+        # One long history serves every window; only windows reaching further back extend it
+        oldest = min([today - datetime.timedelta(days=HISTORY_DAYS)] + [t.date() for t in target_dates.values()])
+        start = oldest - datetime.timedelta(days=REFERENCE_TOLERANCE_DAYS)
+        unsynced = _sync_bars(tickers, start, today)
+        history = bar_store.load_bars(tickers, start)
+        prices = _extract_reference_prices(history, target_dates)
     except Exception:
         logger.exception("Error fetching historical prices")
-        # Prevent partial failures from blocking future attempts? 
-        # Or mark failed tickers as empty to avoid retry?
+        unsynced = set(tickers)
+
+    with _cache_lock:
         for t in tickers:
-            if t not in _price_cache:
-                _price_cache[t] = {}
+            if t in unsynced:
+                bars = history.get(t)
+                _unsynced[t] = None if bars is None or bars.empty else bars.index.max().date().isoformat()
+            else:
+                _unsynced.pop(t, None)
+    result = {t: {w: prices.get(t, {}).get(w) for w in windows} for t in tickers}
+    _cache_prices({t: result[t] for t in tickers if t not in unsynced}, today)
+    return result
 
-def _extract_prices_from_series(df: pd.DataFrame, target_dates: Dict[str, pd.Timestamp]) -> Dict[str, float]:
+def unsynced_history(tickers: List[str]) -> Dict[str, Optional[str]]:
+    """Last stored bar day (None if none) of each ticker whose latest price history sync failed."""
+    with _cache_lock:
+        return {t: _unsynced[t] for t in tickers if t in _unsynced}
+
+def _cache_prices(prices: Dict[str, Dict[str, Optional[float]]], day: datetime.date):
+    with _cache_lock:
+        if _cache_date == day:
+            for t, by_window in prices.items():
+                _price_cache.setdefault(t, {}).update(by_window)
+
+def _sync_bars(tickers: List[str], start: datetime.date, today: datetime.date):
     """
-    Finds the nearest price before or on the target date (max 5 days lookback).
-    Assumes df has a 'Close' column and DatetimeIndex.
+    Appends the trading days missing from the bar store since each ticker's last stored bar.
+
+    Each ticker is synced at most once a day, and only completed sessions (before
+    ``today``) are stored. New tickers, and tickers whose stored history starts after
+    ``start``, get their full history. The last stored bar is re-fetched as an
+    overlap. If its adjusted close moved (a split or dividend re-adjusted the
+    series), the whole history is replaced. Tickers the provider returned no bars
+    for are not marked as synced, so they are retried on the next sync.
+
+    Returns the tickers that could not be brought up to date.
     """
-    prices = {}
-    if 'Close' not in df.columns:
-        return {}
+    coverage = bar_store.coverage(tickers)
+    unsynced = set()
+    full = []
+    incremental = defaultdict(list)
+    for t in tickers:
+        state = coverage.get(t)
+        if state is None or state["history_start"] > start.isoformat():
+            full.append(t)
+        elif state["checked_on"] == today.isoformat():
+            continue
+        elif state["last_day"] is None:
+            full.append(t)
+        elif state["last_day"] >= today.isoformat():
+            bar_store.mark_checked([t], start, today)
+        else:
+            incremental[state["last_day"]].append(t)
+
+    for last_day, group in incremental.items():
+        since = datetime.date.fromisoformat(last_day)
+        fetched = _guarded_history(group, since, today)
+        if fetched is None:
+            unsynced.update(group)
+            continue
+        stored = bar_store.load_bars(group, since)
+        for t in group:
+            bars = fetched.get(t)
+            if bars is None or bars.empty:
+                unsynced.add(t)
+                continue
+            if _adjustments_changed(stored.get(t), bars):
+                full.append(t)
+            else:
+                bar_store.save_bars(t, bars, start, today)
+
+    if full:
+        logger.info("Fetching full price history for: %s", full)
+        fetched = _guarded_history(full, start, today)
+        if fetched is None:
+            return unsynced | set(full)
+        for t in full:
+            bars = fetched.get(t)
+            if bars is not None and not bars.empty:
+                bar_store.save_bars(t, bars, start, today, replace=True)
+            else:
+                unsynced.add(t)
+    return unsynced
+
+def _guarded_history(
+    tickers: List[str], start: datetime.date, end: datetime.date
+) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Fetches history through the "history" circuit breaker.
+
+    Returns None when the call is skipped or fails; the tickers then keep the bars
+    already stored and are retried on the next sync.
+    """
+    breaker = get_breaker("history")
+    if remaining_budget() == 0 or not breaker.allow():
+        logger.warning("Skipping price history fetch for %s; serving stored bars", tickers)
+        return None
+    try:
+        fetched = get_price_provider().history(tickers, start=start, end=end)
+    except Exception:
+        breaker.record_failure()
+        logger.exception("Error fetching price history for %s", tickers)
+        return None
+    breaker.record_success()
+    return fetched
+
+def _adjustments_changed(stored: Optional[pd.DataFrame], fetched: pd.DataFrame) -> bool:
+    if stored is None or stored.empty or "Close" not in fetched.columns:
+        return False
+    fetched_close = fetched["Close"].copy()
+    fetched_close.index = pd.DatetimeIndex(fetched_close.index).tz_localize(None).normalize()
+    overlap = stored["Close"].align(fetched_close, join="inner")
+    if overlap[0].empty:
+        return False
+    drift = ((overlap[0] - overlap[1]).abs() / overlap[0].abs()).max()
+    return bool(drift > ADJUSTMENT_TOLERANCE)
+
+def _extract_reference_prices(
+    history: Dict[str, pd.DataFrame], target_dates: Dict[str, pd.Timestamp]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Resolves every (ticker, period) reference price in one pass.
 
-    # Filter out NaN prices upfront
-    df = df[df['Close'].notna()]
-    if df.empty:
+    The close series are aligned into a date x ticker matrix. Each target date is
+    located with a single searchsorted, and the last session on or before it is
+    used. A session more than REFERENCE_TOLERANCE_DAYS before the target does not
+    count, and a later session is never used.
+    """
+    closes = {}
+    for t, df in history.items():
+        if "Close" in df.columns:
+            close = df["Close"].dropna()
+            if not close.empty:
+                closes[t] = close
+    if not closes:
         return {}
 
-    # Ensure index is sorted
-    df = df.sort_index()
-    
-    for period, target_date in target_dates.items():
-        # Find the index of the nearest date in the DataFrame
-        # 'method="nearest"' works well if we have continuous data, but we need to validate distance
-        try:
-             # get_indexer returns array of indices, we need the first one
-             idx_loc = df.index.get_indexer([target_date], method="nearest")[0]
-             
-             # Check if index is valid (get_indexer can return -1 if empty, but we checked empty)
-             if idx_loc == -1:
-                 continue
-                 
-             nearest_date = df.index[idx_loc]
-             price = df.iloc[idx_loc]['Close']
-             
-             # Calculate distance in days
-             distance = abs((target_date - nearest_date).days)
-             
-             # Tolerance:
-             # For 1Y, if data starts slightly after target (e.g. 2-3 days), acceptable.
-             # For 7D, finding nearest trading day (prev or next) within 5 days is acceptable.
-             if distance <= 7:
-                 if pd.notna(price):
-                     prices[period] = float(price)
-                     
-        except Exception:
-            # Fallback or ignore
-            pass
-            
-    return prices
+    matrix = pd.DataFrame(closes).sort_index()
+    dates = matrix.index.values.astype("datetime64[D]")
+    values = matrix.to_numpy(dtype=float)
+
+    # For every row and ticker, the row of that ticker's latest close so far (-1 if none)
+    observed = np.where(np.isnan(values), -1, np.arange(len(dates))[:, None])
+    last_session = np.maximum.accumulate(observed, axis=0)
+
+    periods = list(target_dates)
+    targets = np.array([target_dates[p].to_datetime64() for p in periods], dtype="datetime64[D]")
+    rows = np.searchsorted(dates, targets, side="right") - 1
+
+    session = last_session[np.maximum(rows, 0)]
+    session[rows < 0] = -1
+    found = session >= 0
+    lag = targets[:, None] - dates[np.maximum(session, 0)]
+    found &= lag <= np.timedelta64(REFERENCE_TOLERANCE_DAYS, "D")
+    prices = values[np.maximum(session, 0), np.arange(values.shape[1])]
+
+    result: Dict[str, Dict[str, float]] = {}
+    for col, t in enumerate(matrix.columns):
+        result[t] = {p: float(prices[i, col]) for i, p in enumerate(periods) if found[i, col]}
+    return result
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+SESSION_OPEN = time(9, 30)
+SESSION_CLOSE = time(16, 0)
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """Full-day NYSE closures. Early closes (1pm sessions) are treated as full days."""
+
+    rules = [
+        # A Saturday New Year's Day is not observed on the Friday before.
+        Holiday("New Year's Day", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independence Day", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas Day", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in _holidays(day.year)
+
+
+def is_market_open(now: datetime | None = None) -> bool:
+    """Whether the regular NYSE session is in progress at ``now`` (default: current time)."""
+
+    now = _market_time(now)
+    return is_trading_day(now.date()) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+
+def next_market_open(now: datetime | None = None) -> datetime:
+    """Start of the next regular session after ``now``, or ``now`` if one is in progress."""
+
+    now = _market_time(now)
+    if is_market_open(now):
+        return now
+
+    day = now.date()
+    if now.time() >= SESSION_OPEN:
+        day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return datetime.combine(day, SESSION_OPEN, tzinfo=MARKET_TZ)
+
+
+def _market_time(now: datetime | None) -> datetime:
+    if now is None:
+        return datetime.now(MARKET_TZ)
+    if now.tzinfo is None:
+        return now.replace(tzinfo=MARKET_TZ)
+    return now.astimezone(MARKET_TZ)
+
+
+@lru_cache(maxsize=16)
+def _holidays(year: int) -> frozenset[date]:
+    # Observed dates can spill into the neighbouring year, so look one year either side.
+    holidays = NYSEHolidayCalendar().holidays(start=f"{year - 1}-12-01", end=f"{year + 1}-01-31")
+    return frozenset(day.date() for day in holidays)
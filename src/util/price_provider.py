@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFRateLimitError
+
+from src.util.resilience import remaining_budget
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLAY_DIR = "../../data/prices"
+DEFAULT_QUOTE_WORKERS = 8
+DEFAULT_QUOTE_TIMEOUT = 10.0
+DEFAULT_HISTORY_TIMEOUT = 30.0
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+Quote = tuple[float, float]
+
+# Lookup errors that mean Yahoo could not be reached, rather than that one symbol has no quote
+_TRANSPORT_ERRORS = (OSError, YFRateLimitError)
+
+_provider: PriceProvider | None = None
+_provider_key: tuple | None = None
+_provider_lock = threading.Lock()
+
+
+class PriceProvider(ABC):
+    """Where live quotes and daily price history come from."""
+
+    name: str
+
+    @abstractmethod
+    def quotes(self, tickers: list[str], timeout: float | None = None) -> dict[str, Quote]:
+        """Return ``(current price, previous close)`` per ticker, omitting tickers without a quote."""
+
+    @abstractmethod
+    def history(self, tickers: list[str], start: date, end: date | None = None) -> dict[str, pd.DataFrame]:
+        """Return adjusted daily bars per ticker, indexed by date with at least a ``Close`` column."""
+
+
+class YFinanceProvider(PriceProvider):
+    name = "yfinance"
+
+    def quotes(self, tickers: list[str], timeout: float | None = None) -> dict[str, Quote]:
+        """
+        Fetch quotes on a bounded thread pool.
+
+        Tickers whose lookup fails or does not finish within the per-ticker timeout are
+        left out of the result, so one slow symbol cannot hold up the whole portfolio.
+        Only when no ticker was quoted and every lookup hit a transport error or timed
+        out is the first such error raised, so callers can tell an outage from misses.
+        """
+        if not tickers:
+            return {}
+        if timeout is None:
+            timeout = _env_float("QUOTE_TIMEOUT", DEFAULT_QUOTE_TIMEOUT)
+        workers = max(1, min(int(_env_float("QUOTE_WORKERS", DEFAULT_QUOTE_WORKERS)), len(tickers)))
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote")
+        try:
+            done, not_done, futures = _wait_per_ticker(executor, tickers, timeout, workers)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        quotes = {}
+        transport_errors = []
+        for future in done:
+            ticker = futures[future]
+            try:
+                quotes[ticker] = future.result()
+            except Exception as exc:
+                logger.warning("Quote lookup failed for %s: %s", ticker, exc)
+                if isinstance(exc, _TRANSPORT_ERRORS):
+                    transport_errors.append(exc)
+        if not_done:
+            logger.warning("Quote lookup timed out for %s", ", ".join(sorted(futures[f] for f in not_done)))
+        if not quotes and len(transport_errors) + len(not_done) == len(futures):
+            raise transport_errors[0] if transport_errors else TimeoutError("Quote lookup timed out")
+        return quotes
+
+    def history(self, tickers: list[str], start: date, end: date | None = None) -> dict[str, pd.DataFrame]:
+        if not tickers:
+            return {}
+        # auto_adjust=True gives split/dividend adjusted prices in 'Close'
+        data = yf.download(
+            tickers,
+            start=start.isoformat(),
+            end=end.isoformat() if end else None,
+            group_by="ticker",
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+            timeout=remaining_budget(_env_float("HISTORY_TIMEOUT", DEFAULT_HISTORY_TIMEOUT)),
+        )
+        if data is None or data.empty:
+            return {}
+
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {tickers[0]: data}
+        # Multi-index columns: (Ticker, OHLCV)
+        return {ticker: data[ticker] for ticker in tickers if ticker in data.columns.levels[0]}
+
+
+class ReplayPriceProvider(PriceProvider):
+    """
+    Quotes and history replayed from local files, optionally recorded from another provider.
+
+    ``directory`` holds ``quotes.json`` (``{ticker: [price, previous_close]}``) and one
+    ``history/<ticker>.csv`` of daily bars per ticker. In replay mode only those files
+    are read, so runs are deterministic and need no network; tickers without a file
+    are treated as unavailable. With ``upstream`` set, every result is fetched from it
+    and written to the files first.
+    """
+
+    def __init__(self, directory: str, upstream: PriceProvider | None = None):
+        self.directory = directory
+        self.upstream = upstream
+        self.name = "record" if upstream is not None else "replay"
+        self._lock = threading.Lock()
+        self._quotes: dict[str, Quote] | None = None
+        self._history: dict[str, pd.DataFrame] = {}
+
+    def quotes(self, tickers: list[str], timeout: float | None = None) -> dict[str, Quote]:
+        if self.upstream is not None:
+            fetched = self.upstream.quotes(tickers, timeout=timeout)
+            with self._lock:
+                recorded = self._load_quotes() | fetched
+                self._quotes = recorded
+                _write_json(os.path.join(self.directory, "quotes.json"), recorded)
+            return fetched
+
+        with self._lock:
+            recorded = self._load_quotes()
+        return {ticker: recorded[ticker] for ticker in tickers if ticker in recorded}
+
+    def history(self, tickers: list[str], start: date, end: date | None = None) -> dict[str, pd.DataFrame]:
+        if self.upstream is not None:
+            fetched = self.upstream.history(tickers, start, end)
+            for ticker, bars in fetched.items():
+                self._record_history(ticker, bars)
+        result = {}
+        for ticker in tickers:
+            bars = self._load_history(ticker)
+            if bars is None:
+                continue
+            bars = bars[bars.index >= pd.Timestamp(start)]
+            if end is not None:
+                bars = bars[bars.index < pd.Timestamp(end)]
+            if not bars.empty:
+                result[ticker] = bars
+        return result
+
+    def _load_quotes(self) -> dict[str, Quote]:
+        if self._quotes is None:
+            try:
+                with open(os.path.join(self.directory, "quotes.json")) as f:
+                    self._quotes = {ticker: tuple(quote) for ticker, quote in json.load(f).items()}
+            except FileNotFoundError:
+                self._quotes = {}
+        return self._quotes
+
+    def _load_history(self, ticker: str) -> pd.DataFrame | None:
+        with self._lock:
+            if ticker in self._history:
+                return self._history[ticker]
+        try:
+            bars = pd.read_csv(self._history_path(ticker), index_col="Date", parse_dates=["Date"])
+        except FileNotFoundError:
+            bars = None
+        with self._lock:
+            self._history[ticker] = bars
+        return bars
+
+    def _record_history(self, ticker: str, bars: pd.DataFrame) -> None:
+        bars = bars[[column for column in BAR_COLUMNS if column in bars.columns]].copy()
+        bars.index = pd.DatetimeIndex(bars.index).tz_localize(None).normalize()
+        bars.index.name = "Date"
+
+        existing = self._load_history(ticker)
+        if existing is not None:
+            bars = pd.concat([existing[~existing.index.isin(bars.index)], bars]).sort_index()
+        path = self._history_path(ticker)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        bars.to_csv(path)
+        with self._lock:
+            self._history[ticker] = bars
+
+    def _history_path(self, ticker: str) -> str:
+        return os.path.join(self.directory, "history", f"{ticker}.csv")
+
+
+def get_price_provider() -> PriceProvider:
+    """Return the provider selected by PRICE_PROVIDER (``yfinance``, ``replay`` or ``record``)."""
+
+    global _provider, _provider_key
+    kind = os.getenv("PRICE_PROVIDER", "yfinance").strip().lower()
+    if kind not in {"yfinance", "replay", "record"}:
+        raise ValueError("PRICE_PROVIDER must be yfinance, replay or record")
+
+    key = (kind, os.getenv("PRICE_REPLAY_DIR") or _default_replay_dir())
+    with _provider_lock:
+        if _provider is None or _provider_key != key:
+            if kind == "yfinance":
+                _provider = YFinanceProvider()
+            else:
+                _provider = ReplayPriceProvider(key[1], upstream=YFinanceProvider() if kind == "record" else None)
+            _provider_key = key
+        return _provider
+
+
+def _wait_per_ticker(executor: ThreadPoolExecutor, tickers: list[str], timeout: float, workers: int):
+    """
+    Run ``_yfinance_quote`` per ticker, giving each lookup ``timeout`` seconds from
+    when it starts running rather than from when it was queued.
+
+    A lookup past its own timeout is abandoned, so a hung symbol only holds up its
+    worker. All lookups together never wait longer than every worker running its
+    share back to back, capped by the request's latency budget.
+    """
+    started: dict[str, float] = {}
+
+    def lookup(ticker: str) -> Quote:
+        started[ticker] = time.monotonic()
+        return _yfinance_quote(ticker)
+
+    end = time.monotonic() + remaining_budget(timeout * math.ceil(len(tickers) / workers))
+    futures = {executor.submit(lookup, ticker): ticker for ticker in tickers}
+    done: set = set()
+    pending = set(futures)
+    expired: set = set()
+    while pending:
+        now = time.monotonic()
+        for future in list(pending):
+            began = started.get(futures[future])
+            if began is not None and now - began >= timeout and not future.done():
+                pending.discard(future)
+                expired.add(future)
+        if not pending or now >= end:
+            break
+        expiries = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        finished, pending = wait(pending, timeout=max(0.0, min(expiries + [end]) - now), return_when=FIRST_COMPLETED)
+        done |= finished
+    return done, pending | expired, futures
+
+
+def _yfinance_quote(ticker: str) -> Quote:
+    # fast_info reads a small chart endpoint; fall back to the full info scrape only
+    # when it has no price for this symbol.
+    tick = yf.Ticker(ticker)
+    fast = tick.fast_info
+    price = _positive(fast.get("last_price"))
+    prev_close = _positive(fast.get("regular_market_previous_close")) or _positive(fast.get("previous_close"))
+    if price and prev_close:
+        return price, prev_close
+
+    info = tick.info
+    price = price or _positive(info.get("currentPrice")) or _positive(info.get("regularMarketPrice"))
+    if not price:
+        raise LookupError(f"No price quoted for {ticker}")
+    prev_close = prev_close or info.get("previousClose") or info.get("regularMarketPreviousClose", 0)
+    return price, prev_close
+
+
+def _positive(value) -> float | None:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value) or value <= 0:
+        return None
+    return value
+
+
+def _write_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _default_replay_dir() -> str:
+    cur_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.normpath(os.path.join(cur_dir, DEFAULT_REPLAY_DIR))
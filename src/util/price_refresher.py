@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any
+
+from src.util.market_calendar import is_market_open
+from src.util.yfinance import refresh_quotes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 30.0
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class PriceRefresher:
+    """
+    One background quote loop shared by every open dashboard.
+
+    While anyone is subscribed, the watched tickers are re-quoted every ``interval``
+    seconds into the shared quote cache. Stocks are skipped while the market is
+    closed; crypto is refreshed around the clock. Each subscriber receives lists of
+    ``{"ticker", "price", "day_change_pct"}`` updates for the tickers whose quote
+    changed, starting with the latest known quote of every ticker.
+    """
+
+    def __init__(self, interval: float | None = None):
+        self.interval = interval if interval is not None else _interval_from_env()
+        self._lock = threading.Lock()
+        self._watched: dict[str, bool] = {}
+        self._latest: dict[str, dict[str, Any]] = {}
+        self._subscribers: list[queue.Queue] = []
+        self._thread: threading.Thread | None = None
+
+    def watch(self, tickers: dict[str, bool]) -> None:
+        """Refresh ``tickers`` (ticker -> is crypto) from now on."""
+
+        with self._lock:
+            self._watched.update(tickers)
+
+    def subscribe(self) -> queue.Queue:
+        updates: queue.Queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self._latest:
+                updates.put(list(self._latest.values()))
+            self._subscribers.append(updates)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="price-refresher", daemon=True)
+                self._thread.start()
+        return updates
+
+    def unsubscribe(self, updates: queue.Queue) -> None:
+        with self._lock:
+            if updates in self._subscribers:
+                self._subscribers.remove(updates)
+
+    def refresh(self) -> list[dict[str, Any]]:
+        """Re-quote the watched tickers once and publish what changed."""
+
+        with self._lock:
+            watched = dict(self._watched)
+        market_open = is_market_open()
+
+        changed = []
+        for crypto in [False, True]:
+            tickers = [
+                ticker
+                for ticker, is_crypto in watched.items()
+                if is_crypto == crypto and (crypto or market_open or ticker not in self._latest)
+            ]
+            if not tickers:
+                continue
+            try:
+                quotes = refresh_quotes(tickers, crypto=crypto)
+            except Exception as exc:
+                logger.warning("Price refresh failed: %s", exc)
+                continue
+            for ticker, (price, prev_close) in quotes.items():
+                update = {
+                    "ticker": ticker,
+                    "price": price,
+                    "day_change_pct": 100 * (price - prev_close) / prev_close if prev_close else 0.0,
+                }
+                with self._lock:
+                    if self._latest.get(ticker) != update:
+                        self._latest[ticker] = update
+                        changed.append(update)
+
+        if changed:
+            self._publish(changed)
+        return changed
+
+    def _publish(self, updates: list[dict[str, Any]]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            # A stalled client only misses its oldest batches
+            while True:
+                try:
+                    subscriber.put_nowait(updates)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            self.refresh()
+            time.sleep(self.interval)
+
+
+def get_price_refresher() -> PriceRefresher:
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = PriceRefresher()
+        return _refresher
+
+
+def _interval_from_env() -> float:
+    try:
+        return float(os.getenv("PRICE_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL))
+    except ValueError:
+        return DEFAULT_REFRESH_INTERVAL
+
+
+_refresher: PriceRefresher | None = None
+_refresher_lock = threading.Lock()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterator
+
+_memo: ContextVar[dict[Hashable, Any] | None] = ContextVar("request_memo", default=None)
+
+
+@contextmanager
+def request_scope() -> Iterator[dict[Hashable, Any]]:
+    """
+    Share loaded tabs and prices between the calls made inside the block.
+
+    Everything memoized in the scope is dropped when the outermost block exits, so
+    separate requests never see each other's data. A nested scope reuses the one
+    already in effect.
+    """
+    memo = _memo.get()
+    if memo is not None:
+        yield memo
+        return
+    memo = {}
+    token = _memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _memo.reset(token)
+
+
+def current_scope() -> dict[Hashable, Any] | None:
+    """The memo of the active request scope, or None outside of one."""
+
+    return _memo.get()
+
+
+def memoized(key: Hashable, load: Callable[[], Any]) -> Any:
+    """``load()`` once per request scope for ``key``; called every time outside a scope."""
+
+    memo = _memo.get()
+    if memo is None:
+        return load()
+    if key not in memo:
+        memo[key] = load()
+    return memo[key]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_BUDGET = 20.0
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_SECONDS = 60.0
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+@contextmanager
+def latency_budget(seconds: float | None = None) -> Iterator[None]:
+    """
+    Bound the upstream calls made inside the block to ``seconds`` in total.
+
+    Defaults to REQUEST_BUDGET_SECONDS. A nested budget never extends the one
+    already in effect.
+    """
+    if seconds is None:
+        seconds = _env_float("REQUEST_BUDGET_SECONDS", DEFAULT_REQUEST_BUDGET)
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget(timeout: float | None = None) -> float | None:
+    """``timeout`` capped by what is left of the current latency budget (never negative)."""
+
+    deadline = _deadline.get()
+    if deadline is None:
+        return timeout
+    left = max(0.0, deadline - time.monotonic())
+    return left if timeout is None else min(timeout, left)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of calling a provider once the request's latency budget is spent."""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing upstream for a while.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and allow()
+    returns False for ``reset_seconds``. After that one trial call is let through;
+    it closes the breaker on success or re-opens it on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int | None = None, reset_seconds: float | None = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(
+            _env_float("CIRCUIT_FAILURE_THRESHOLD", DEFAULT_FAILURE_THRESHOLD)
+        )
+        self.reset_seconds = (
+            reset_seconds if reset_seconds is not None else _env_float("CIRCUIT_RESET_SECONDS", DEFAULT_RESET_SECONDS)
+        )
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("%s circuit closed", self.name)
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release(self) -> None:
+        """End a trial call that could not tell whether the upstream recovered."""
+
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("%s circuit opened after %d failures", self.name, self._failures)
+                self._opened_at = time.monotonic()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 36 * 3600:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} days"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "../../.cache/sheets"
+DEFAULT_MAX_AGE_SECONDS = 60.0
+DEFAULT_SYNC_WINDOW = 20
+DEFAULT_FULL_SYNC_SECONDS = 86400.0
+DEFAULT_FULL_SYNC_APPENDS = 50
+
+_memory: dict[str, dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def cache_dir() -> str:
+    configured = os.getenv("SHEET_CACHE_DIR")
+    if configured:
+        return configured
+    cur_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.normpath(os.path.join(cur_dir, CACHE_DIR))
+
+
+def max_age_seconds() -> float:
+    """Seconds a cached worksheet may be served before its revision is re-checked."""
+
+    try:
+        return float(os.getenv("SHEET_CACHE_MAX_AGE", DEFAULT_MAX_AGE_SECONDS))
+    except ValueError:
+        return DEFAULT_MAX_AGE_SECONDS
+
+
+def is_enabled() -> bool:
+    return os.getenv("SHEET_CACHE_DISABLED", "").strip().lower() not in {"1", "true", "yes"}
+
+
+def incremental_sync_enabled() -> bool:
+    return os.getenv("SHEET_INCREMENTAL_SYNC", "1").strip().lower() not in {"0", "false", "no"}
+
+
+def sync_window() -> int:
+    """Number of trailing rows re-fetched and hashed to detect edits before appending."""
+
+    try:
+        return max(1, int(os.getenv("SHEET_SYNC_WINDOW", DEFAULT_SYNC_WINDOW)))
+    except ValueError:
+        return DEFAULT_SYNC_WINDOW
+
+
+def full_sync_due(full_synced_at: float | None, appends: int | None) -> bool:
+    """
+    Whether a copy kept up to date by appends must be reloaded in full.
+
+    Incremental syncs only check the trailing window, so edits above it are picked
+    up by the full reload forced once SHEET_FULL_SYNC_SECONDS (default a day) have
+    passed or SHEET_FULL_SYNC_APPENDS (default 50) appends were applied since the
+    last one.
+    """
+    if full_synced_at is None or appends is None:
+        return True
+    try:
+        max_age = float(os.getenv("SHEET_FULL_SYNC_SECONDS", DEFAULT_FULL_SYNC_SECONDS))
+    except ValueError:
+        max_age = DEFAULT_FULL_SYNC_SECONDS
+    try:
+        max_appends = int(os.getenv("SHEET_FULL_SYNC_APPENDS", DEFAULT_FULL_SYNC_APPENDS))
+    except ValueError:
+        max_appends = DEFAULT_FULL_SYNC_APPENDS
+    return time.time() - full_synced_at >= max_age or appends >= max_appends
+
+
+def rows_hash(rows: list[list[str]]) -> str:
+    """Hash rows ignoring trailing blank cells, which the Sheets API trims inconsistently."""
+
+    trimmed = [_trim_row(row) for row in rows]
+    return hashlib.sha1(json.dumps(trimmed).encode()).hexdigest()
+
+
+def load(sheet_id: str, worksheet_key: str) -> dict[str, Any] | None:
+    path = _entry_path(sheet_id, worksheet_key)
+    with _lock:
+        entry = _memory.get(path)
+        if entry is not None:
+            return entry
+
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Discarding unreadable sheet cache entry %s", path)
+        return None
+
+    if entry.get("sheet_id") != sheet_id or entry.get("worksheet") != worksheet_key:
+        return None
+
+    with _lock:
+        _memory[path] = entry
+    return entry
+
+
+def is_fresh(entry: dict[str, Any], max_age: float | None = None) -> bool:
+    if max_age is None:
+        max_age = max_age_seconds()
+    return time.time() - entry.get("checked_at", 0) <= max_age
+
+
+def store(
+    sheet_id: str,
+    worksheet_key: str,
+    revision: str | None,
+    values: list[list[str]],
+    appended_to: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Cache ``values``; ``appended_to`` is the entry they extend when they were synced incrementally."""
+
+    now = time.time()
+    tail_rows = min(sync_window(), max(0, len(values) - 1))
+    entry = {
+        "sheet_id": sheet_id,
+        "worksheet": worksheet_key,
+        "revision": revision,
+        "checked_at": now,
+        "full_synced_at": appended_to.get("full_synced_at") if appended_to else now,
+        "appends": appended_to.get("appends", 0) + 1 if appended_to else 0,
+        "tail_rows": tail_rows,
+        "tail_hash": rows_hash(values[len(values) - tail_rows :]),
+        "values": values,
+    }
+    _write(_entry_path(sheet_id, worksheet_key), entry)
+    return entry
+
+
+def touch(entry: dict[str, Any], revision: str | None = None) -> None:
+    """Mark an entry as re-validated against the current spreadsheet revision."""
+
+    entry["checked_at"] = time.time()
+    if revision is not None:
+        entry["revision"] = revision
+    _write(_entry_path(entry["sheet_id"], entry["worksheet"]), entry)
+
+
+def advance_revision(sheet_id: str, old_revision: str | None, new_revision: str | None) -> None:
+    """Carry entries at ``old_revision`` forward after a write made by this process.
+
+    Revisions are spreadsheet-wide, so our own Net Worth updates would otherwise
+    force a re-download of the unchanged Buy and Sell tabs.
+    """
+
+    if not old_revision or not new_revision or old_revision == new_revision:
+        return
+    for path, entry in _entries_for_sheet(sheet_id):
+        if entry.get("revision") == old_revision:
+            entry["revision"] = new_revision
+            _write(path, entry)
+
+
+def invalidate(sheet_id: str | None = None, worksheet_key: str | None = None) -> None:
+    """Drop cached worksheets for one tab, one spreadsheet, or everything."""
+
+    if sheet_id and worksheet_key:
+        paths = [_entry_path(sheet_id, worksheet_key)]
+    else:
+        paths = [path for path, entry in _entries_for_sheet(sheet_id)]
+
+    with _lock:
+        for path in paths:
+            _memory.pop(path, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _entries_for_sheet(sheet_id: str | None) -> list[tuple[str, dict[str, Any]]]:
+    directory = cache_dir()
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        with _lock:
+            entry = _memory.get(path)
+        if entry is None:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+        if sheet_id is None or entry.get("sheet_id") == sheet_id:
+            entries.append((path, entry))
+    return entries
+
+
+def _trim_row(row: list[str]) -> list[str]:
+    end = len(row)
+    while end and row[end - 1] == "":
+        end -= 1
+    return row[:end]
+
+
+def _entry_path(sheet_id: str, worksheet_key: str) -> str:
+    digest = hashlib.sha1(f"{sheet_id}\0{worksheet_key}".encode()).hexdigest()[:20]
+    return os.path.join(cache_dir(), f"{digest}.json")
+
+
+def _write(path: str, entry: dict[str, Any]) -> None:
+    with _lock:
+        _memory[path] = entry
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Unable to persist sheet cache entry %s", path, exc_info=True)
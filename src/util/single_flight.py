@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+
+class _Call:
+    __slots__ = ["event", "found", "value", "error"]
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.found = False
+        self.value = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent fetches of the same keys into one in-flight call.
+
+    A caller claims the keys nobody is fetching yet and fetches only those; for the
+    rest it waits on the callers already fetching them and shares their results or
+    exceptions. Nothing is kept once a fetch completes, so caching stays with the
+    caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        return self.do_many([key], lambda keys: {key: fetch()})[key]
+
+    def do_many(
+        self,
+        keys: Iterable[Hashable],
+        fetch: Callable[[list[Hashable]], dict[Hashable, Any]],
+    ) -> dict[Hashable, Any]:
+        """
+        Return ``{key: value}`` for ``keys``, calling ``fetch(claimed_keys)`` at most once.
+
+        Keys missing from the dict ``fetch`` returns are left out of the result. If a
+        fetch raises, every caller waiting on one of its keys re-raises that exception.
+        """
+        keys = list(dict.fromkeys(keys))
+        calls: dict[Hashable, _Call] = {}
+        claimed = []
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    claimed.append(key)
+                calls[key] = call
+
+        if claimed:
+            try:
+                values = fetch(claimed)
+            except BaseException as exc:
+                self._finish(claimed, calls, {}, exc)
+                raise
+            self._finish(claimed, calls, values, None)
+
+        results = {}
+        for key in keys:
+            call = calls[key]
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            if call.found:
+                results[key] = call.value
+        return results
+
+    def _finish(
+        self,
+        claimed: list[Hashable],
+        calls: dict[Hashable, _Call],
+        values: dict[Hashable, Any],
+        error: BaseException | None,
+    ) -> None:
+        with self._lock:
+            for key in claimed:
+                self._calls.pop(key, None)
+        for key in claimed:
+            call = calls[key]
+            call.error = error
+            if key in values:
+                call.found = True
+                call.value = values[key]
+            call.event.set()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from src.util.single_flight import SingleFlight
+
+DEFAULT_MAX_ENTRIES = 8
+
+
+class SnapshotEngine:
+    """
+    Serve one materialized result per key until its inputs change.
+
+    ``inputs(key)`` cheaply describes everything the result depends on (revisions,
+    timestamps) as a hashable value, or returns None when it cannot tell, in which
+    case the result is rebuilt on every read. ``build(key)`` computes the result.
+    Each result is stamped with a version derived from its inputs as read right
+    after the build, so inputs the build itself refreshed (e.g. quotes it fetched)
+    are part of the version; concurrent rebuilds of one key are coalesced. Results
+    are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        inputs: Callable[[Hashable], Hashable | None],
+        build: Callable[[Hashable], Any],
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self._inputs = inputs
+        self._build = build
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._snapshots: OrderedDict[Hashable, tuple[Hashable, str, Any]] = OrderedDict()
+        self._flights = SingleFlight()
+
+    def version(self, key: Hashable) -> str | None:
+        """Version the snapshot for ``key`` has, or would have after a rebuild, without building it."""
+
+        inputs = self._inputs(key)
+        return None if inputs is None else _version(inputs)
+
+    def current(self, key: Hashable) -> tuple[str, Any] | None:
+        """The held ``(version, result)`` for ``key`` if its inputs are unchanged, else None."""
+
+        inputs = self._inputs(key)
+        if inputs is None:
+            return None
+        with self._lock:
+            held = self._snapshots.get(key)
+            if held is None or held[0] != inputs:
+                return None
+            self._snapshots.move_to_end(key)
+            return held[1], held[2]
+
+    def get(self, key: Hashable) -> tuple[str | None, Any]:
+        """``(version, result)`` for ``key``, rebuilt first if any input changed."""
+
+        inputs = self._inputs(key)
+        if inputs is not None:
+            with self._lock:
+                held = self._snapshots.get(key)
+                if held is not None and held[0] == inputs:
+                    self._snapshots.move_to_end(key)
+                    return held[1], held[2]
+        return self._flights.do((key, inputs), lambda: self._rebuild(key, inputs))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+    def _rebuild(self, key: Hashable, inputs: Hashable | None) -> tuple[str | None, Any]:
+        result = self._build(key)
+        # Read again even if the first read could not tell: the build may have refreshed them
+        inputs = self._inputs(key)
+        if inputs is None:
+            return None, result
+        version = _version(inputs)
+        with self._lock:
+            self._snapshots[key] = (inputs, version, result)
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+        return version, result
+
+
+def _version(inputs: Hashable) -> str:
+    return hashlib.sha1(repr(inputs).encode()).hexdigest()[:16]
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable
+
+from src.util.gspread import update_portfolio_summary
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 300.0
+INITIAL_BACKOFF_SECONDS = 5.0
+MAX_BACKOFF_SECONDS = 600.0
+CLOSE_TIMEOUT_SECONDS = 30.0
+
+
+class SummaryWriter:
+    """
+    Write-behind queue for the daily Net Worth row.
+
+    Summaries are coalesced per date: only the latest one is kept, and a date is
+    written at most once per ``interval`` seconds. Failed writes are retried with
+    exponential backoff until they succeed or a newer summary replaces them.
+    ``write(summary, day=...)`` receives the ISO date the summary was queued for.
+    """
+
+    def __init__(
+        self,
+        write: Callable[..., Any] = update_portfolio_summary,
+        interval: float | None = None,
+    ):
+        self._write = write
+        self._interval = interval if interval is not None else _interval_from_env()
+        self._condition = threading.Condition()
+        self._pending: dict[str, Any] = {}
+        self._last_written: dict[str, float] = {}
+        self._retry_at: dict[str, float] = {}
+        self._attempts: dict[str, int] = {}
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._status: dict[str, Any] = {
+            "last_success_at": None,
+            "last_success_date": None,
+            "last_error": None,
+            "last_error_at": None,
+        }
+
+    def enqueue(self, summary: Any, day: str | None = None) -> None:
+        day = day or date.today().isoformat()
+        with self._condition:
+            self._pending[day] = summary
+            self._ensure_thread()
+            self._condition.notify()
+
+    def status(self) -> dict[str, Any]:
+        with self._condition:
+            return self._status | {
+                "pending_dates": sorted(self._pending),
+                "retry_attempts": dict(self._attempts),
+                "interval_seconds": self._interval,
+            }
+
+    def flush(self) -> None:
+        """Write every pending summary now, ignoring the coalescing interval."""
+
+        with self._condition:
+            pending = list(self._pending.items())
+            self._pending.clear()
+        for day, summary in pending:
+            self._attempt(day, summary)
+
+    def close(self, timeout: float | None = CLOSE_TIMEOUT_SECONDS) -> None:
+        """Stop the background thread, wait for its write in progress, then flush."""
+
+        with self._condition:
+            self._closed = True
+            thread = self._thread
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def _ensure_thread(self) -> None:
+        if self._closed:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="summary-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due_day, due_at = min(
+                    ((day, self._due_at(day)) for day in self._pending),
+                    key=lambda item: item[1],
+                )
+                if due_at > now:
+                    self._condition.wait(timeout=due_at - now)
+                    continue
+                summary = self._pending.pop(due_day)
+            self._attempt(due_day, summary)
+
+    def _due_at(self, day: str) -> float:
+        last = self._last_written.get(day)
+        due = last + self._interval if last is not None else 0.0
+        return max(due, self._retry_at.get(day, 0.0))
+
+    def _attempt(self, day: str, summary: Any) -> None:
+        try:
+            self._write(summary, day=day)
+        except Exception as exc:
+            logger.warning("Failed to save portfolio summary for %s: %s", day, exc)
+            with self._condition:
+                attempts = self._attempts.get(day, 0) + 1
+                self._attempts[day] = attempts
+                backoff = min(INITIAL_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+                self._retry_at[day] = time.monotonic() + backoff
+                # Keep a newer summary queued in the meantime rather than retrying a stale one.
+                self._pending.setdefault(day, summary)
+                self._status["last_error"] = str(exc)
+                self._status["last_error_at"] = _now()
+                self._condition.notify()
+            return
+
+        with self._condition:
+            self._last_written[day] = time.monotonic()
+            self._attempts.pop(day, None)
+            self._retry_at.pop(day, None)
+            self._status["last_success_at"] = _now()
+            self._status["last_success_date"] = day
+
+
+def enqueue_summary(summary: Any) -> None:
+    """Queue a portfolio summary for the Net Worth tab without waiting for the write."""
+
+    _get_writer().enqueue(summary)
+
+
+def summary_write_status() -> dict[str, Any]:
+    return _get_writer().status()
+
+
+def _get_writer() -> SummaryWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SummaryWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def _interval_from_env() -> float:
+    try:
+        return float(os.getenv("SUMMARY_WRITE_INTERVAL", DEFAULT_INTERVAL_SECONDS))
+    except ValueError:
+        return DEFAULT_INTERVAL_SECONDS
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+_writer: SummaryWriter | None = None
+_writer_lock = threading.Lock()
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any
+
+import pandas as pd
+
+from src.util.gspread import invalidate_worksheet_cache, worksheet_staleness, worksheets_values
+
+DEFAULT_LOCAL_LEDGER = "../../data/test_transactions.csv"
+LOCAL_EXTENSIONS = (".parquet", ".csv")
+
+WorksheetSpec = tuple[str, int | None]
+
+_source: TransactionSource | None = None
+_source_key: tuple | None = None
+_source_lock = threading.Lock()
+
+
+class TransactionSource(ABC):
+    """Where the Buy/Sell ledger tabs are read from, as raw rows of strings."""
+
+    name: str
+
+    @abstractmethod
+    def worksheets_values(self, worksheets: list[WorksheetSpec]) -> list[Any]:
+        """Return rows for each ``(worksheet_name, worksheet_index)``, or the exception raised."""
+
+    def staleness(self, worksheet_name: str, worksheet_index: int | None) -> float | None:
+        """Age in seconds of the rows last returned for a tab if they were a fallback copy."""
+
+        return None
+
+    def invalidate(self) -> None:
+        """Drop anything cached for the ledger tabs so the next read loads them in full."""
+
+    def worksheet_values(self, worksheet_name: str, worksheet_index: int | None) -> list[list[str]]:
+        result = self.worksheets_values([(worksheet_name, worksheet_index)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class GoogleSheetsSource(TransactionSource):
+    name = "sheets"
+
+    def __init__(self, sheet_id: str | None = None, columns: str | None = None):
+        self.sheet_id = sheet_id
+        self.columns = columns
+
+    def worksheets_values(self, worksheets: list[WorksheetSpec]) -> list[Any]:
+        return worksheets_values(worksheets, sheet_id=self.sheet_id, columns=self.columns)
+
+    def staleness(self, worksheet_name: str, worksheet_index: int | None) -> float | None:
+        return worksheet_staleness(self.sheet_id, worksheet_name, worksheet_index, self.columns)
+
+    def invalidate(self) -> None:
+        invalidate_worksheet_cache(self.sheet_id, None, None)
+
+
+class LocalFileSource(TransactionSource):
+    """
+    Ledger tabs exported to local CSV or Parquet files.
+
+    ``path`` is either a directory holding ``<worksheet>.parquet`` / ``<worksheet>.csv``
+    files, or a single file that stands in for the first worksheet (the Buy tab).
+    Files are memory-mapped while reading and re-read only when their mtime changes.
+    """
+
+    name = "local"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cache: dict[str, tuple[float, list[list[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def worksheets_values(self, worksheets: list[WorksheetSpec]) -> list[Any]:
+        results: list[Any] = []
+        for worksheet_name, worksheet_index in worksheets:
+            try:
+                results.append(self._read(self._resolve(worksheet_name, worksheet_index)))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def _resolve(self, worksheet_name: str, worksheet_index: int | None) -> str:
+        directory = self.path if os.path.isdir(self.path) else os.path.dirname(self.path)
+        for extension in LOCAL_EXTENSIONS:
+            candidate = os.path.join(directory, f"{worksheet_name}{extension}")
+            if os.path.isfile(candidate):
+                return candidate
+
+        if worksheet_index == 0 and os.path.isfile(self.path):
+            return self.path
+        raise FileNotFoundError(f"No {worksheet_name} ledger file found under {self.path}")
+
+    def _read(self, path: str) -> list[list[str]]:
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        if path.endswith(".parquet"):
+            df = _read_parquet(path)
+        else:
+            df = pd.read_csv(path, dtype=str, keep_default_na=False, memory_map=True)
+
+        values = [[str(column) for column in df.columns]] + df.to_numpy().tolist()
+        with self._lock:
+            self._cache[path] = (mtime, values)
+        return values
+
+
+def get_transaction_source() -> TransactionSource:
+    """Return the ledger source selected by TRANSACTIONS_SOURCE (``sheets`` or ``local``)."""
+
+    global _source, _source_key
+    kind = os.getenv("TRANSACTIONS_SOURCE", "sheets").strip().lower()
+    if kind not in {"sheets", "local"}:
+        raise ValueError("TRANSACTIONS_SOURCE must be sheets or local")
+
+    if kind == "local":
+        key = (kind, os.getenv("TRANSACTIONS_PATH") or _default_local_ledger())
+    else:
+        key = (kind, os.getenv("TRANSACTIONS_SHEET"), os.getenv("TRANSACTIONS_COLUMNS") or None)
+
+    with _source_lock:
+        if _source is None or _source_key != key:
+            _source = LocalFileSource(key[1]) if kind == "local" else GoogleSheetsSource(*key[1:])
+            _source_key = key
+        return _source
+
+
+def _read_parquet(path: str) -> pd.DataFrame:
+    try:
+        df = pd.read_parquet(path, memory_map=True)
+    except ImportError as exc:
+        raise ImportError("Reading Parquet ledgers requires pyarrow: uv add pyarrow") from exc
+
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime("%Y-%m-%d")
+    return df.astype(object).where(df.notna(), "").astype(str)
+
+
+def _default_local_ledger() -> str:
+    cur_dir = os.path.dirname(os.path.realpath(__file__))
+    return os.path.normpath(os.path.join(cur_dir, DEFAULT_LOCAL_LEDGER))
@@ -2,44 +2,239 @@
 
 # first-party
 from src.config.ColumnNameConsts import ColumnNames as CN
+from src.util.market_calendar import is_market_open, next_market_open
+from src.util.price_provider import get_price_provider
+from src.util.resilience import get_breaker, remaining_budget
+from src.util.single_flight import SingleFlight
 
 # third-party
 import pandas as pd
-import yfinance as yf
+
+# system
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_OPEN = 60.0
+DEFAULT_TTL_CLOSED = 6 * 3600.0
+DEFAULT_TTL_CRYPTO = 120.0
+DEFAULT_STALE_GRACE = 15 * 60.0
+DEFAULT_MISS_RETRY = 60.0
+
+# ticker -> (current price, previous close, expires at, stale until, fetched at)
+_quote_cache = {}
+# ticker -> (retry at, missed at) for tickers whose last lookup returned no quote
+_missed = {}
+_refreshing = set()
+_quote_lock = threading.Lock()
+_quote_flights = SingleFlight()
+
 
 def curr_price(tickers, crypto=False):
     if tickers is None or len(tickers) == 0:
         return None
 
+    tickers = list(dict.fromkeys(tickers))
+    quotes = cached_quotes(tickers, crypto=crypto)
+
     c_prices = pd.Series(dtype=float)
     prev_close_prices = pd.Series(dtype=float)
-
     for ticker in tickers:
-        tick = yf.Ticker(ticker)
-        info = tick.info
-
-        # Get previous close from ticker.info for accurate yesterday's price
-        prev_close_val = info.get('previousClose') or info.get('regularMarketPreviousClose', 0)
-        prev_close_prices[ticker] = prev_close_val
-
-        # Get current price from ticker info
-        curr_price_val = info.get('currentPrice') or info.get('regularMarketPrice', 0)
-        c_prices[ticker] = curr_price_val
-
+        if ticker not in quotes:
+            continue
+        c_prices[ticker], prev_close_prices[ticker] = quotes[ticker]
 
     c_prices.name = CN.PRICE
 
-    # print("Previous close prices")
-    # print(prev_close_prices.to_string())
-    # print("Current prices")
-    # print(c_prices.to_string())
-
-    # Calculate day change using previousClose from ticker info
+    # Calculate day change using the previous close
     day_change = pd.Series(0.0, index=c_prices.index)
-    for ticker in tickers:
+    for ticker in c_prices.index:
         if prev_close_prices[ticker] > 0:
             day_change[ticker] = (c_prices[ticker] - prev_close_prices[ticker]) / prev_close_prices[ticker]
 
     day_change = day_change.fillna(0)
     day_change.name = CN.DAY_CHNG
     return pd.concat([c_prices, day_change], axis=1)
+
+
+def cached_quotes(tickers, crypto=False):
+    """
+    Quotes for ``tickers`` from the TTL cache, fetching only what is missing.
+
+    Quotes live for QUOTE_TTL_OPEN seconds during the regular NYSE session and for
+    QUOTE_TTL_CLOSED seconds (capped at the next open) outside it; crypto uses
+    QUOTE_TTL_CRYPTO around the clock. An expired quote is still served for
+    QUOTE_STALE_GRACE seconds while a background thread refreshes it. When a quote
+    cannot be fetched at all, its last known value is served; see stale_quote_ages().
+    """
+    if _env_flag("QUOTE_CACHE_DISABLED"):
+        return _fetch_guarded(tickers)
+
+    now = time.time()
+    quotes = {}
+    missing = []
+    stale = []
+    with _quote_lock:
+        for ticker in tickers:
+            entry = _quote_cache.get(ticker)
+            if entry is None or now >= entry[3]:
+                missing.append(ticker)
+                continue
+            quotes[ticker] = entry[:2]
+            if now >= entry[2] and ticker not in _refreshing:
+                stale.append(ticker)
+        _refreshing.update(stale)
+
+    if stale:
+        threading.Thread(target=_refresh_quotes, args=(stale, crypto), name="quote-refresh", daemon=True).start()
+    if missing:
+        fetched = _fetch_guarded(missing)
+        _store_quotes(missing, fetched, crypto)
+        quotes.update(fetched)
+        with _quote_lock:
+            for ticker in missing:
+                if ticker not in fetched and ticker in _quote_cache:
+                    quotes[ticker] = _quote_cache[ticker][:2]
+    return quotes
+
+
+def stale_quote_ages(tickers):
+    """Seconds since each ticker's cached quote was fetched, for quotes past their stale grace."""
+    now = time.time()
+    with _quote_lock:
+        return {
+            ticker: now - entry[4]
+            for ticker in tickers
+            if (entry := _quote_cache.get(ticker)) is not None and now >= entry[3]
+        }
+
+
+def quote_stamps(tickers):
+    """
+    When each ticker's cached quote was fetched, or None if any of them has expired.
+
+    An expired quote that is being refreshed in the background keeps its stamp, since
+    it is still the one being served. A ticker whose last lookup returned no quote is
+    stamped with the time of that miss, and expires QUOTE_MISS_RETRY seconds (default
+    60) later so it is looked up again. Tickers that were never looked up are stamped
+    None. Returns None while the quote cache is disabled, since every lookup then
+    fetches fresh prices.
+    """
+    if _env_flag("QUOTE_CACHE_DISABLED"):
+        return None
+    now = time.time()
+    stamps = {}
+    with _quote_lock:
+        for ticker in tickers:
+            entry = _quote_cache.get(ticker)
+            miss = _missed.get(ticker)
+            if entry is not None and (now < entry[2] or ticker in _refreshing):
+                stamps[ticker] = entry[4]
+            elif miss is not None and now < miss[0]:
+                stamps[ticker] = miss[1]
+            elif entry is None and miss is None:
+                stamps[ticker] = None
+            else:
+                return None
+    return stamps
+
+
+def clear_quote_cache():
+    with _quote_lock:
+        _quote_cache.clear()
+        _missed.clear()
+
+
+def fetch_quotes(tickers, timeout=None):
+    """
+    Fetch (current price, previous close) per ticker from the configured price provider.
+
+    Tickers already being fetched by another thread are not requested again; their
+    in-flight result is shared instead.
+    """
+    provider = get_price_provider()
+
+    def fetch(claimed):
+        quotes = provider.quotes([ticker for _, ticker in claimed], timeout=timeout)
+        return {(provider.name, ticker): quote for ticker, quote in quotes.items()}
+
+    quotes = _quote_flights.do_many([(provider.name, ticker) for ticker in tickers], fetch)
+    return {ticker: quote for (_, ticker), quote in quotes.items()}
+
+
+def refresh_quotes(tickers, crypto=False):
+    """Fetch quotes for ``tickers`` regardless of their age and store them in the cache."""
+    quotes = _fetch_guarded(tickers)
+    _store_quotes(tickers, quotes, crypto)
+    return quotes
+
+
+def _fetch_guarded(tickers):
+    # Skip the provider while its circuit is open or the request's latency budget is spent
+    if remaining_budget() == 0:
+        return {}
+    breaker = get_breaker("quotes")
+    if not breaker.allow():
+        return {}
+    try:
+        quotes = {ticker: quote for ticker, quote in fetch_quotes(tickers).items() if _priced(quote[0])}
+    except Exception as exc:
+        logger.warning("Quote lookup failed for %s: %s", ", ".join(tickers), exc)
+        breaker.record_failure()
+        return {}
+    # An empty result means the provider answered without quotes for these symbols;
+    # they are recorded as per-ticker misses, not as an outage.
+    breaker.record_success()
+    return quotes
+
+
+def _refresh_quotes(tickers, crypto):
+    try:
+        refresh_quotes(tickers, crypto)
+    finally:
+        with _quote_lock:
+            _refreshing.difference_update(tickers)
+
+
+def _store_quotes(tickers, quotes, crypto):
+    now = time.time()
+    ttl = _quote_ttl(crypto)
+    grace = _env_float("QUOTE_STALE_GRACE", DEFAULT_STALE_GRACE)
+    retry = _env_float("QUOTE_MISS_RETRY", DEFAULT_MISS_RETRY)
+    with _quote_lock:
+        for ticker, (price, prev_close) in quotes.items():
+            if _priced(price):
+                _quote_cache[ticker] = (price, prev_close, now + ttl, now + ttl + grace, now)
+                _missed.pop(ticker, None)
+        for ticker in tickers:
+            if not _priced((quotes.get(ticker) or (None,))[0]):
+                _missed[ticker] = (now + retry, now)
+
+
+def _priced(price):
+    # A missing or non-positive price is a miss, never a quote to cache or value positions at
+    return isinstance(price, (int, float)) and price > 0
+
+
+def _quote_ttl(crypto):
+    if crypto:
+        return _env_float("QUOTE_TTL_CRYPTO", DEFAULT_TTL_CRYPTO)
+    if is_market_open():
+        return _env_float("QUOTE_TTL_OPEN", DEFAULT_TTL_OPEN)
+    # Regular-session prices cannot move before the next open.
+    until_open = next_market_open().timestamp() - time.time()
+    return max(0.0, min(_env_float("QUOTE_TTL_CLOSED", DEFAULT_TTL_CLOSED), until_open))
+
+
+def _env_flag(name):
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes"}
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
@@ -1,5 +1,5 @@
 $(document).ready(function () {
-	$('#summary').DataTable({
+	var table = $('#summary').DataTable({
 		"pageLength": 100,
 		"paging": false,
 		"searching": false,
@@ -19,12 +19,7 @@ $(document).ready(function () {
 				"targets": [4, 9, 11, 12, 13, 14, 15],
 				"render": $.fn.dataTable.render.number(',', '.', 2, '', '%'),
 				"createdCell": function (td, cellData, rowData, row, col) {
-					var val = parseFloat(cellData);
-					if (val > 0) {
-						$(td).css('color', 'green');
-					} else if (val < 0) {
-						$(td).css('color', 'red');
-					}
+					colorCell(td, cellData);
 				}
 			},
 			{
@@ -33,4 +28,65 @@ $(document).ready(function () {
 			}
 		]
 	});
+
+	streamPrices(table);
 });
+
+function colorCell(td, cellData) {
+	var val = parseFloat(cellData);
+	if (val > 0) {
+		$(td).css('color', 'green');
+	} else if (val < 0) {
+		$(td).css('color', 'red');
+	} else {
+		$(td).css('color', '');
+	}
+}
+
+// Apply live price/day-change updates pushed by the server to the matching rows
+function streamPrices(table) {
+	if (!window.EventSource || !table.rows().count()) {
+		return;
+	}
+
+	var rowsByTicker = {};
+	table.rows().every(function (rowIdx) {
+		rowsByTicker[this.data()[1]] = rowIdx;
+	});
+
+	var source = new EventSource('prices/stream');
+	source.onmessage = function (event) {
+		JSON.parse(event.data).forEach(function (update) {
+			var rowIdx = rowsByTicker[update.ticker];
+			if (rowIdx === undefined) {
+				return;
+			}
+			var data = table.row(rowIdx).data();
+			var qty = parseFloat(data[3]);
+			var total = parseFloat(data[7]);
+			var dayChange = update.day_change_pct / 100;
+			var marketValue = qty * update.price;
+			var gain = marketValue - total;
+
+			setCell(table, rowIdx, 2, update.price.toFixed(2), false);
+			setCell(table, rowIdx, 4, update.day_change_pct.toFixed(2), true);
+			if (dayChange !== -1) {
+				setCell(table, rowIdx, 5, Math.round(marketValue * dayChange / (1 + dayChange)), false);
+			}
+			setCell(table, rowIdx, 8, Math.round(marketValue), false);
+			if (total) {
+				setCell(table, rowIdx, 9, (100 * gain / total).toFixed(2), true);
+			}
+			setCell(table, rowIdx, 10, Math.round(gain), false);
+		});
+		table.draw(false);
+	};
+}
+
+function setCell(table, rowIdx, col, value, colored) {
+	var cell = table.cell(rowIdx, col);
+	cell.data(String(value));
+	if (colored) {
+		colorCell(cell.node(), value);
+	}
+}
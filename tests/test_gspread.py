@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+
+# first-party
+import src.util.gspread as gs
+from src.config.ColumnNameConsts import ColumnNames as CN
+import src.util.resilience as resilience
+from src.util import sheet_cache
+from src.util.resilience import BudgetExhausted, latency_budget
+
+# third-party
+import gspread
+import pytest
+import requests
+from google.auth.credentials import Credentials
+from requests.adapters import HTTPAdapter
+
+# system
+import json
+import re
+from datetime import timedelta
+
+SHEET_ID = "sheet"
+
+
+class _FakeWorksheet:
+    def __init__(self, title, id):
+        self.title = title
+        self.id = id
+
+
+class _FakeSpreadsheet:
+    def __init__(self, tabs, drive):
+        self.tabs = tabs
+        self.drive = drive
+        self.batch_gets = []
+        self.batch_updates = []
+        self.failing = False
+
+    def worksheet(self, name):
+        if name not in self.tabs:
+            raise gspread.WorksheetNotFound(name)
+        return _FakeWorksheet(name, list(self.tabs).index(name))
+
+    def get_worksheet(self, index):
+        return _FakeWorksheet(list(self.tabs)[index], index)
+
+    def values_batch_get(self, ranges):
+        if self.failing:
+            raise ConnectionError("Sheets unavailable")
+        self.batch_gets.append(list(ranges))
+        return {"valueRanges": [{"values": self._rows(name)} for name in ranges]}
+
+    def batch_update(self, body):
+        self.batch_updates.append(body)
+        self.drive.touch()
+
+    def _rows(self, name):
+        title, _, cells = name.partition("!")
+        rows = self.tabs[title.strip("'")]
+        match = re.fullmatch(r"[A-Z]*(\d*):[A-Z]*(\d*)", cells)
+        if not match:
+            return rows
+        first, last = match.groups()
+        return rows[int(first or 1) - 1 : int(last) if last else None]
+
+
+class _FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def _insufficient_scope():
+    response = requests.Response()
+    response.status_code = 403
+    response._content = json.dumps(
+        {"error": {"code": 403, "message": "Request had insufficient authentication scopes.", "status": "PERMISSION_DENIED"}}
+    ).encode()
+    return gspread.exceptions.APIError(response)
+
+
+class _FakeHTTPClient:
+    def __init__(self):
+        self.revision = "r1"
+        self.version = 1
+        self.revision_reads = 0
+        self.failing = False
+        self.drive_scope = True
+
+    def request(self, method, url, params=None):
+        self.revision_reads += 1
+        if self.failing:
+            raise ConnectionError("Drive unavailable")
+        if not self.drive_scope:
+            raise _insufficient_scope()
+        return _FakeResponse({"modifiedTime": self.revision, "version": str(self.version)})
+
+    def touch(self):
+        self.version += 1
+        self.revision = f"r{self.version}"
+
+
+class _FakeClient:
+    def __init__(self, tabs):
+        self.http_client = _FakeHTTPClient()
+        self.spreadsheet = _FakeSpreadsheet(tabs, self.http_client)
+
+    def open_by_key(self, sheet_id):
+        return self.spreadsheet
+
+
+@pytest.fixture
+def fake_sheets(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHEET_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("SHEET_CACHE_MAX_AGE", "0")
+    monkeypatch.delenv("SHEET_CACHE_DISABLED", raising=False)
+    monkeypatch.setattr(sheet_cache, "_memory", {})
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(gs, "_stale_served", {})
+    monkeypatch.setattr(gs, "_net_worth_indexes", {})
+    client = _FakeClient(
+        {
+            "Buy": [["Date", "Ticker"], ["2024-01-02", "AAPL"]],
+            "Sell": [["Date", "Ticker"]],
+            gs.NET_WORTH_WORKSHEET: [gs.NET_WORTH_HEADERS, ["2024-01-02"]],
+        }
+    )
+    monkeypatch.setattr(gs, "load_gspread", lambda: client)
+    gs.reset_gspread()
+    yield client
+    gs.reset_gspread()
+
+
+def test_spent_budget_serves_the_cache_without_calling_sheets(fake_sheets):
+    assert gs.worksheet_values(SHEET_ID, "Buy") == [["Date", "Ticker"], ["2024-01-02", "AAPL"]]
+    fake_sheets.spreadsheet.tabs["Buy"].append(["2024-01-03", "MSFT"])
+    fake_sheets.http_client.revision = "r2"
+    reads = fake_sheets.http_client.revision_reads
+
+    with latency_budget(0):
+        assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 2
+    assert fake_sheets.http_client.revision_reads == reads
+    assert len(fake_sheets.spreadsheet.batch_gets) == 1
+    assert gs.worksheet_staleness(SHEET_ID, "Buy") is not None
+    assert resilience.get_breaker("sheets").state == "closed"
+
+    assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 3
+    assert gs.worksheet_staleness(SHEET_ID, "Buy") is None
+
+
+def test_tabs_are_fetched_with_one_batch_get(fake_sheets):
+    values = gs.worksheets_values([("Buy", 0), ("Sell", 0), ("Missing", None)], sheet_id=SHEET_ID)
+
+    assert values[0] == [["Date", "Ticker"], ["2024-01-02", "AAPL"]]
+    assert values[1] == [["Date", "Ticker"]]
+    assert isinstance(values[2], gspread.WorksheetNotFound)
+    assert fake_sheets.spreadsheet.batch_gets == [["'Buy'", "'Sell'"]]
+
+    # Unchanged tabs are not downloaded again
+    assert gs.worksheets_values([("Sell", 0), ("Buy", 0)], sheet_id=SHEET_ID)[1] == values[0]
+    assert len(fake_sheets.spreadsheet.batch_gets) == 1
+
+
+def test_expired_copy_is_refetched_only_when_the_revision_changed(fake_sheets):
+    gs.worksheet_values(SHEET_ID, "Buy")
+    fake_sheets.spreadsheet.tabs["Buy"].append(["2024-01-03", "MSFT"])
+
+    # Past its max age the copy is re-validated, and kept while the revision matches
+    assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 2
+    assert len(fake_sheets.spreadsheet.batch_gets) == 1
+    assert fake_sheets.http_client.revision_reads == 2
+
+    fake_sheets.http_client.revision = "r2"
+    assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 3
+    assert len(fake_sheets.spreadsheet.batch_gets) == 2
+    assert sheet_cache.load(SHEET_ID, "Buy")["revision"] == "r2"
+
+
+def test_append_new_rows_extends_only_an_unchanged_trailing_window(fake_sheets, monkeypatch):
+    monkeypatch.setenv("SHEET_SYNC_WINDOW", "2")
+    header = ["Date", "Ticker", "Qty"]
+    cached = [header, ["2024-01-02", "AAPL", "1"], ["2024-01-03", "MSFT", "2"], ["2024-01-04", "NVDA", "3"]]
+    entry = sheet_cache.store(SHEET_ID, "Buy", "r1", cached)
+
+    # Rows fetched from the start of the window: the two cached ones, then the appended rows
+    appended = gs._append_new_rows(entry, [header], cached[2:] + [["2024-01-05", "TSLA"]])
+    assert appended == cached + [["2024-01-05", "TSLA", ""]]
+    assert gs._append_new_rows(entry, [header], cached[2:]) == cached
+
+    # An edit inside the window, a changed header or a shrink all need a full reload
+    assert gs._append_new_rows(entry, [header], [cached[2], ["2024-01-04", "NVDA", "4"]]) is None
+    assert gs._append_new_rows(entry, [["Date", "Symbol", "Qty"]], cached[2:]) is None
+    assert gs._append_new_rows(entry, [header], cached[2:3]) is None
+    assert gs._append_new_rows(entry, [header], [cached[1], cached[3]]) is None
+
+
+def test_shrunk_tab_is_reloaded_in_full(fake_sheets, monkeypatch):
+    monkeypatch.setenv("SHEET_SYNC_WINDOW", "1")
+    tabs = fake_sheets.spreadsheet.tabs
+    tabs["Buy"].append(["2024-01-03", "MSFT"])
+    gs.worksheet_values(SHEET_ID, "Buy")
+
+    del tabs["Buy"][-1]
+    fake_sheets.http_client.revision = "r2"
+    assert gs.worksheet_values(SHEET_ID, "Buy") == [["Date", "Ticker"], ["2024-01-02", "AAPL"]]
+    assert fake_sheets.spreadsheet.batch_gets[-1] == ["'Buy'"]
+
+
+def test_unreadable_revision_still_loads_tabs_without_opening_the_breaker(fake_sheets, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "2")
+    fake_sheets.http_client.failing = True
+
+    # Cold cache: the tabs are downloaded and stored without a revision
+    for _ in range(3):
+        assert gs.worksheet_values(SHEET_ID, "Buy") == [["Date", "Ticker"], ["2024-01-02", "AAPL"]]
+    assert sheet_cache.load(SHEET_ID, "Buy")["revision"] is None
+    assert len(fake_sheets.spreadsheet.batch_gets) == 3
+    assert resilience.get_breaker("sheets").state == "closed"
+
+    # Real Sheets failures still open it, and the cached rows are served meanwhile
+    fake_sheets.spreadsheet.failing = True
+    for _ in range(2):
+        assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 2
+    assert resilience.get_breaker("sheets").state == "open"
+    reads = fake_sheets.http_client.revision_reads
+    assert gs.spreadsheet_revision(fake_sheets, SHEET_ID) is None
+    assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 2
+    assert fake_sheets.http_client.revision_reads == reads
+
+
+def test_adapter_caps_each_request_by_the_remaining_budget(monkeypatch):
+    timeouts = []
+    monkeypatch.setattr(HTTPAdapter, "send", lambda self, request, timeout=None, **kwargs: timeouts.append(timeout))
+    adapter = gs._BudgetedAdapter()
+
+    adapter.send(None, timeout=30)
+    with latency_budget(1):
+        adapter.send(None, timeout=30)
+        adapter.send(None, timeout=(5, 30))
+    with latency_budget(0), pytest.raises(BudgetExhausted):
+        adapter.send(None, timeout=30)
+
+    assert timeouts[0] == 30
+    assert timeouts[1] <= 1
+    assert max(timeouts[2]) <= 1
+    assert len(timeouts) == 3
+
+
+def test_incremental_sync_is_replaced_by_a_full_reload_after_enough_appends(fake_sheets, monkeypatch):
+    monkeypatch.setenv("SHEET_SYNC_WINDOW", "1")
+    monkeypatch.setenv("SHEET_FULL_SYNC_APPENDS", "1")
+    tabs = fake_sheets.spreadsheet.tabs
+    tabs["Buy"].append(["2024-01-03", "MSFT"])
+    gs.worksheet_values(SHEET_ID, "Buy")
+
+    # An edit above the trailing window is missed by the incremental sync...
+    tabs["Buy"][1] = ["2024-01-02", "NVDA"]
+    tabs["Buy"].append(["2024-01-04", "TSLA"])
+    fake_sheets.http_client.revision = "r2"
+    assert [row[1] for row in gs.worksheet_values(SHEET_ID, "Buy")] == ["Ticker", "AAPL", "MSFT", "TSLA"]
+
+    # ...until the append limit forces a full reload
+    fake_sheets.http_client.revision = "r3"
+    assert [row[1] for row in gs.worksheet_values(SHEET_ID, "Buy")] == ["Ticker", "NVDA", "MSFT", "TSLA"]
+    assert fake_sheets.spreadsheet.batch_gets[-1] == ["'Buy'"]
+
+    gs.invalidate_worksheet_cache(SHEET_ID, None, None)
+    assert sheet_cache.load(SHEET_ID, "Buy") is None
+
+
+def test_summary_write_advances_cached_tabs_only_past_its_own_revision(fake_sheets):
+    gs.worksheet_values(SHEET_ID, "Buy")
+    summary = {CN.TOTAL: "100", CN.GAIN_PCT: "1.5%", CN.DAY_CHNG: "0.5%"}
+
+    gs.update_portfolio_summary(summary, SHEET_ID, day="2024-01-03")
+    assert sheet_cache.load(SHEET_ID, "Buy")["revision"] == fake_sheets.http_client.revision
+
+    # Another writer's edit between ours and the revision read drops the cache
+    batch_update = fake_sheets.spreadsheet.batch_update
+
+    def concurrent_edit(body):
+        batch_update(body)
+        fake_sheets.http_client.touch()
+
+    fake_sheets.spreadsheet.batch_update = concurrent_edit
+    gs.update_portfolio_summary(summary, SHEET_ID, day="2024-01-03")
+    assert sheet_cache.load(SHEET_ID, "Buy") is None
+    assert gs._net_worth_indexes[SHEET_ID].revision is None
+
+
+class _FakeCredentials(Credentials):
+    def __init__(self):
+        super().__init__()
+        self.token = "token-0"
+        self.expiry = gs._utcnow() + timedelta(hours=1)
+        self.refresh_token = "refresh"
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = gs._utcnow() + timedelta(hours=1)
+
+
+def test_pooled_client_is_reused_and_reauthorized_when_the_token_expires(monkeypatch):
+    credentials = _FakeCredentials()
+    authorizations = []
+    monkeypatch.setattr(gs, "_authorize", lambda: authorizations.append(1) or gspread.Client(auth=credentials))
+    gs.reset_gspread()
+
+    client = gs.load_gspread()
+    assert gs.load_gspread() is client
+    assert len(authorizations) == 1
+    assert credentials.refreshes == 0
+    assert isinstance(client.http_client.session.get_adapter("https://sheets.googleapis.com"), gs._BudgetedAdapter)
+
+    # A token inside the refresh margin is renewed on the same pooled session
+    credentials.expiry = gs._utcnow() + gs.TOKEN_REFRESH_MARGIN / 2
+    assert gs.load_gspread() is client
+    assert (len(authorizations), credentials.refreshes, credentials.token) == (1, 1, "token-1")
+    assert gs.load_gspread() is client
+    assert credentials.refreshes == 1
+    gs.reset_gspread()
+
+
+def test_net_worth_index_tracks_rows_as_days_are_inserted_at_the_top():
+    index = gs._NetWorthIndex("r1", gs.NET_WORTH_HEADERS, ["Date", "2024-01-03", "2024-01-02"])
+    assert index.header_ok
+    assert (index.row_for("2024-01-03"), index.row_for("2024-01-02"), index.row_for("2024-01-04")) == (2, 3, None)
+
+    index.insert_at_top("2024-01-04")
+    assert [index.row_for(day) for day in ["2024-01-04", "2024-01-03", "2024-01-02"]] == [2, 3, 4]
+
+    empty = gs._NetWorthIndex(None, [], [])
+    assert not empty.header_ok
+    empty.insert_at_top("2024-01-02")
+    assert empty.row_for("2024-01-02") == 2
+
+
+def test_summary_is_written_with_one_batch_update(fake_sheets):
+    summary = {CN.TOTAL: 1000.0, CN.MARKET_VALUE: 1100.0, CN.GAIN: 100.0, CN.GAIN_PCT: 10.0, CN.DAY_CHNG: 1.5}
+    worksheet_id = list(fake_sheets.spreadsheet.tabs).index(gs.NET_WORTH_WORKSHEET)
+
+    gs.update_portfolio_summary(summary, SHEET_ID, day="2024-01-03")
+    insert, update, number_format = fake_sheets.spreadsheet.batch_updates[-1]["requests"]
+    assert insert["insertDimension"]["range"] == {
+        "sheetId": worksheet_id, "dimension": "ROWS", "startIndex": 1, "endIndex": 2,
+    }
+    assert update["updateCells"]["start"] == {"sheetId": worksheet_id, "rowIndex": 1, "columnIndex": 0}
+    values = update["updateCells"]["rows"][0]["values"]
+    assert values[0] == {"userEnteredValue": {"stringValue": "2024-01-03"}}
+    assert values[1] == {"userEnteredValue": {"numberValue": 1000.0}}
+    assert values[4] == {"userEnteredValue": {"numberValue": 0.1}}
+    assert number_format["repeatCell"]["range"] == {
+        "sheetId": worksheet_id, "startRowIndex": 1, "endRowIndex": 2, "startColumnIndex": 4, "endColumnIndex": 6,
+    }
+
+    # The same day again updates its row in place, using the index kept from the first write
+    reads = len(fake_sheets.spreadsheet.batch_gets)
+    gs.update_portfolio_summary(summary, SHEET_ID, day="2024-01-03")
+    requests = fake_sheets.spreadsheet.batch_updates[-1]["requests"]
+    assert [next(iter(request)) for request in requests] == ["updateCells", "repeatCell"]
+    assert requests[0]["updateCells"]["start"]["rowIndex"] == 1
+    assert len(fake_sheets.spreadsheet.batch_gets) == reads
+
+
+def test_token_without_the_drive_scope_keeps_working_by_re_downloading(fake_sheets, tmp_path, monkeypatch):
+    # An authorized_user.json granted before the Drive scope was added is refreshed
+    # with the scopes it has, not the current SCOPES
+    granted = ["https://www.googleapis.com/auth/spreadsheets"]
+    (tmp_path / "credentials.json").write_text(json.dumps({"installed": {}}))
+    (tmp_path / "authorized_user.json").write_text(json.dumps({"refresh_token": "r", "scopes": granted}))
+    requested = []
+
+    def oauth_from_dict(credentials, authorized_user, scopes):
+        requested.append(scopes)
+        return fake_sheets, json.dumps(authorized_user)
+
+    monkeypatch.setattr(gs, "CONFIG_DIR", str(tmp_path))
+    monkeypatch.setattr(gs.gspread, "oauth_from_dict", oauth_from_dict)
+    assert gs._authorize() is fake_sheets
+    assert requested == [granted]
+
+    fake_sheets.http_client.drive_scope = False
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "1")
+    assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 2
+    fake_sheets.spreadsheet.tabs["Buy"].append(["2024-01-03", "MSFT"])
+    assert len(gs.worksheet_values(SHEET_ID, "Buy")) == 3
+    assert gs.spreadsheet_revision(fake_sheets, SHEET_ID) is None
+    assert resilience.get_breaker("sheets").state == "closed"
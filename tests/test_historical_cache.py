@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+# first-party
+from src import portfolio_data
+from src.util import bar_store, historical_cache
+from src.util.price_provider import PriceProvider
+from src.util.resilience import latency_budget
+
+# third-party
+import pandas as pd
+import pytest
+
+# system
+import datetime
+
+
+class _CountingProvider(PriceProvider):
+    name = "counting"
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def quotes(self, tickers, timeout=None):
+        return {}
+
+    def history(self, tickers, start, end=None):
+        self.calls.append((sorted(tickers), start))
+        bars = self.bars[self.bars.index >= pd.Timestamp(start)]
+        if end is not None:
+            bars = bars[bars.index < pd.Timestamp(end)]
+        return {ticker: bars for ticker in tickers if ticker != "GONE"}
+
+
+def test_sync_bars_appends_only_missing_days(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRICE_STORE_PATH", str(tmp_path / "prices.sqlite3"))
+    today = datetime.date(2025, 6, 30)
+    start = today - datetime.timedelta(days=historical_cache.HISTORY_DAYS)
+    index = pd.date_range(start, today, freq="B", name="Date")
+    bars = pd.DataFrame({"Close": [float(n) for n in range(len(index))]}, index=index)
+
+    provider = _CountingProvider(bars[bars.index <= pd.Timestamp(today - datetime.timedelta(days=3))])
+    monkeypatch.setattr(historical_cache, "get_price_provider", lambda: provider)
+
+    historical_cache._sync_bars(["AAA", "GONE"], start, today)
+    historical_cache._sync_bars(["AAA", "GONE"], start, today)
+    # A ticker the provider returned nothing for is retried on the next sync
+    assert provider.calls == [(["AAA", "GONE"], start), (["GONE"], start)]
+
+    # Next day only the bars since the last stored one are requested, and the
+    # session still in progress is not stored.
+    day = datetime.timedelta(days=1)
+    partial = pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2025-07-01"], name="Date"))
+    provider.bars = pd.concat([bars, partial])
+    historical_cache._sync_bars(["AAA", "GONE"], start, today + day)
+    last_stored = datetime.date(2025, 6, 27)
+    assert provider.calls[2:] == [(["AAA"], last_stored), (["GONE"], start)]
+    stored = bar_store.load_bars(["AAA"], start)["AAA"]
+    assert stored["Close"].tolist() == bars["Close"].tolist()
+
+    # Its final close a day later is appended without looking like a re-adjustment
+    provider.bars = pd.concat([bars, partial.assign(Close=999.0)])
+    historical_cache._sync_bars(["AAA"], start, today + 2 * day)
+    assert provider.calls[4:] == [(["AAA"], today)]
+    assert bar_store.load_bars(["AAA"], start)["AAA"]["Close"].iloc[-1] == 999.0
+
+    # A re-adjusted series (e.g. after a split) replaces the stored history.
+    provider.bars = provider.bars.assign(Close=provider.bars["Close"] / 2)
+    historical_cache._sync_bars(["AAA"], start, today + 3 * day)
+    assert provider.calls[5:] == [(["AAA"], today + day), (["AAA"], start)]
+    stored = bar_store.load_bars(["AAA"], start)["AAA"]
+    assert stored["Close"].tolist() == provider.bars["Close"].tolist()
+
+
+def test_reference_prices_use_previous_session_within_tolerance():
+    weekdays = pd.DataFrame({"Close": [1.0, 2.0, 3.0]}, index=pd.to_datetime(["2025-06-05", "2025-06-06", "2025-06-09"]))
+    daily = pd.DataFrame(
+        {"Close": [10.0, None, 12.0, 13.0]},
+        index=pd.to_datetime(["2025-06-06", "2025-06-07", "2025-06-08", "2025-06-09"]),
+    )
+    targets = {
+        "weekend": pd.Timestamp("2025-06-07"),
+        "before": pd.Timestamp("2025-06-04"),
+        "too_late": pd.Timestamp("2025-06-20"),
+    }
+
+    prices = historical_cache._extract_reference_prices({"STK": weekdays, "BTC": daily, "NONE": daily.iloc[:0]}, targets)
+
+    # Friday's close stands in for Saturday; Monday is never used.
+    assert prices["STK"] == {"weekend": 2.0}
+    # The missing Saturday close falls back to Friday rather than Sunday.
+    assert prices["BTC"] == {"weekend": 10.0}
+    assert "NONE" not in prices
+
+
+def test_windows_are_served_from_one_cached_history(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRICE_STORE_PATH", str(tmp_path / "prices.sqlite3"))
+    monkeypatch.setattr(historical_cache, "_price_cache", {})
+    today = datetime.date.today()
+    index = pd.date_range(end=pd.Timestamp(today), periods=6 * 365, freq="D", name="Date")
+    bars = pd.DataFrame({"Close": [float(n) for n in range(len(index))]}, index=index)
+    provider = _CountingProvider(bars)
+    monkeypatch.setattr(historical_cache, "get_price_provider", lambda: provider)
+
+    assert historical_cache.normalize_windows(None) == historical_cache.DEFAULT_WINDOWS
+    assert historical_cache.normalize_windows(["ytd", " 3y", "YTD"]) == ["YTD", "3Y"]
+    with pytest.raises(ValueError):
+        historical_cache.normalize_windows(["fortnight"])
+
+    default = historical_cache.get_historical_prices(["AAA"])
+    assert list(default["AAA"]) == historical_cache.DEFAULT_WINDOWS
+
+    custom = historical_cache.get_historical_prices(["AAA"], ["YTD", "2Y", "10D", "2024-01-02"])
+    last = len(index) - 1
+    assert custom["AAA"]["YTD"] == float(index.get_loc(pd.Timestamp(today.year - 1, 12, 31)))
+    assert custom["AAA"]["2Y"] == float(last - 730)
+    assert custom["AAA"]["10D"] == float(last - 10)
+    assert custom["AAA"]["2024-01-02"] == float(index.get_loc(pd.Timestamp("2024-01-02")))
+    assert len(provider.calls) == 1
+
+
+def test_prices_missed_for_lack_of_budget_are_not_cached_for_the_day(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRICE_STORE_PATH", str(tmp_path / "prices.sqlite3"))
+    monkeypatch.setattr(historical_cache, "_price_cache", {})
+    monkeypatch.setattr(historical_cache, "_unsynced", {})
+    index = pd.date_range(end=pd.Timestamp(datetime.date.today()), periods=400, freq="D", name="Date")
+    provider = _CountingProvider(pd.DataFrame({"Close": [float(n) for n in range(len(index))]}, index=index))
+    monkeypatch.setattr(historical_cache, "get_price_provider", lambda: provider)
+
+    with latency_budget(0):
+        prices, warnings = portfolio_data._load_historical_prices(["AAA"], ["7D"])
+    assert prices == {"AAA": {}}
+    assert warnings == ["Historical prices for AAA are unavailable; the price history could not be fetched."]
+    assert provider.calls == []
+
+    prices, warnings = portfolio_data._load_historical_prices(["AAA"], ["7D"])
+    assert prices["AAA"]["7D"] is not None
+    assert warnings == []
+    assert len(provider.calls) == 1
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+# system
+import random
+
+# first-party
+from src import portfolio_data
+from src.ledger import Ledger, LedgerRow
+
+
+def _row(row_number, ticker, date=None, account=None, action="Buy"):
+    return LedgerRow(
+        date=date,
+        source="open_positions",
+        brokerage="Fidelity",
+        account=account,
+        category="Tech",
+        company=None,
+        ticker=ticker,
+        action=action,
+        cost_basis_method=None,
+        qty=1.0,
+        price_per_share=10.0,
+        total=10.0,
+        row_number=row_number,
+    )
+
+
+def test_select_uses_indexes_and_date_order():
+    ledger = Ledger(
+        [
+            _row(2, "AAPL", "2024-03-01", "IRA"),
+            _row(3, "MSFT", "2024-01-01", "ira"),
+            _row(4, "AAPL", None, "IRA"),
+            _row(5, "AAPL", "2023-12-31", "Joint", action="Sell"),
+        ]
+    )
+
+    assert [row.row_number for row in ledger.select()] == [5, 3, 2, 4]
+    assert [row.row_number for row in ledger.select(ticker="AAPL", account=" Ira ")] == [2, 4]
+    assert [row.row_number for row in ledger.select(start="2024-01-01")] == [3, 2]
+    assert [row.row_number for row in ledger.select(ticker="AAPL", end="2024-01-01")] == [5]
+    assert [row.row_number for row in ledger.select(action="Sell", account="IRA")] == []
+
+
+def test_extended_keeps_original_ledger_unchanged():
+    ledger = Ledger([_row(2, "AAPL", "2024-03-01")])
+    extended = ledger.extended([_row(3, "AAPL", "2024-01-01")])
+
+    assert [row.row_number for row in ledger.select(ticker="AAPL")] == [2]
+    assert [row.row_number for row in extended.select(ticker="AAPL")] == [3, 2]
+    assert extended.rows[0]["ticker"] == "AAPL"
+    assert extended.rows[1].as_dict()["row_number"] == 3
+
+
+def test_metadata_matches_a_scan_and_extending_leaves_the_original():
+    rng = random.Random(5)
+    rows = []
+    for row_number in range(2, 400):
+        row = _row(
+            row_number,
+            rng.choice(["AAPL", "MSFT"]),
+            date=rng.choice([None, "2021-01-04", "2021-02-01", "2020-12-31"]),
+            account=rng.choice([None, "IRA", "Joint"]),
+            action=rng.choice(["Buy", "Sell"]),
+        )
+        row.company = rng.choice([None, "Apple", "Apple Inc."])
+        rows.append(row)
+
+    base = Ledger(rows[:150])
+    # The extended ledger exists before the original is checked
+    for ledger, count in [(base, 150), (base.extended(rows[150:]), len(rows))]:
+        for ticker in ["AAPL", "MSFT"]:
+            scanned = ledger.rows_for(ticker, action="Buy")
+            metadata = ledger.metadata(ticker, "Buy")
+            dates = [row.date for row in scanned if row.date]
+            assert metadata.count == len(scanned)
+            assert (metadata.first_date, metadata.last_date) == (min(dates), max(dates))
+            for key in ["company", "account", "brokerage"]:
+                assert metadata.representative(key) == portfolio_data._representative_value(scanned, key)
+        assert sum(ledger.metadata(t, a).count for t in ["AAPL", "MSFT"] for a in ["Buy", "Sell"]) == count
+
+    assert base.metadata("TSLA", "Buy") is None
+
+
+def test_extended_ledger_selects_like_a_fresh_one():
+    rng = random.Random(7)
+    rows = [
+        _row(
+            row_number,
+            rng.choice(["AAPL", "MSFT", "TSLA"]),
+            date=rng.choice([None, "2020-12-31", "2021-01-04", "2021-02-01", "2021-03-15"]),
+            account=rng.choice([None, "IRA", "Joint"]),
+        )
+        for row_number in range(2, 300)
+    ]
+    base = Ledger(rows[:200])
+    before = {ticker: list(positions) for ticker, positions in base.by_ticker.items()}
+    extended = base.extended(rows[200:250]).extended(rows[250:])
+    fresh = Ledger(rows)
+
+    for filters in [{}, {"ticker": "AAPL"}, {"account": "ira", "start": "2021-01-04"}, {"end": "2021-02-01"}]:
+        assert extended.select(**filters) == fresh.select(**filters)
+    assert base.by_ticker == before
+    assert len(base.select()) == 200
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+
+# first-party
+from src.util.market_calendar import MARKET_TZ, is_market_open, next_market_open
+
+# system
+from datetime import datetime
+
+
+def test_market_hours_follow_nyse_calendar():
+    assert is_market_open(datetime(2025, 11, 26, 10, 0))
+    assert not is_market_open(datetime(2025, 11, 26, 16, 0))
+    # Thanksgiving, then a regular Friday session
+    assert not is_market_open(datetime(2025, 11, 27, 10, 0))
+    assert next_market_open(datetime(2025, 11, 26, 17, 0)) == datetime(2025, 11, 28, 9, 30, tzinfo=MARKET_TZ)
+    # Christmas on Thursday, weekend after
+    assert next_market_open(datetime(2025, 12, 24, 16, 30)) == datetime(2025, 12, 26, 9, 30, tzinfo=MARKET_TZ)
+    # Independence Day on Saturday is observed on Friday
+    assert not is_market_open(datetime(2026, 7, 3, 11, 0))
@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+
+# system
+import math
+import random
+import threading
+import time
+
+# first-party
+from src import portfolio_data
+from src.ledger import Ledger
+from src.tax_lots import TaxLot, consume
+from src.config.ColumnNameConsts import ColumnNames as CN
+from src.util.transaction_source import TransactionSource
+
+# third-party
+import pandas as pd
+
+HEADERS = [
+    "Date",
+    "Brokerage",
+    "Account",
+    "Category",
+    "Company",
+    "Ticker",
+    "Action",
+    "Cost Basis Method",
+    "Qty",
+    "Cost Price",
+    "Total",
+]
+
+
+def _random_rows(count, seed=7):
+    rng = random.Random(seed)
+    dates = ["9/10/20", "12/24/2020", "2021-03-04", "Jan 5, 2021", "13/01/2020", "", "not a date", " 3/4/21 "]
+    numbers = ["1", "2.5", "$1,234.50", "", "abc", "0", "-3", " 7 ", "1e3", "inf"]
+    tickers = ["aapl", " MSFT ", "", "brk.b", "NVDA"]
+    actions = ["", "buy", "Sell", "SELL ", "Transfer"]
+    rows = []
+    for _ in range(count):
+        row = [
+            rng.choice(dates),
+            rng.choice(["Fidelity", "", " Robinhood "]),
+            rng.choice(["IRA", "", "Joint"]),
+            rng.choice(["Tech", "Cryptocurrency", ""]),
+            rng.choice(["Apple", "", "Microsoft"]),
+            rng.choice(tickers),
+            rng.choice(actions),
+            rng.choice(["", "FIFO", "Specific ID"]),
+            rng.choice(numbers),
+            rng.choice(numbers),
+            rng.choice(numbers),
+        ]
+        rows.append(row[: rng.randint(6, len(row))])
+    return rows
+
+
+def test_columnar_normalization_matches_row_wise():
+    rows = _random_rows(500)
+    for source in [portfolio_data.SOURCE_OPEN, portfolio_data.SOURCE_CLOSED]:
+        row_warnings = []
+        expected = []
+        for offset, row in enumerate(rows, start=2):
+            padded = row + [""] * (len(HEADERS) - len(row))
+            raw = dict(zip(HEADERS, padded)) | {"row_number": offset}
+            tx = portfolio_data._normalize_transaction(raw, source, "Buy", row_warnings)
+            if tx:
+                expected.append(tx)
+
+        columnar_warnings = []
+        actual = portfolio_data._normalize_columns(HEADERS, rows, 2, source, "Buy", columnar_warnings)
+
+        assert actual == expected
+        assert [type(tx["qty"]) for tx in actual] == [type(tx["qty"]) for tx in expected]
+        assert columnar_warnings == row_warnings
+
+
+def test_columnar_normalization_handles_missing_columns():
+    headers = ["Ticker", "Qty"]
+    warnings = []
+    actual = portfolio_data._normalize_columns(headers, [["AAPL", "2"]], 2, "closed_positions", "Sell", warnings)
+
+    assert actual == []
+    assert warnings == ["Sell row 2 has unsupported action 'None' and was skipped."]
+
+
+class _CountingSource(TransactionSource):
+    name = "local"
+
+    def __init__(self, tabs):
+        self.tabs = tabs
+        self.reads = []
+
+    def worksheets_values(self, worksheets):
+        self.reads.extend(name for name, _ in worksheets)
+        return [self.tabs[name] for name, _ in worksheets]
+
+
+def _fake_portfolio(monkeypatch):
+    buy = [
+        HEADERS,
+        ["1/4/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Buy", "", "2", "100", "200"],
+        ["1/5/21", "Fidelity", "IRA", "Tech", "Microsoft", "MSFT", "Buy", "", "1", "200", "200"],
+    ]
+    sell = [HEADERS, ["2/1/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Sell", "FIFO", "1", "150", "150"]]
+    source = _CountingSource({"Buy": buy, "Sell": sell})
+    priced = []
+    historical = []
+
+    def curr_price(tickers, crypto=False):
+        priced.append(list(tickers))
+        return pd.DataFrame({CN.PRICE: [120.0] * len(tickers), CN.DAY_CHNG: [0.0] * len(tickers)}, index=tickers)
+
+    def get_historical_prices(tickers, windows):
+        historical.append(list(tickers))
+        return {}
+
+    monkeypatch.setattr(portfolio_data, "get_transaction_source", lambda: source)
+    monkeypatch.setattr(portfolio_data, "curr_price", curr_price)
+    monkeypatch.setattr(portfolio_data, "get_historical_prices", get_historical_prices)
+    monkeypatch.setattr(portfolio_data, "unsynced_history", lambda tickers: {})
+    monkeypatch.setattr(portfolio_data, "quote_stamps", lambda tickers: {})
+    monkeypatch.setattr(portfolio_data, "_ledger_cache", {})
+    # Holdings and position books outlive a call; start each test without another test's state
+    monkeypatch.setattr(portfolio_data, "_holdings", portfolio_data._Holdings())
+    monkeypatch.setattr(portfolio_data, "_books", {})
+    portfolio_data._snapshots.clear()
+    return source, priced, historical
+
+
+def test_position_detail_loads_each_tab_once_and_prices_one_ticker(monkeypatch):
+    source, priced, historical = _fake_portfolio(monkeypatch)
+
+    detail = portfolio_data.get_position_detail("aapl", include_raw_transactions=True)
+
+    assert sorted(source.reads) == ["Buy", "Sell"]
+    assert priced == [["AAPL"]]
+    assert historical == [["AAPL"]]
+    assert detail["open_position"]["market_value"] == 240.0
+    assert len(detail["open_transactions"]) == 1
+    assert len(detail["closed_transactions"]) == 1
+
+    # Outside a request every call reads the tabs again
+    portfolio_data.get_transactions(ticker="AAPL")
+    assert len(source.reads) == 4
+
+
+def test_snapshot_is_shared_until_the_ledger_changes(monkeypatch):
+    source, priced, _ = _fake_portfolio(monkeypatch)
+
+    snapshot = portfolio_data.get_portfolio_snapshot(group_by="category")
+    positions = portfolio_data.get_positions()
+    assert priced == [["AAPL", "MSFT"]]
+    assert positions["version"] == snapshot["version"] == portfolio_data.snapshot_version()
+    assert snapshot["allocations"] == [
+        {"key": "Tech", "total_cost_basis": 400.0, "market_value": 360.0, "allocation_pct": 100.0, "position_count": 2}
+    ]
+    # A ticker filter is served from the current snapshot
+    assert portfolio_data.get_positions(ticker="msft")["positions"] == positions["positions"][1:]
+    assert len(priced) == 1
+
+    source.tabs["Buy"] = source.tabs["Buy"] + [
+        ["1/6/21", "Fidelity", "IRA", "Tech", "Nvidia", "NVDA", "Buy", "", "1", "50", "50"]
+    ]
+    assert portfolio_data.snapshot_version() != snapshot["version"]
+    assert len(portfolio_data.get_portfolio_snapshot()["positions"]) == 3
+    assert priced[1] == ["AAPL", "MSFT", "NVDA"]
+
+
+def _sell_tab(count, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        rows.append(
+            [
+                f"{rng.randint(1, 12)}/{rng.randint(1, 28)}/2{rng.randint(0, 4)}",
+                "Fidelity",
+                "IRA",
+                rng.choice(["Tech", ""]),
+                rng.choice(["Apple", ""]),
+                rng.choice(["AAPL", "MSFT", "NVDA"]),
+                rng.choice(["Buy", "Buy", "Sell"]),
+                "",
+                rng.choice(["0", "1", "2.5", "-1", "10"]),
+                "5",
+                str(rng.randint(0, 100)),
+            ]
+        )
+    return Ledger(portfolio_data._normalize_columns(HEADERS, rows, 2, "closed_positions", "Sell", []))
+
+
+def _scan_closed_positions(ledger, target_ticker=None):
+    # The original matching: scan forward from every Sell row to the next Sell row
+    warnings = []
+    closed_positions = []
+    sequence = {}
+    rows = list(ledger.rows)
+    for index, tx in enumerate(rows):
+        if tx["action"] != "Sell" or (target_ticker and tx["ticker"] != target_ticker):
+            continue
+        lots = []
+        for candidate in rows[index + 1 :]:
+            if candidate["action"] == "Sell":
+                break
+            if candidate["ticker"] == tx["ticker"]:
+                lots.append(candidate)
+        sequence[tx["ticker"]] = sequence.get(tx["ticker"], 0) + 1
+        consumed = consume([TaxLot(lot, index) for index, lot in enumerate(lots)], tx["qty"])
+        closed_positions.append(portfolio_data._close_position(tx, consumed, sequence[tx["ticker"]], warnings))
+    closed_positions.sort(key=lambda pos: (pos["close_date"] is None, pos["close_date"] or "", pos["sell_row_number"]))
+    return closed_positions, warnings
+
+
+def test_lot_matching_matches_forward_scan():
+    ledger = _sell_tab(2000)
+    for ticker in [None, "AAPL", "NVDA", "TSLA"]:
+        expected = _scan_closed_positions(ledger, ticker)
+        assert portfolio_data._closed_positions_from_ledger(ledger, ticker) == expected
+    closed_positions, warnings = portfolio_data._closed_positions_from_ledger(ledger)
+    assert warnings and any(pos["is_quantity_matched"] for pos in closed_positions)
+
+
+def test_cost_basis_method_drives_realized_and_open_lots(monkeypatch):
+    source, _, _ = _fake_portfolio(monkeypatch)
+    source.tabs["Sell"] = [
+        HEADERS,
+        ["1/10/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Sell", "", "1", "150", "150"],
+        ["1/2/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Buy", "", "2", "100", "200"],
+        ["2/10/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Sell", "HIFO", "2", "150", "300"],
+        ["1/3/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Buy", "", "1", "130", "130"],
+    ]
+    realized = portfolio_data.get_realized_positions(ticker="AAPL")
+    first, second = realized["closed_positions"]
+    assert (first["cost_basis"], first["buy_row_numbers"]) == (100, [3])
+    # HIFO takes the $130 lot first, then the share the first Sell left open
+    assert (second["cost_basis"], second["buy_row_numbers"]) == (230, [5, 3])
+    assert realized["warnings"] == []
+
+    source.tabs["Buy"] = source.tabs["Buy"] + [
+        ["3/1/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Buy", "", "2", "150", "300"],
+        ["4/1/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Sell", "LIFO", "3", "160", "480"],
+        ["4/2/21", "Fidelity", "IRA", "Tech", "Microsoft", "MSFT", "Sell", "", "1", "210", "210"],
+    ]
+    lots = portfolio_data.get_open_lots(ticker="aapl")
+    assert [(lot["row_number"], lot["qty"], lot["cost_basis"]) for lot in lots["lots"]] == [(2, 1, 100)]
+    assert lots["lots"][0]["term"] == "long"
+
+    positions = {pos["ticker"]: pos for pos in portfolio_data.get_positions()["positions"]}
+    assert set(positions) == {"AAPL"}
+    assert (positions["AAPL"]["qty"], positions["AAPL"]["total_cost_basis"]) == (1, 100)
+
+    # The Buy tab lists no lots after a Sell, so Specific ID falls back to FIFO with a warning
+    source.tabs["Buy"] = source.tabs["Buy"] + [
+        ["4/3/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Sell", "Specific ID", "0.5", "160", "80"],
+    ]
+    lots = portfolio_data.get_open_lots(ticker="AAPL")
+    assert [(lot["row_number"], lot["qty"]) for lot in lots["lots"]] == [(2, 0.5)]
+    assert any("uses Specific ID" in warning for warning in lots["warnings"])
+
+
+def test_sell_rows_on_the_buy_tab_reduce_open_positions(monkeypatch):
+    # Before the tax-lot ledger these rows were ignored and every Buy counted as open
+    source, _, _ = _fake_portfolio(monkeypatch)
+    source.tabs["Buy"] = source.tabs["Buy"] + [
+        ["2/1/21", "Fidelity", "IRA", "Tech", "Apple", "AAPL", "Sell", "", "1.5", "150", "225"],
+        ["2/2/21", "Fidelity", "IRA", "Tech", "Microsoft", "MSFT", "Sell", "", "1", "250", "250"],
+    ]
+
+    positions = {pos["ticker"]: pos for pos in portfolio_data.get_positions()["positions"]}
+    assert set(positions) == {"AAPL"}
+    assert (positions["AAPL"]["qty"], positions["AAPL"]["total_cost_basis"]) == (0.5, 50)
+
+
+def test_appended_rows_only_recompute_their_ticker(monkeypatch):
+    source, _, _ = _fake_portfolio(monkeypatch)
+    source.tabs["Sell"] = [HEADERS]
+
+    before = {pos["ticker"]: pos for pos in portfolio_data.get_enriched_open_positions()["positions"]}
+    source.tabs["Buy"] = source.tabs["Buy"] + [
+        ["1/6/21", "Fidelity", "IRA", "Tech", "Microsoft", "MSFT", "Buy", "", "1", "300", "300"]
+    ]
+    enriched = portfolio_data.get_enriched_open_positions()
+    after = {pos["ticker"]: pos for pos in enriched["positions"]}
+
+    assert after["AAPL"] is before["AAPL"]
+    assert (after["MSFT"]["qty"], after["MSFT"]["total_cost_basis"], after["MSFT"]["last_buy_date"]) == (
+        2,
+        500,
+        "2021-01-06",
+    )
+    assert enriched["totals"] == portfolio_data._portfolio_totals(enriched["positions"], 3)
+    assert enriched["totals"]["market_value"] == 480.0
+
+
+def _scalar_position(ticker, holding, quote, historical_prices, windows):
+    # The original per-position arithmetic
+    def pct(numerator, denominator):
+        return None if numerator is None or not denominator else 100 * numerator / denominator
+
+    def change(window):
+        reference = historical_prices.get(ticker, {}).get(window)
+        return None if price is None or not reference else pct(price - reference, reference)
+
+    qty, cost = holding["qty"], holding["total_cost_basis"]
+    price, decimal = quote.get("current_price"), quote.get("day_change_decimal")
+    market_value = None if price is None else qty * price
+    gain = None if price is None else market_value - cost
+    day_change_value = None
+    if price is not None and decimal is not None and decimal != -1:
+        day_change_value = market_value * decimal / (1 + decimal)
+    return {
+        "qty": qty,
+        "current_price": price,
+        "day_change_pct": None if price is None or decimal is None else decimal * 100,
+        "day_change_value": day_change_value,
+        "average_cost": cost / qty if qty else None,
+        "total_cost_basis": cost,
+        "market_value": market_value,
+        "gain": gain,
+        "gain_pct": None if gain is None else pct(gain, cost),
+        "change_7d_pct": change("7D"),
+        "change_1y_pct": change("1Y"),
+        "changes": {window: change(window) for window in windows},
+    }
+
+
+def test_vectorized_positions_match_scalar_arithmetic():
+    rng = random.Random(11)
+    tickers = [f"T{index}" for index in range(300)]
+    holdings = {}
+    price_data = {}
+    historical_prices = {}
+    for ticker in tickers:
+        holdings[ticker] = {
+            "qty": rng.choice([0.0, 1.0, 2.5, 10.0]),
+            "total_cost_basis": rng.choice([0.0, 100.0, 333.3]),
+            "company": None,
+            "category": None,
+            "account": None,
+            "brokerage": None,
+            "transaction_count": 1,
+            "first_buy_date": None,
+            "last_buy_date": None,
+        }
+        if rng.random() < 0.8:
+            price_data[ticker] = {
+                "current_price": rng.choice([None, 0.0, 12.5, 99.99]),
+                "day_change_decimal": rng.choice([None, -1.0, 0.0, 0.0125, -0.3]),
+            }
+        historical_prices[ticker] = {
+            window: rng.choice([0.0, 7.0, 150.0]) for window in ["7D", "1Y", "YTD"] if rng.random() < 0.7
+        }
+
+    windows = ["1Y", "YTD"]
+    positions = portfolio_data._build_positions(tickers, holdings, price_data, historical_prices, windows)
+    for ticker, position in zip(tickers, positions):
+        expected = _scalar_position(ticker, holdings[ticker], price_data.get(ticker, {}), historical_prices, windows)
+        assert {key: position[key] for key in expected} == expected
+
+    totals = portfolio_data._portfolio_totals(positions, 0)
+    assert totals["position_count"] == 300
+    assert math.isclose(totals["market_value"], sum(pos["market_value"] or 0 for pos in positions))
+
+
+def test_ledger_is_reparsed_in_full_after_enough_appends(monkeypatch):
+    source, _, _ = _fake_portfolio(monkeypatch)
+    monkeypatch.setenv("SHEET_SYNC_WINDOW", "1")
+    monkeypatch.setenv("SHEET_FULL_SYNC_APPENDS", "1")
+    msft = ["1/6/21", "Fidelity", "IRA", "Tech", "Microsoft", "MSFT", "Buy", "", "1", "300", "300"]
+    portfolio_data.load_buy_transactions()
+
+    # The edited first row is above the window, so the first append misses it
+    source.tabs["Buy"] = [source.tabs["Buy"][0], source.tabs["Buy"][1][:5] + ["NVDA"] + source.tabs["Buy"][1][6:]]
+    source.tabs["Buy"] += [["1/5/21", "Fidelity", "IRA", "Tech", "Microsoft", "MSFT", "Buy", "", "1", "200", "200"], msft]
+    assert portfolio_data.load_buy_transactions()["ledger"].tickers() == ["AAPL", "MSFT"]
+
+    source.tabs["Buy"] = source.tabs["Buy"] + [msft]
+    assert portfolio_data.load_buy_transactions()["ledger"].tickers() == ["MSFT", "NVDA"]
+
+    invalidated = []
+    monkeypatch.setattr(source, "invalidate", lambda: invalidated.append(True))
+    portfolio_data.invalidate_transactions()
+    assert invalidated == [True]
+    assert portfolio_data._ledger_cache == {}
+
+
+def test_concurrent_parses_of_an_append_extend_the_ledger_once(monkeypatch):
+    source, _, _ = _fake_portfolio(monkeypatch)
+    portfolio_data.load_buy_transactions()
+    values = source.tabs["Buy"] + [["1/6/21", "Fidelity", "IRA", "Tech", "Nvidia", "NVDA", "Buy", "", "1", "300", "300"]]
+
+    # Widen the window between reading the cached ledger and storing its extension
+    normalize_rows = portfolio_data._normalize_rows
+
+    def slow_normalize_rows(*args):
+        time.sleep(0.05)
+        return normalize_rows(*args)
+
+    monkeypatch.setattr(portfolio_data, "_normalize_rows", slow_normalize_rows)
+    start = threading.Barrier(8)
+    results = []
+
+    def parse():
+        start.wait()
+        results.append(portfolio_data._parse_tab(values, "Buy", "open_positions"))
+
+    threads = [threading.Thread(target=parse) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({result["revision"] for result in results}) == 1
+    assert portfolio_data._ledger_cache[("Buy", "open_positions")]["appends"] == 1
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# first-party
+from src.config.ColumnNameConsts import ColumnNames as CN
+from src.util import historical_cache
+from src.util.price_provider import PriceProvider, ReplayPriceProvider, get_price_provider
+from src.util.yfinance import clear_quote_cache, curr_price
+
+# third-party
+import pandas as pd
+
+# system
+import datetime
+
+
+class _StaticProvider(PriceProvider):
+    name = "static"
+
+    def __init__(self, bars):
+        self.bars = bars
+
+    def quotes(self, tickers, timeout=None):
+        return {ticker: (101.0, 100.0) for ticker in tickers if ticker != "GONE"}
+
+    def history(self, tickers, start, end=None):
+        return {ticker: self.bars for ticker in tickers if ticker != "GONE"}
+
+
+def _bars(days=400):
+    index = pd.date_range(end=pd.Timestamp(datetime.date.today()), periods=days, freq="D", name="Date")
+    close = [float(n) for n in range(1, days + 1)]
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1000}, index=index)
+
+
+def test_replay_provider_replays_recorded_prices(tmp_path):
+    start = datetime.date.today() - datetime.timedelta(days=365)
+    recorder = ReplayPriceProvider(str(tmp_path), upstream=_StaticProvider(_bars()))
+    assert recorder.quotes(["AAA", "GONE"]) == {"AAA": (101.0, 100.0)}
+    recorded = recorder.history(["AAA", "GONE"], start)
+
+    replay = ReplayPriceProvider(str(tmp_path))
+    assert replay.quotes(["AAA", "GONE"]) == {"AAA": (101.0, 100.0)}
+    replayed = replay.history(["AAA", "GONE"], start)
+    assert list(replayed) == ["AAA"]
+    assert replayed["AAA"]["Close"].tolist() == recorded["AAA"]["Close"].tolist()
+    assert replayed["AAA"].index.min() >= pd.Timestamp(start)
+
+
+def test_price_pipeline_runs_offline_from_replay(tmp_path, monkeypatch):
+    ReplayPriceProvider(str(tmp_path), upstream=_StaticProvider(_bars())).history(
+        ["AAA"], datetime.date.today() - datetime.timedelta(days=400)
+    )
+    ReplayPriceProvider(str(tmp_path), upstream=_StaticProvider(_bars())).quotes(["AAA"])
+
+    monkeypatch.setenv("PRICE_PROVIDER", "replay")
+    monkeypatch.setenv("PRICE_REPLAY_DIR", str(tmp_path))
+    monkeypatch.setenv("QUOTE_CACHE_DISABLED", "1")
+    monkeypatch.setenv("PRICE_STORE_PATH", str(tmp_path / "prices.sqlite3"))
+    monkeypatch.setattr(historical_cache, "_price_cache", {})
+    assert get_price_provider().name == "replay"
+
+    prices = curr_price(["AAA", "MISSING"])
+    assert list(prices.index) == ["AAA"]
+    assert prices.loc["AAA", CN.PRICE] == 101.0
+
+    reference = historical_cache.get_historical_prices(["AAA", "MISSING"])
+    assert reference["MISSING"] == {}
+    # The last bar is today (close 400), so 7 days back closes at 393.
+    assert reference["AAA"]["7D"] == 393.0
+    assert reference["AAA"]["1Y"] == 35.0
+    clear_quote_cache()
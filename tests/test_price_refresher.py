@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+# first-party
+import src.util.price_refresher as price_refresher
+
+
+def test_refresher_publishes_only_changed_quotes(monkeypatch):
+    quotes = {"AAA": (110.0, 100.0), "BTC-USD": (50.0, 50.0)}
+    calls = []
+
+    def refresh_quotes(tickers, crypto=False):
+        calls.append((sorted(tickers), crypto))
+        return {ticker: quotes[ticker] for ticker in tickers}
+
+    monkeypatch.setattr(price_refresher, "refresh_quotes", refresh_quotes)
+    monkeypatch.setattr(price_refresher, "is_market_open", lambda: False)
+
+    refresher = price_refresher.PriceRefresher(interval=3600)
+    refresher.watch({"AAA": False, "BTC-USD": True})
+    updates = refresher.subscribe()
+
+    first = updates.get(timeout=2)
+    assert sorted(update["ticker"] for update in first) == ["AAA", "BTC-USD"]
+    assert {"ticker": "AAA", "price": 110.0, "day_change_pct": 10.0} in first
+
+    # With the market closed only crypto is re-quoted, and unchanged quotes are not sent.
+    quotes["BTC-USD"] = (55.0, 50.0)
+    assert refresher.refresh() == [{"ticker": "BTC-USD", "price": 55.0, "day_change_pct": 10.0}]
+    assert refresher.refresh() == []
+    assert calls == [(["AAA"], False), (["BTC-USD"], True), (["BTC-USD"], True), (["BTC-USD"], True)]
+
+    # A late subscriber starts from the latest quote of every ticker.
+    late = refresher.subscribe()
+    assert {update["ticker"]: update["price"] for update in late.get_nowait()} == {"AAA": 110.0, "BTC-USD": 55.0}
+
+    refresher.unsubscribe(updates)
+    refresher.unsubscribe(late)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# first-party
+import src.util.resilience as resilience
+import src.util.yfinance as yfinance
+from src.util.resilience import CircuitBreaker, latency_budget, remaining_budget
+
+# system
+import time
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=0.1)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.state == "half-open"
+    # Only one trial call is let through, and its failure re-opens the breaker
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_nested_budgets_never_extend_the_outer_one():
+    assert remaining_budget(5) == 5
+    with latency_budget(1):
+        assert remaining_budget(5) <= 1
+        with latency_budget(10):
+            assert remaining_budget() <= 1
+    assert remaining_budget() is None
+
+    @latency_budget(0)
+    def spent():
+        return remaining_budget(5)
+
+    assert spent() == 0
+
+
+def test_failing_quotes_serve_last_known_good_and_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "2")
+    monkeypatch.setenv("QUOTE_TTL_CRYPTO", "0")
+    monkeypatch.setenv("QUOTE_STALE_GRACE", "0")
+    monkeypatch.delenv("QUOTE_CACHE_DISABLED", raising=False)
+    yfinance.clear_quote_cache()
+
+    calls = []
+    failing = False
+
+    def fetch_quotes(tickers, timeout=None):
+        calls.append(list(tickers))
+        if failing:
+            raise RuntimeError("provider down")
+        return {ticker: (10.0, 8.0) for ticker in tickers}
+
+    monkeypatch.setattr(yfinance, "fetch_quotes", fetch_quotes)
+    assert yfinance.cached_quotes(["BTC"], crypto=True) == {"BTC": (10.0, 8.0)}
+
+    failing = True
+    for _ in range(3):
+        assert yfinance.cached_quotes(["BTC"], crypto=True) == {"BTC": (10.0, 8.0)}
+    # The third lookup is short-circuited by the open breaker
+    assert len(calls) == 3
+    assert set(yfinance.stale_quote_ages(["BTC", "ETH"])) == {"BTC"}
+    yfinance.clear_quote_cache()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# first-party
+from src.util import sheet_cache
+
+# third-party
+import pytest
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("SHEET_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(sheet_cache, "_memory", {})
+    return tmp_path
+
+
+def test_stored_values_round_trip_through_disk(cache_dir, monkeypatch):
+    rows = [["Date", "Ticker"], ["2024-01-02", "AAPL", ""]]
+    sheet_cache.store("sheet", "Buy", "r1", rows)
+
+    # A new process only has the file on disk
+    monkeypatch.setattr(sheet_cache, "_memory", {})
+    entry = sheet_cache.load("sheet", "Buy")
+    assert (entry["revision"], entry["values"]) == ("r1", rows)
+    assert entry["tail_hash"] == sheet_cache.rows_hash([["2024-01-02", "AAPL"]])
+    assert sheet_cache.is_fresh(entry, max_age=60)
+    assert not sheet_cache.is_fresh(entry | {"checked_at": 0}, max_age=60)
+    assert sheet_cache.load("sheet", "Sell") is None
+
+
+def test_advance_revision_carries_only_entries_at_the_old_revision(cache_dir, monkeypatch):
+    sheet_cache.store("sheet", "Buy", "r1", [["Date"]])
+    sheet_cache.store("sheet", "Sell", "r0", [["Date"]])
+    sheet_cache.store("other", "Buy", "r1", [["Date"]])
+
+    sheet_cache.advance_revision("sheet", "r1", "r2")
+    sheet_cache.advance_revision("sheet", None, "r3")
+    monkeypatch.setattr(sheet_cache, "_memory", {})
+
+    assert sheet_cache.load("sheet", "Buy")["revision"] == "r2"
+    assert sheet_cache.load("sheet", "Sell")["revision"] == "r0"
+    assert sheet_cache.load("other", "Buy")["revision"] == "r1"
+
+
+def test_invalidate_drops_one_tab_or_a_whole_spreadsheet(cache_dir):
+    for sheet_id, key in [("sheet", "Buy"), ("sheet", "Sell"), ("other", "Buy")]:
+        sheet_cache.store(sheet_id, key, "r1", [["Date"]])
+
+    sheet_cache.invalidate("sheet", "Buy")
+    assert sheet_cache.load("sheet", "Buy") is None
+    assert sheet_cache.load("sheet", "Sell") is not None
+
+    sheet_cache.invalidate("sheet")
+    assert sheet_cache.load("sheet", "Sell") is None
+    assert sheet_cache.load("other", "Buy") is not None
+
+    sheet_cache.invalidate()
+    assert sheet_cache.load("other", "Buy") is None
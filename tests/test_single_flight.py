@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+# first-party
+from src.util.single_flight import SingleFlight
+
+# third-party
+import pytest
+
+# system
+import threading
+import time
+
+
+def test_concurrent_callers_share_one_fetch_per_key():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def fetch(keys):
+        calls.append(sorted(keys))
+        started.set()
+        time.sleep(0.2)
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(a=flights.do_many(["x", "y"], fetch)))
+    leader.start()
+    started.wait()
+    results["b"] = flights.do_many(["y", "z", "missing"], fetch)
+    leader.join()
+
+    assert calls == [["x", "y"], ["missing", "z"]]
+    assert results["a"] == {"x": "X", "y": "Y"}
+    assert results["b"] == {"y": "Y", "z": "Z"}
+
+
+def test_fetch_errors_reach_every_waiting_caller():
+    flights = SingleFlight()
+    started = threading.Event()
+
+    def fail(keys):
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("quota exceeded")
+
+    errors = []
+
+    def lead():
+        try:
+            flights.do("key", lambda: fail(["key"]))
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait()
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        flights.do_many(["key"], lambda keys: {"key": "unused"})
+    leader.join()
+    assert len(errors) == 1
+
+    # Nothing is remembered once the flight lands.
+    assert flights.do("key", lambda: "fresh") == "fresh"
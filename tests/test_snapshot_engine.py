@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+# first-party
+from src.util.snapshot_engine import SnapshotEngine
+
+
+def test_snapshot_is_rebuilt_only_when_inputs_change():
+    inputs = {"a": 1}
+    builds = []
+
+    def build(key):
+        builds.append(key)
+        return {"key": key, "build": len(builds)}
+
+    engine = SnapshotEngine(lambda key: inputs.get(key), build)
+    version, first = engine.get("a")
+    assert engine.get("a") == (version, first)
+    assert engine.current("a") == (version, first)
+    assert engine.version("a") == version
+    assert builds == ["a"]
+
+    inputs["a"] = 2
+    assert engine.current("a") is None
+    assert engine.version("a") != version
+    new_version, second = engine.get("a")
+    assert new_version == engine.version("a")
+    assert second["build"] == 2
+
+    # Unversioned keys are rebuilt on every read and never held
+    assert engine.get("b") == (None, {"key": "b", "build": 3})
+    assert engine.get("b") == (None, {"key": "b", "build": 4})
+    assert engine.current("b") is None
+
+
+def test_version_uses_inputs_read_after_the_build():
+    inputs = {"a": 1}
+
+    def build(key):
+        # The build refreshes one of its own inputs, like fetching a missing quote
+        inputs[key] = 2
+        return {"key": key}
+
+    engine = SnapshotEngine(lambda key: inputs.get(key), build)
+    version, result = engine.get("a")
+    assert version == engine.version("a")
+    assert engine.current("a") == (version, result)
+
+
+def test_snapshot_is_kept_once_a_build_makes_its_inputs_readable():
+    inputs = {}
+    builds = []
+
+    def build(key):
+        # e.g. an expired quote refreshed by the build itself
+        builds.append(key)
+        inputs[key] = 1
+        return {"key": key}
+
+    engine = SnapshotEngine(lambda key: inputs.get(key), build)
+    version, result = engine.get("a")
+    assert version is not None
+    assert engine.get("a") == (version, result)
+    assert builds == ["a"]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# first-party
+from src.util.summary_writer import SummaryWriter
+
+# system
+import time
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_summary_writer_coalesces_writes_per_interval():
+    written = []
+    writer = SummaryWriter(write=lambda summary, day: written.append(summary), interval=60)
+
+    writer.enqueue("first")
+    assert _wait_for(lambda: written == ["first"])
+
+    writer.enqueue("second")
+    writer.enqueue("third")
+    time.sleep(0.1)
+    assert written == ["first"]
+    assert len(writer.status()["pending_dates"]) == 1
+
+    writer.flush()
+    assert written == ["first", "third"]
+    assert writer.status()["last_success_at"] is not None
+
+
+def test_summary_writer_keeps_failed_summary_for_retry():
+    def fail(summary, day):
+        raise RuntimeError("quota exceeded")
+
+    writer = SummaryWriter(write=fail, interval=0)
+    writer.enqueue("summary")
+    assert _wait_for(lambda: writer.status()["last_error"] is not None)
+
+    status = writer.status()
+    assert status["last_error"] == "quota exceeded"
+    assert status["last_success_at"] is None
+    assert list(status["retry_attempts"].values()) == [1]
+    assert len(status["pending_dates"]) == 1
+
+
+def test_summary_writer_writes_the_queued_date_and_stops_before_the_final_flush():
+    written = []
+    writer = SummaryWriter(write=lambda summary, day: written.append((day, summary)), interval=60)
+
+    writer.enqueue("first", day="2024-12-31")
+    assert _wait_for(lambda: written == [("2024-12-31", "first")])
+    writer.enqueue("late", day="2024-12-31")
+
+    writer.close()
+    assert not writer._thread.is_alive()
+    assert written == [("2024-12-31", "first"), ("2024-12-31", "late")]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+# first-party
+from src.ledger import LedgerRow
+from src.tax_lots import FIFO, HIFO, LIFO, SPECIFIC_ID, TaxLotLedger, consume, normalize_method
+
+# system
+from datetime import date
+
+
+def _row(day, qty, total, account="IRA", action="Buy", row_number=None):
+    return LedgerRow(
+        date=day,
+        source="open_positions",
+        brokerage="Fidelity",
+        account=account,
+        category="Tech",
+        company="Apple",
+        ticker="AAPL",
+        action=action,
+        cost_basis_method=None,
+        qty=qty,
+        price_per_share=total / qty if qty else None,
+        total=total,
+        row_number=row_number,
+    )
+
+
+def _ledger():
+    ledger = TaxLotLedger()
+    ledger.add(_row("2021-03-01", 10, 1000, row_number=2))
+    ledger.add(_row("2020-01-01", 10, 500, row_number=3))
+    ledger.add(_row("2022-06-01", 10, 2000, row_number=4))
+    ledger.add(_row("2019-01-01", 10, 100, account="Joint", row_number=5))
+    return ledger
+
+
+def test_methods_consume_lots_in_their_order():
+    for method, expected in [(FIFO, [3, 2]), (LIFO, [4, 2]), (HIFO, [4, 2])]:
+        consumed = _ledger().sell("AAPL", "IRA", 15, method)
+        assert [lot.row.row_number for lot, _, _ in consumed] == expected
+        assert [qty for _, qty, _ in consumed] == [10, 5]
+
+    consumed = _ledger().sell("AAPL", "IRA", 15, FIFO)
+    assert sum(cost for _, _, cost in consumed) == 500 + 500
+
+
+def test_partially_sold_lot_keeps_proportional_cost_and_stays_first():
+    ledger = _ledger()
+    ledger.sell("AAPL", "IRA", 4, FIFO)
+    ledger.sell("AAPL", "IRA", 2, LIFO)
+
+    open_lots = {lot.row.row_number: lot for lot in ledger.lots_for("AAPL") if not lot.is_closed}
+    assert (open_lots[3].remaining, open_lots[3].cost) == (6, 300)
+    assert (open_lots[4].remaining, open_lots[4].cost) == (8, 1600)
+    assert open_lots[3].cost_per_share == 50
+    assert open_lots[5].holding_days(date(2020, 1, 1)) == 365
+
+    consumed = ledger.sell("AAPL", "IRA", 7, FIFO)
+    assert [(lot.row.row_number, qty) for lot, qty, _ in consumed] == [(3, 6), (2, 1)]
+    assert open_lots[3].is_closed
+    # Other accounts are never touched
+    assert ledger.sell("AAPL", "Roth", 1, FIFO) == []
+
+
+def test_specific_lots_and_method_names():
+    ledger = _ledger()
+    lots = ledger.lots_for("AAPL")
+    consumed = consume([lots[2], lots[0]], 12)
+    assert [(lot.row.row_number, qty) for lot, qty, _ in consumed] == [(4, 10), (2, 2)]
+
+    assert normalize_method(" fifo ") == FIFO
+    assert normalize_method("Specific-ID") == SPECIFIC_ID
+    assert normalize_method("") is None
+    assert normalize_method("Average") == "Average"
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# first-party
+from src import portfolio_data
+from src.util.transaction_source import LocalFileSource, get_transaction_source
+
+# third-party
+import pytest
+
+HEADER = "Date,Brokerage,Account,Category,Company,Ticker,Action,Cost Basis Method,Qty,Price per share,Total\n"
+
+
+def test_local_directory_resolves_worksheets_by_name(tmp_path):
+    (tmp_path / "Buy.csv").write_text(HEADER + "1/2/24,Fidelity,IRA,Tech,Apple,aapl,Buy,,2,$500.00,1000\n")
+    source = LocalFileSource(str(tmp_path))
+
+    buy, sell = source.worksheets_values([("Buy", 0), ("Sell", None)])
+
+    assert buy[0][0] == "Date"
+    assert buy[1][5] == "aapl"
+    assert isinstance(sell, FileNotFoundError)
+
+
+def test_local_file_stands_in_for_first_worksheet(tmp_path):
+    ledger = tmp_path / "export.csv"
+    ledger.write_text(HEADER + '1/2/24,Fidelity,IRA,Tech,Apple,AAPL,Buy,,2,"1,000.00",2000\n')
+    source = LocalFileSource(str(ledger))
+
+    assert source.worksheet_values("Buy", 0)[1][9] == "1,000.00"
+    with pytest.raises(FileNotFoundError):
+        source.worksheet_values("Sell", None)
+
+
+def test_transactions_load_from_local_source(tmp_path, monkeypatch):
+    (tmp_path / "Buy.csv").write_text(HEADER + "1/2/24,Fidelity,IRA,Tech,Apple,aapl,,,2,,300\n")
+    monkeypatch.setenv("TRANSACTIONS_SOURCE", "local")
+    monkeypatch.setenv("TRANSACTIONS_PATH", str(tmp_path))
+
+    assert get_transaction_source().name == "local"
+    result = portfolio_data.get_transactions(source="open_positions")
+
+    assert result["transactions"][0]["ticker"] == "AAPL"
+    assert result["transactions"][0]["date"] == "2024-01-02"
+    assert result["transactions"][0]["price_per_share"] == 150
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+# first-party
+import src.util.price_provider as price_provider
+import src.util.resilience as resilience
+import src.util.yfinance as yfinance
+from src.config.ColumnNameConsts import ColumnNames as CN
+
+# system
+import time
+
+
+class _FakeTicker:
+    quotes = {
+        "AAA": {"last_price": 110.0, "regular_market_previous_close": 100.0},
+        "BBB": {"last_price": None, "regular_market_previous_close": None},
+    }
+
+    def __init__(self, ticker):
+        if ticker == "BAD":
+            raise RuntimeError("no such symbol")
+        if ticker == "SLOW":
+            time.sleep(1)
+        self.fast_info = self.quotes.get(ticker, {})
+        self.info = {"currentPrice": 50.0, "previousClose": 40.0}
+
+
+def test_curr_price_returns_partial_results(monkeypatch):
+    monkeypatch.setattr(price_provider.yf, "Ticker", _FakeTicker)
+    monkeypatch.setenv("QUOTE_CACHE_DISABLED", "1")
+
+    data = yfinance.curr_price(["AAA", "BBB", "BAD", "SLOW", "AAA"], crypto=False)
+    assert list(data.index) == ["AAA", "BBB", "SLOW"]
+    assert data.loc["AAA", CN.PRICE] == 110.0
+    assert abs(data.loc["AAA", CN.DAY_CHNG] - 0.1) < 1e-12
+    # fast_info had no price, so the info scrape is used
+    assert data.loc["BBB", CN.PRICE] == 50.0
+
+    monkeypatch.setenv("QUOTE_TIMEOUT", "0.2")
+    data = yfinance.curr_price(["AAA", "SLOW"])
+    assert list(data.index) == ["AAA"]
+
+
+def test_curr_price_serves_stale_quote_while_refreshing(monkeypatch):
+    prices = {"CCC": 10.0}
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.fast_info = {"last_price": prices[ticker], "regular_market_previous_close": 10.0}
+
+    monkeypatch.setattr(price_provider.yf, "Ticker", Ticker)
+    monkeypatch.setenv("QUOTE_TTL_CRYPTO", "0")
+    monkeypatch.setenv("QUOTE_STALE_GRACE", "60")
+    yfinance.clear_quote_cache()
+
+    assert yfinance.curr_price(["CCC"], crypto=True).loc["CCC", CN.PRICE] == 10.0
+
+    prices["CCC"] = 12.0
+    assert yfinance.curr_price(["CCC"], crypto=True).loc["CCC", CN.PRICE] == 10.0
+    for _ in range(200):
+        if yfinance.cached_quotes(["CCC"], crypto=True)["CCC"][0] == 12.0:
+            break
+        time.sleep(0.01)
+    assert yfinance.cached_quotes(["CCC"], crypto=True)["CCC"][0] == 12.0
+    while yfinance._refreshing:
+        time.sleep(0.01)
+    yfinance.clear_quote_cache()
+
+
+def test_unpriced_tickers_are_stamped_and_expire_for_a_retry(monkeypatch):
+    monkeypatch.setattr(price_provider.yf, "Ticker", _FakeTicker)
+    monkeypatch.setenv("QUOTE_TTL_CRYPTO", "60")
+    monkeypatch.setenv("QUOTE_MISS_RETRY", "60")
+    yfinance.clear_quote_cache()
+
+    yfinance.curr_price(["AAA", "BAD"], crypto=True)
+    stamps = yfinance.quote_stamps(["AAA", "BAD", "NEVER"])
+    assert stamps["BAD"] is not None
+    assert stamps["NEVER"] is None
+
+    monkeypatch.setenv("QUOTE_MISS_RETRY", "0")
+    yfinance.curr_price(["BAD"], crypto=True)
+    assert yfinance.quote_stamps(["AAA", "BAD"]) is None
+    yfinance.clear_quote_cache()
+
+
+def test_only_transport_errors_open_the_quotes_breaker(monkeypatch):
+    errors = {"BAD": RuntimeError("no such symbol")}
+
+    class Ticker:
+        def __init__(self, ticker):
+            raise errors.get(ticker) or ConnectionError("Yahoo unreachable")
+
+    monkeypatch.setattr(price_provider.yf, "Ticker", Ticker)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setenv("CIRCUIT_FAILURE_THRESHOLD", "1")
+    monkeypatch.setenv("QUOTE_CACHE_DISABLED", "1")
+
+    # An unknown symbol is a per-ticker miss; the provider itself answered
+    assert yfinance.cached_quotes(["BAD"]) == {}
+    assert resilience.get_breaker("quotes").state == "closed"
+
+    assert yfinance.cached_quotes(["AAA", "BAD"]) == {}
+    assert resilience.get_breaker("quotes").state == "closed"
+
+    assert yfinance.cached_quotes(["AAA"]) == {}
+    assert resilience.get_breaker("quotes").state == "open"
+
+
+def test_ticker_without_a_price_is_a_miss_not_a_zero_quote(monkeypatch):
+    class Ticker:
+        def __init__(self, ticker):
+            self.fast_info = {"last_price": None, "regular_market_previous_close": 10.0}
+            self.info = {"regularMarketPrice": 0}
+
+    monkeypatch.setattr(price_provider.yf, "Ticker", Ticker)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.delenv("QUOTE_CACHE_DISABLED", raising=False)
+    monkeypatch.setenv("QUOTE_TTL_CRYPTO", "3600")
+    yfinance.clear_quote_cache()
+
+    assert price_provider.YFinanceProvider().quotes(["ZERO"]) == {}
+    assert yfinance.curr_price(["ZERO"], crypto=True).empty
+    assert "ZERO" not in yfinance._quote_cache
+    assert "ZERO" in yfinance._missed
+
+    # A zero price from any provider is never cached either
+    monkeypatch.setattr(yfinance, "fetch_quotes", lambda tickers, timeout=None: {"ZERO": (0.0, 10.0)})
+    assert yfinance.cached_quotes(["ZERO"], crypto=True) == {}
+    assert "ZERO" not in yfinance._quote_cache
+    yfinance.clear_quote_cache()
+
+
+def test_one_hung_ticker_only_costs_its_own_timeout(monkeypatch):
+    monkeypatch.setattr(price_provider.yf, "Ticker", _FakeTicker)
+    monkeypatch.setenv("QUOTE_WORKERS", "2")
+    fast = [f"T{n}" for n in range(7)]
+    monkeypatch.setattr(_FakeTicker, "quotes", {ticker: _FakeTicker.quotes["AAA"] for ticker in fast})
+
+    started = time.monotonic()
+    quotes = price_provider.YFinanceProvider().quotes(["SLOW"] + fast, timeout=0.3)
+    # Without a latency budget the old overall deadline was 0.3s x ceil(8 / 2) = 1.2s
+    assert time.monotonic() - started < 0.9
+    assert sorted(quotes) == fast
+
+
+def test_stale_quote_keeps_its_stamp_while_it_is_refreshed(monkeypatch):
+    monkeypatch.delenv("QUOTE_CACHE_DISABLED", raising=False)
+    yfinance.clear_quote_cache()
+    now = time.time()
+    yfinance._quote_cache["CCC"] = (10.0, 9.0, now - 1, now + 60, now - 30)
+
+    assert yfinance.quote_stamps(["CCC"]) is None
+    yfinance._refreshing.add("CCC")
+    try:
+        assert yfinance.quote_stamps(["CCC"]) == {"CCC": now - 30}
+    finally:
+        yfinance._refreshing.discard("CCC")
+    yfinance.clear_quote_cache()